@@ -2,6 +2,8 @@
 Módulo para gerenciar todos os paths da aplicação de forma absoluta.
 Isso garante que funcione corretamente mesmo quando iniciado do Windows.
 """
+import getpass
+import hashlib
 import os
 import sys
 
@@ -13,22 +15,46 @@ else:
     # Se é desenvolvimento
     APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Arquivos de configuração e logs no mesmo diretório da aplicação
-CONFIG_FILE = os.path.join(APP_DIR, "config.json")
-LOG_FILE = os.path.join(APP_DIR, "logs.txt")
+# Dados gerados pelo app (config, logs, métricas, caches, profiles) ficam no
+# diretório da aplicação; BECUPE_DATA_DIR aponta para outra pasta (benchmarks)
+DATA_DIR = os.environ.get("BECUPE_DATA_DIR") or APP_DIR
+
+# Arquivos de configuração e logs
+CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
+LOG_FILE = os.path.join(DATA_DIR, "logs.txt")
 LINKS_FILE = os.path.join(APP_DIR, "links.txt")
+# Métricas de duração/tamanho dos backups e restaurações
+METRICS_FILE = os.path.join(DATA_DIR, "metrics.sqlite3")
+
+# Nome do servidor local da instância única (pipe nomeado no Windows, socket
+# Unix no Linux): um por usuário e por pasta de instalação
+def _instance_name():
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = ""
+    key = f"{user}|{os.path.normcase(APP_DIR)}".encode("utf-8")
+    return "becupe-" + hashlib.sha1(key).hexdigest()[:16]
+
+
+INSTANCE_NAME = _instance_name()
 
-# Arquivo de lock para evitar múltiplas instâncias
-LOCK_FILE = os.path.join(APP_DIR, ".becupe_lock")
+# Pasta oculta com os metadados dentro da pasta de backups automáticos
+META_DIR_NAME = ".becupe"
 
 def ensure_app_dir_exists():
-    """Garante que o diretório da aplicação existe"""
+    """Garante que o diretório da aplicação (e o de dados) existe"""
     os.makedirs(APP_DIR, exist_ok=True)
+    os.makedirs(DATA_DIR, exist_ok=True)
 
 def get_app_dir():
     """Retorna o diretório da aplicação"""
     return APP_DIR
 
+def get_data_dir():
+    """Retorna o diretório dos dados gerados pelo app (padrão: o da aplicação)"""
+    return DATA_DIR
+
 def get_config_file():
     """Retorna o caminho absoluto do arquivo de config"""
     return CONFIG_FILE
@@ -41,6 +67,14 @@ def get_links_file():
     """Retorna o caminho absoluto do arquivo de links"""
     return LINKS_FILE
 
-def get_lock_file():
-    """Retorna o caminho absoluto do arquivo de lock para instância única"""
-    return LOCK_FILE
+def get_metrics_file():
+    """Retorna o caminho absoluto do banco de métricas"""
+    return METRICS_FILE
+
+def get_instance_name():
+    """Retorna o nome do servidor local da instância única"""
+    return INSTANCE_NAME
+
+def get_meta_dir(backup_root):
+    """Retorna a pasta de metadados (manifestos, índices) de uma pasta de backups"""
+    return os.path.join(backup_root, META_DIR_NAME)
@@ -0,0 +1,112 @@
+"""
+Regras dos backups automáticos, sem Qt.
+
+Usado pela interface (ui_main) e pelo daemon (daemon.py): decide se um
+evento gera backup e com quais opções (lidas do config em memória), roda o
+backup seguido da limpeza e monta os agendamentos guardados no config.
+Backup, compressão e retenção só são importados no primeiro backup, para
+não pesar na inicialização da bandeja.
+"""
+import os
+from datetime import datetime
+
+from config import config_store
+from logger import log_event
+
+EVENT_AUTOSAVE = "autosave"
+EVENT_SCHEDULED = "scheduled"
+
+
+def event_backup_plan(game, event, force=False):
+    """
+    Opções do backup automático de game para event, ou None se o evento não
+    gera backup (sem pasta de backups ou evento desligado). force ignora a
+    opção do evento (backups pedidos pela CLI).
+
+    Returns:
+        (pasta do dia, prefixo, política de retenção, kwargs de create_backup)
+    """
+    from backup import BACKEND_ZIP
+    from compression import PROFILE_BALANCED
+
+    cfg = config_store
+    folder = cfg.get_str("folder")
+    if not folder:
+        return None
+
+    if event == EVENT_AUTOSAVE:
+        if not cfg.get_bool("continuous"):
+            return None
+    elif event != EVENT_SCHEDULED and not force and not cfg.get_bool(f"{game.lower()}_{event}"):
+        return None
+
+    day_folder = os.path.join(folder, datetime.now().strftime("%Y-%m-%d"))
+    kwargs = dict(
+        root=folder,
+        # Backups contínuos são frequentes: sempre incrementais
+        incremental=cfg.get_bool("incremental") or event == EVENT_AUTOSAVE,
+        backend=cfg.get_str("backend", BACKEND_ZIP),
+        workers=cfg.get("compression_workers"),
+        profile=cfg.get_str("compression_profile", PROFILE_BALANCED),
+        skip_unchanged=True,
+    )
+    return day_folder, f"{game}_{event.upper()}", cfg.get_dict("retention"), kwargs
+
+
+def event_backup_job(game_path, game, folder, prefix, retention, progress=None, **kwargs):
+    """Backup automático seguido da limpeza do jogo"""
+    from backup import create_backup
+    from retention import apply_retention
+
+    os.makedirs(folder, exist_ok=True)
+    path = create_backup(game_path, folder, prefix, progress=progress, **kwargs)
+    if retention and retention.get("enabled"):
+        try:
+            apply_retention(kwargs["root"], retention, game=game)
+        except Exception as e:
+            # A limpeza falhar não invalida o backup que acabou de ser feito
+            log_event("ERROR", f"Erro na limpeza de backups antigos: {str(e)}")
+    return path
+
+
+def event_throttle(game_running):
+    """
+    Limite de I/O e prioridade baixa do config que só valem enquanto
+    game_running() for verdadeiro (algum jogo aberto, conferido a cada
+    pedaço lido/gravado), ou None se o modo econômico estiver off
+    """
+    if not config_store.get_bool("throttle_auto", True):
+        return None
+    from throttle import Throttle, DEFAULT_RATE
+
+    return Throttle(
+        rate=config_store.get_int("throttle_mb_s", DEFAULT_RATE // (1024 * 1024)) * 1024 * 1024,
+        low_priority=True,
+        active=game_running
+    )
+
+
+def add_configured_schedules(add, schedules=None, last_runs=None):
+    """
+    Chama add(jogo, expressão, último disparo) para cada agendamento do
+    config (vários por jogo, separados por ";"). Expressões inválidas só
+    vão para o log.
+    """
+    if schedules is None:
+        schedules = config_store.get_dict("schedules")
+    if last_runs is None:
+        last_runs = config_store.get_dict("schedule_last_runs")
+    for game, text in schedules.items():
+        last_run = datetime.fromisoformat(last_runs[game]) if game in last_runs else None
+        for part in filter(None, (p.strip() for p in text.split(";"))):
+            try:
+                add(game, part, last_run)
+            except ValueError as e:
+                log_event("ERROR", f"Agendamento inválido de {game} ({part}): {str(e)}")
+
+
+def mark_schedule_run(game, when):
+    """Guarda o último disparo do agendamento (recupera perdidos ao reabrir)"""
+    last_runs = config_store.get_dict("schedule_last_runs")
+    last_runs[game] = when.isoformat(timespec="seconds")
+    config_store.set("schedule_last_runs", last_runs)
@@ -1,32 +1,288 @@
-import shutil
 import os
+import json
 from datetime import datetime
 from logger import log_event
+from manifest import (
+    MANIFEST_MEMBER, MANIFEST_VERSION, MAX_CHAIN_LENGTH,
+    diff_files, load_state, save_state
+)
+from tree_cache import TreeHashCache
+from chunk_store import ChunkStore
+from zip_writer import ParallelZipWriter
+from compression import PROFILE_BALANCED
+from progress import OperationCancelled
+from catalog import BackupCatalog, parse_backup_name
+from throttle import own_thread
+from profiling import profiled
+from metrics import (
+    OperationMetrics, record_operation, OP_BACKUP,
+    OUTCOME_SKIPPED, OUTCOME_CANCELLED, OUTCOME_FAILED
+)
 
-def create_backup(game_path, dest_folder, prefix):
+BACKEND_ZIP = "zip"
+BACKEND_CHUNKS = "chunks"
+
+
+def get_game_key(game_path):
+    """Chave do jogo usada nos metadados (nome da pasta do save)"""
+    return os.path.basename(os.path.normpath(game_path))
+
+
+def _relpath(path, start):
+    """Caminho relativo quando possível (no Windows, drives diferentes não têm)"""
+    try:
+        return os.path.relpath(path, start)
+    except ValueError:
+        return os.path.abspath(path)
+
+
+def _previous_snapshot(root, state):
+    """Retorna o caminho do último backup se ele ainda existir"""
+    if not state or not state.get("snapshot"):
+        return None
+    path = os.path.normpath(os.path.join(root, state["snapshot"]))
+    return path if os.path.exists(path) else None
+
+
+def _store_chunks(store, game_path, files, previous_files, progress=None, throttle=None):
+    """
+    Grava no repositório os blocos dos arquivos que o último backup não tinha.
+    Retorna (arquivos com blocos novos, bytes lidos)
+    """
+    new_files = 0
+    read_bytes = 0
+    for rel, entry in files.items():
+        if progress:
+            progress.advance(files=1, nbytes=entry["size"])
+        old = previous_files.get(rel)
+        chunks = old.get("chunks") if old and old["sha1"] == entry["sha1"] else None
+        if chunks is not None and all(store.has_chunk(digest) for digest, _size in chunks):
+            files[rel] = dict(entry, chunks=chunks)
+            continue
+        files[rel] = dict(entry, chunks=store.put_file(os.path.join(game_path, *rel.split("/")), throttle))
+        new_files += 1
+        read_bytes += entry["size"]
+    return new_files, read_bytes
+
+
+def _save_snapshot_state(root, game_key, state, final_path, backend, chain_length, files, tree_hash):
+    save_state(root, game_key, {
+        "snapshot": _relpath(final_path, root),
+        "chain_length": chain_length,
+        "backend": backend,
+        "tree_hash": tree_hash,
+        "skipped": state.get("skipped", 0) if state else 0,
+        "files": files,
+    })
+
+
+def _catalog_backup(catalog_root, final_path, backend, kind, files, tree_hash, base=None):
+    """Registra o backup no catálogo. Falha no catálogo não invalida o backup"""
+    try:
+        game, event, created = parse_backup_name(os.path.basename(final_path))
+        with BackupCatalog(catalog_root) as catalog:
+            catalog.record(
+                final_path,
+                game=game,
+                event=event,
+                created=created.timestamp(),
+                size=os.path.getsize(final_path),
+                files=len(files),
+                backend=backend,
+                kind=kind,
+                base=base,
+                tree_hash=tree_hash,
+            )
+    except Exception as e:
+        log_event("ERROR", f"Erro ao registrar backup no catálogo: {str(e)}")
+
+
+@own_thread
+@profiled("backup")
+def create_backup(game_path, dest_folder, prefix, root=None, incremental=False,
+                  backend=BACKEND_ZIP, workers=None, profile=PROFILE_BALANCED,
+                  skip_unchanged=False, progress=None, catalog_root=None, throttle=None):
+    """
+    Cria um backup .becupe da pasta do jogo.
+
+    Args:
+        game_path: Pasta de save do jogo
+        dest_folder: Pasta onde o .becupe será criado
+        prefix: Prefixo do nome do arquivo (ex: MSC_OPEN)
+        root: Pasta raiz dos backups automáticos. Quando informada, o manifesto
+              do último backup é guardado nela e pode servir de base para o próximo
+        incremental: Grava apenas arquivos novos/alterados desde o último backup
+                     (requer root)
+        backend: BACKEND_ZIP (zip independente) ou BACKEND_CHUNKS (índice que aponta
+                 para o repositório de blocos deduplicados em root; requer root)
+        workers: Threads de compressão do zip (padrão: até 4)
+        profile: Perfil de compressão (compression.PROFILE_*) usado para escolher
+                 o método de cada arquivo pela entropia
+        skip_unchanged: Se o save não mudou desde o último backup em root, não cria
+                        outro arquivo e retorna o caminho do backup existente
+        progress: progress.Progress para acompanhar/cancelar. No cancelamento o
+                  arquivo parcial é apagado e OperationCancelled é levantada
+        catalog_root: Pasta de backups cujo catálogo registra este backup
+                      (padrão: root)
+        throttle: throttle.Throttle para limitar bytes/s (e baixar a prioridade)
+                  enquanto o jogo estiver aberto. Com low_priority o backup roda
+                  numa thread própria (throttle.own_thread)
+    """
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     zip_name = f"{prefix}_{timestamp}"
-    zip_path = os.path.join(dest_folder, zip_name)
+    final_path = os.path.join(dest_folder, zip_name + ".becupe")
+    tmp_path = final_path + ".tmp"
+    catalog_root = catalog_root or root
+    game, event, _created = parse_backup_name(os.path.basename(final_path))
+    metrics = OperationMetrics(OP_BACKUP, game, event)
+    metrics.backend = backend
 
     try:
         log_event("BACKUP", f"Iniciando backup: {prefix}")
-        shutil.make_archive(zip_path, "zip", game_path)
-
-        # Verifica se o arquivo .zip foi criado e renomeia para .becupe
-        zip_file = zip_path + ".zip"
-        if os.path.exists(zip_file):
-            final_path = zip_path + ".becupe"
-            # Se o arquivo .becupe já existe, deleta ele primeiro
-            if os.path.exists(final_path):
-                os.remove(final_path)
-            os.rename(zip_file, final_path)
-            log_event("BACKUP", f"Backup concluído: {final_path}")
+
+        game_key = get_game_key(game_path)
+        state = load_state(root, game_key) if root else None
+        previous_files = state.get("files", {}) if state else {}
+
+        # Só relê arquivos cujo stat mudou desde a última varredura
+        cache = TreeHashCache(game_path)
+        cached = dict(cache.files)
+        with metrics.phase("scan"):
+            tree_hash = cache.refresh(throttle)
+        files, dirs = dict(cache.files), list(cache.dirs)
+        # Entradas reaproveitadas são o mesmo objeto; as outras foram lidas
+        metrics.bytes_read += sum(e["size"] for rel, e in files.items() if cached.get(rel) is not e)
+        metrics.files = len(files)
+        if progress:
+            progress.check()
+
+        if skip_unchanged and state and state.get("tree_hash") == tree_hash:
+            existing = _previous_snapshot(root, state)
+            if existing:
+                state["skipped"] = state.get("skipped", 0) + 1
+                save_state(root, game_key, state)
+                metrics.finish(OUTCOME_SKIPPED)
+                log_event(
+                    "BACKUP",
+                    f"Save inalterado, backup ignorado: {prefix} "
+                    f"(último: {existing}, ignorados: {state['skipped']})"
+                )
+                return existing
+
+        if backend == BACKEND_CHUNKS:
+            if not root:
+                raise ValueError("O repositório de blocos precisa de uma pasta de backups")
+            store = ChunkStore(root)
+            if progress:
+                progress.start("Backup", len(files), sum(e["size"] for e in files.values()))
+            # Até o índice ser registrado, a coleta de lixo não pode rodar
+            with store.lock():
+                with metrics.phase("compress"):
+                    new_files, read_bytes = _store_chunks(store, game_path, files, previous_files,
+                                                          progress, throttle)
+                with metrics.phase("write"):
+                    store.write_snapshot(final_path, files, dirs)
+            metrics.kind = BACKEND_CHUNKS
+            metrics.changed = new_files
+            metrics.bytes_read += read_bytes
+            metrics.bytes_in = read_bytes
+            metrics.bytes_out = store.bytes_written
+            metrics.bytes_written = store.bytes_written + os.path.getsize(final_path)
+            metrics.finish()
+            if progress:
+                progress.finish()
+            _save_snapshot_state(root, game_key, state, final_path, BACKEND_CHUNKS, 0, files, tree_hash)
+            _catalog_backup(catalog_root, final_path, BACKEND_CHUNKS, BACKEND_CHUNKS, files, tree_hash)
+            log_event("BACKUP", f"Backup deduplicado concluído: {final_path} ({new_files} arquivos com blocos novos)")
+            with store.lock():
+                if store.prune_missing():
+                    removed, freed = store.collect_garbage()
+                    log_event("BACKUP", f"Limpeza do repositório de blocos: {removed} blocos removidos ({freed} bytes)")
             return final_path
+
+        base_path = None
+        if incremental and root and state and state.get("backend", BACKEND_ZIP) == BACKEND_ZIP:
+            base_path = _previous_snapshot(root, state)
+        chain_length = state.get("chain_length", 0) if state else 0
+        if base_path and chain_length < MAX_CHAIN_LENGTH:
+            members, deleted = diff_files(previous_files, files)
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "type": "incremental",
+                "base": _relpath(base_path, dest_folder),
+                "tree_hash": tree_hash,
+                "files": files,
+                "dirs": dirs,
+                "deleted": deleted,
+            }
+            chain_length += 1
         else:
-            # Se não encontrou o .zip, tenta retornar o caminho direto
-            log_event("ERROR", f"Arquivo ZIP não encontrado para: {prefix}")
-            return zip_path
+            members = sorted(files)
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "type": "full",
+                "tree_hash": tree_hash,
+                "files": files,
+                "dirs": dirs,
+                "deleted": [],
+            }
+            chain_length = 0
+
+        if progress:
+            progress.start("Backup", len(members), sum(files[rel]["size"] for rel in members))
+        with metrics.phase("compress"):
+            with ParallelZipWriter(tmp_path, workers=workers, profile=profile, progress=progress,
+                                   throttle=throttle) as writer:
+                if manifest["type"] == "full":
+                    for rel in dirs:
+                        writer.add_dir(rel)
+                for rel in members:
+                    writer.add_file(os.path.join(game_path, *rel.split("/")), rel)
+                writer.add_bytes(MANIFEST_MEMBER, json.dumps(manifest).encode("utf-8"))
+        # A fase de compressão fica só com o que não foi gravação
+        metrics.phases["compress"] -= writer.write_seconds
+        metrics.phases["write"] += writer.write_seconds
+
+        # Se o arquivo .becupe já existe, é substituído
+        with metrics.phase("write"):
+            os.replace(tmp_path, final_path)
+        metrics.kind = manifest["type"]
+        metrics.changed = len(members)
+        metrics.bytes_read += writer.bytes_in
+        metrics.bytes_in = writer.bytes_in
+        metrics.bytes_out = writer.bytes_out
+        metrics.bytes_written = os.path.getsize(final_path)
+        metrics.finish()
+        if progress:
+            progress.finish()
+
+        if root:
+            _save_snapshot_state(root, game_key, state, final_path, BACKEND_ZIP, chain_length, files, tree_hash)
+        if catalog_root:
+            _catalog_backup(catalog_root, final_path, BACKEND_ZIP, manifest["type"], files,
+                            tree_hash, manifest.get("base"))
+
+        if manifest["type"] == "incremental":
+            log_event(
+                "BACKUP",
+                f"Backup incremental concluído: {final_path} "
+                f"({len(members)} alterados, {len(manifest['deleted'])} removidos)"
+            )
+        else:
+            log_event("BACKUP", f"Backup concluído: {final_path}")
+        return final_path
+    except OperationCancelled:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        log_event("BACKUP", f"Backup cancelado: {prefix}")
+        metrics.finish(OUTCOME_CANCELLED)
+        raise
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         log_event("ERROR", f"Erro ao criar backup ({prefix}): {str(e)}")
         print(f"Erro ao criar backup: {e}")
+        metrics.finish(OUTCOME_FAILED)
         raise
+    finally:
+        record_operation(metrics)
@@ -0,0 +1,206 @@
+"""
+Fila de trabalhos de backup/restauração executada fora da thread da interface.
+
+- Trabalhos manuais têm prioridade sobre os automáticos.
+- Um trabalho pendente igual (mesmo jogo + evento) absorve o novo, então um
+  jogo que abre/fecha em loop não enche a fila.
+- Dois trabalhos do mesmo jogo nunca rodam ao mesmo tempo.
+- Trabalhos com discos informados (devices.DeviceFootprint) só rodam juntos
+  se não disputarem o mesmo disco; os que disputam são intercalados.
+- O estado e o progresso de cada trabalho chegam na interface por sinais Qt,
+  e trabalhos podem ser cancelados (pendentes saem da fila, os em execução
+  param no próximo ponto seguro).
+"""
+import heapq
+import itertools
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from logger import log_event
+from progress import Progress, OperationCancelled
+
+PRIORITY_MANUAL = 0
+PRIORITY_AUTO = 10
+
+STATE_PENDING = "pendente"
+STATE_RUNNING = "executando"
+STATE_DONE = "concluído"
+STATE_FAILED = "falhou"
+STATE_CANCELLED = "cancelado"
+
+
+class Job:
+    """Um trabalho da fila: chama func(*args, **kwargs) em uma thread de trabalho"""
+
+    def __init__(self, game, event, func, args, kwargs, priority, description, notify=None,
+                 footprint=None):
+        self.game = game
+        self.event = event
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.description = description or f"{game} {event}"
+        # Mensagem mostrada ao usuário quando o trabalho termina (trabalhos manuais)
+        self.notify = notify
+        # Discos lidos/gravados (None: sem restrição além do jogo)
+        self.footprint = footprint
+        self.state = STATE_PENDING
+        self.result = None
+        self.error = None
+        self.merged = 0
+        self.progress = None
+
+    @property
+    def is_manual(self):
+        return self.priority <= PRIORITY_MANUAL
+
+
+class BackupJobQueue(QObject):
+    """Fila com prioridade, agrupamento de duplicados e serialização por jogo"""
+
+    job_queued = pyqtSignal(object)
+    job_started = pyqtSignal(object)
+    job_finished = pyqtSignal(object)
+    job_failed = pyqtSignal(object)
+    job_cancelled = pyqtSignal(object)
+    job_progress = pyqtSignal(object, object)
+    idle = pyqtSignal()
+
+    def __init__(self, workers=2, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._busy_games = set()
+        self._running_jobs = []
+        self._running = 0
+        self._stopping = False
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f"becupe-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, game, event, func, *args, priority=PRIORITY_AUTO,
+               coalesce=True, description=None, notify=None, track_progress=False,
+               footprint=None, **kwargs):
+        """
+        Enfileira um trabalho e retorna o Job.
+        Com coalesce, um trabalho pendente do mesmo jogo/evento é reaproveitado.
+        Com track_progress, func recebe progress=Progress ligado ao sinal job_progress.
+        footprint (devices.DeviceFootprint) evita rodar junto com trabalhos no mesmo disco.
+        """
+        with self._cond:
+            if coalesce:
+                for _prio, _seq, pending in self._heap:
+                    if pending.game == game and pending.event == event and pending.state == STATE_PENDING:
+                        pending.merged += 1
+                        log_event("INFO", f"Trabalho duplicado agrupado: {pending.description}")
+                        return pending
+
+            job = Job(game, event, func, args, kwargs, priority, description, notify, footprint)
+            if track_progress:
+                job.progress = Progress(lambda snapshot, job=job: self.job_progress.emit(job, snapshot))
+                kwargs["progress"] = job.progress
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._cond.notify_all()
+        self.job_queued.emit(job)
+        return job
+
+    def cancel(self, job):
+        """Cancela um trabalho pendente ou pede para o trabalho em execução parar"""
+        with self._cond:
+            for entry in self._heap:
+                if entry[2] is job:
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                    job.state = STATE_CANCELLED
+                    break
+            else:
+                if job.state == STATE_RUNNING and job.progress:
+                    job.progress.cancel()
+                return
+        log_event("INFO", f"Trabalho cancelado antes de iniciar: {job.description}")
+        self.job_cancelled.emit(job)
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._heap)
+
+    def is_busy(self):
+        with self._cond:
+            return bool(self._heap) or self._running > 0
+
+    def shutdown(self, wait=True):
+        """Para as threads; com wait, espera o trabalho em execução terminar"""
+        with self._cond:
+            self._stopping = True
+            self._heap = []
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    # ================= THREADS DE TRABALHO =================
+    def _conflicts(self, job, others):
+        if job.footprint is None:
+            return False
+        return any(o.footprint is not None and job.footprint.conflicts(o.footprint) for o in others)
+
+    def _take(self):
+        """Próximo trabalho cujo jogo e discos estão livres (chamado com o lock)"""
+        skipped = []
+        job = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            # Um trabalho que espera por disco segura os seguintes que disputam o mesmo disco
+            if entry[2].game in self._busy_games or \
+                    self._conflicts(entry[2], self._running_jobs + [e[2] for e in skipped]):
+                skipped.append(entry)
+                continue
+            job = entry[2]
+            break
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    job = self._take()
+                    if job:
+                        break
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                self._busy_games.add(job.game)
+                self._running_jobs.append(job)
+                self._running += 1
+                job.state = STATE_RUNNING
+
+            self.job_started.emit(job)
+            try:
+                job.result = job.func(*job.args, **job.kwargs)
+                job.state = STATE_DONE
+                self.job_finished.emit(job)
+            except OperationCancelled:
+                job.state = STATE_CANCELLED
+                self.job_cancelled.emit(job)
+            except Exception as e:
+                job.error = e
+                job.state = STATE_FAILED
+                log_event("ERROR", f"Trabalho falhou ({job.description}): {str(e)}")
+                self.job_failed.emit(job)
+            finally:
+                with self._cond:
+                    self._busy_games.discard(job.game)
+                    self._running_jobs.remove(job)
+                    self._running -= 1
+                    now_idle = not self._heap and self._running == 0
+                    self._cond.notify_all()
+                if now_idle:
+                    self.idle.emit()
@@ -0,0 +1,444 @@
+"""
+Benchmarks do BECUPE.
+
+Uso:
+    python benchmark.py compressao [--pequenos 600] [--grandes 3] [--tamanho-grande-mb 24]
+    python benchmark.py processos [--amostras 200]
+    python benchmark.py throttle [--tamanho-mb 200] [--limite-mb 20]
+    python benchmark.py log [--eventos 20000] [--threads 4]
+    python benchmark.py inicializacao [--rodadas 5]
+    python benchmark.py todos [--tamanho-mb 200] [--destino PASTA]
+
+Cada benchmark gera seus dados sintéticos numa pasta temporária e imprime
+uma tabela com os resultados. Logs, métricas e caches dos backups de teste
+também vão para uma pasta temporária (BECUPE_DATA_DIR), fora do logs.txt e
+da aba de estatísticas do app; só inicializacao usa os arquivos do app.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+
+# ================= DADOS SINTÉTICOS =================
+def _es2_text(rng, lines):
+    """Texto no estilo dos saves ES2 (chave = valor), bem compressível"""
+    keys = ("pos", "rot", "fuel", "money", "fatigue", "hunger", "thirst", "bolted", "damage")
+    return "".join(
+        f"{rng.choice(keys)}{rng.randrange(500)}={rng.random() * 1000:.4f}\n"
+        for _ in range(lines)
+    ).encode("utf-8")
+
+
+def make_synthetic_save(root, small_files=600, large_files=3, large_size=24 * 1024 * 1024, seed=42):
+    """
+    Cria uma pasta de save sintética: muitos arquivos ES2 pequenos e poucos
+    arquivos grandes (meio texto, meio binário aleatório). Retorna o total de bytes.
+    """
+    rng = random.Random(seed)
+    total = 0
+    for i in range(small_files):
+        folder = os.path.join(root, f"slot{i % 8}")
+        os.makedirs(folder, exist_ok=True)
+        data = _es2_text(rng, rng.randrange(20, 400))
+        with open(os.path.join(folder, f"item{i}.txt"), "wb") as f:
+            f.write(data)
+        total += len(data)
+    for i in range(large_files):
+        with open(os.path.join(root, f"defaultES2File{i}.txt"), "wb") as f:
+            written = 0
+            while written < large_size:
+                block = _es2_text(rng, 2000) + os.urandom(16 * 1024)
+                f.write(block)
+                written += len(block)
+        total += written
+    return total
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+# ================= COMPRESSÃO =================
+def bench_compression(args):
+    """create_backup (paralelo) x shutil.make_archive (implementação anterior)"""
+    from backup import create_backup
+
+    work = tempfile.mkdtemp(prefix="becupe_bench_")
+    try:
+        game = os.path.join(work, "My Summer Car")
+        dest = os.path.join(work, "out")
+        os.makedirs(game)
+        os.makedirs(dest)
+        total = make_synthetic_save(
+            game, args.pequenos, args.grandes, args.tamanho_grande_mb * 1024 * 1024
+        )
+        mb = total / (1024 * 1024)
+        print(f"Save sintético: {args.pequenos} pequenos + {args.grandes} grandes = {mb:.1f} MiB")
+        print(f"{'implementação':<28}{'tempo (s)':>10}{'MiB/s':>10}{'saída MiB':>11}{'speedup':>9}")
+
+        elapsed, archive = _timed(lambda: shutil.make_archive(os.path.join(dest, "legado"), "zip", game))
+        baseline = elapsed
+        print(f"{'make_archive (anterior)':<28}{elapsed:>10.2f}{mb / elapsed:>10.1f}"
+              f"{os.path.getsize(archive) / 1048576:>11.1f}{1.0:>9.2f}")
+
+        counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        for workers in counts:
+            elapsed, archive = _timed(
+                lambda: create_backup(game, dest, f"W{workers}", workers=workers)
+            )
+            print(f"{f'create_backup workers={workers}':<28}{elapsed:>10.2f}{mb / elapsed:>10.1f}"
+                  f"{os.path.getsize(archive) / 1048576:>11.1f}{baseline / elapsed:>9.2f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+# ================= DETECÇÃO DE PROCESSOS =================
+def _legacy_scan():
+    """Varredura da implementação anterior (process_iter + lower a cada 2s)"""
+    import psutil
+    running = set()
+    for proc in psutil.process_iter(attrs=["name"]):
+        try:
+            running.add(proc.info["name"].lower())
+        except Exception:
+            pass
+    return running
+
+
+def _simulated_hour(watcher_factory):
+    """
+    Roda o núcleo do detector por uma hora simulada (relógio falso, backend
+    real) e retorna (chamadas de poll, segundos de CPU gastos).
+    """
+    now = [0.0]
+    watcher = watcher_factory(lambda: now[0])
+    polls = 0
+    cpu_start = time.process_time()
+    while now[0] < 3600:
+        now[0] += watcher.poll()
+        polls += 1
+    return polls, time.process_time() - cpu_start
+
+
+def bench_processes(args):
+    """CPU por hora do detector de jogos: varredura a cada 2s x detector adaptativo"""
+    from process_watcher import ProcessWatcher, PsutilBackend, ProcBackend, PROCESS_NAMES
+
+    samples = args.amostras
+    cpu_start = time.process_time()
+    for _ in range(samples):
+        _legacy_scan()
+    legacy = (time.process_time() - cpu_start) / samples * 1800
+
+    print(f"{'Cenário':<44}{'polls/h':>10}{'CPU s/h':>10}")
+    print(f"{'anterior: process_iter a cada 2s':<44}{1800:>10}{legacy:>10.2f}")
+
+    backends = [("psutil", PsutilBackend)]
+    if sys.platform.startswith("linux"):
+        backends.append(("/proc", ProcBackend))
+
+    # Um "jogo" que está sempre rodando: o próprio processo do benchmark
+    own_name = PsutilBackend().scan().get(os.getpid(), "python")
+    for label, backend_cls in backends:
+        polls, cpu = _simulated_hour(lambda clock: ProcessWatcher(
+            lambda game: None, lambda game: None, backend=backend_cls(), clock=clock
+        ))
+        print(f"{f'adaptativo ({label}), nenhum jogo aberto':<44}{polls:>10}{cpu:>10.2f}")
+
+        names = dict(PROCESS_NAMES, MSC=own_name)
+        polls, cpu = _simulated_hour(lambda clock: ProcessWatcher(
+            lambda game: None, lambda game: None, backend=backend_cls(),
+            process_names=names, clock=clock
+        ))
+        print(f"{f'adaptativo ({label}), um jogo aberto':<44}{polls:>10}{cpu:>10.2f}")
+
+
+# ================= MODO ECONÔMICO (THROTTLE) =================
+def _latency_probe(path, stop, results):
+    """
+    Processo "jogo": grava 64 KiB + fsync em loop e mede a latência de cada
+    operação (em ms) até stop ser sinalizado.
+    """
+    latencies = []
+    block = os.urandom(64 * 1024)
+    with open(path, "wb") as f:
+        while not stop.is_set():
+            start = time.perf_counter()
+            f.seek(0)
+            f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.005)
+    results.put(latencies)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_throttle(args):
+    """Latência de um processo de disco concorrente: backup livre x modo econômico"""
+    import multiprocessing
+    from backup import create_backup
+    from throttle import Throttle
+    from tree_cache import TreeHashCache
+
+    work = tempfile.mkdtemp(prefix="becupe_bench_")
+    try:
+        game = os.path.join(work, "My Summer Car")
+        dest = os.path.join(work, "out")
+        os.makedirs(game)
+        os.makedirs(dest)
+        files = max(1, args.tamanho_mb // 8)
+        make_synthetic_save(game, small_files=200, large_files=files, large_size=8 * 1024 * 1024)
+
+        def scenario(label, run):
+            stop = multiprocessing.Event()
+            results = multiprocessing.Queue()
+            probe = multiprocessing.Process(
+                target=_latency_probe, args=(os.path.join(work, "probe.bin"), stop, results)
+            )
+            probe.start()
+            time.sleep(0.5)
+            elapsed = run()
+            time.sleep(0.5)
+            stop.set()
+            latencies = results.get()
+            probe.join()
+            print(f"{label:<30}{elapsed:>10.2f}{_percentile(latencies, 50):>10.2f}"
+                  f"{_percentile(latencies, 99):>10.2f}{max(latencies):>10.2f}")
+
+        def backup(throttle):
+            def run():
+                # Sem cache: o backup relê tudo como na primeira vez
+                cache = TreeHashCache(game)
+                if os.path.exists(cache.cache_file):
+                    os.remove(cache.cache_file)
+                elapsed, _ = _timed(lambda: create_backup(game, dest, "B", throttle=throttle))
+                return elapsed
+            return run
+
+        print(f"{'Cenário':<30}{'backup s':>10}{'p50 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+        scenario("sem backup", lambda: time.sleep(3) or 0.0)
+        scenario("backup sem limite", backup(None))
+        scenario(f"modo econômico {args.limite_mb} MB/s",
+                 backup(Throttle(rate=args.limite_mb * 1024 * 1024)))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+# ================= LOG =================
+def _legacy_log_event(path, event_type, message):
+    """log_event da implementação anterior: abre, acrescenta e fecha a cada chamada"""
+    from datetime import datetime
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"[{timestamp}] [{event_type}] {message}\n")
+
+
+def _log_run(func, events, threads):
+    """Chama func de várias threads; retorna (tempo total, latências em µs)"""
+    import threading
+    latencies = []
+    per_thread = events // threads
+
+    def worker(n):
+        local = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            func("BACKUP", f"Backup criado: thread {n} evento {i}")
+            local.append((time.perf_counter() - start) * 1e6)
+        latencies.extend(local)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - start, latencies
+
+
+def bench_log(args):
+    """Eventos/s e latência de quem chama: log síncrono anterior x fila em lote"""
+    import logger
+
+    work = tempfile.mkdtemp(prefix="becupe_bench_")
+    try:
+        print(f"{'implementação':<26}{'eventos/s':>12}{'p50 µs':>10}{'p99 µs':>10}{'máx µs':>10}{'linhas':>9}")
+
+        def report(label, path, elapsed, latencies):
+            with open(path, "r", encoding="utf-8") as f:
+                lines = sum(1 for _ in f)
+            print(f"{label:<26}{len(latencies) / elapsed:>12.0f}{_percentile(latencies, 50):>10.1f}"
+                  f"{_percentile(latencies, 99):>10.1f}{max(latencies):>10.1f}{lines:>9}")
+
+        path = os.path.join(work, "anterior.txt")
+        elapsed, latencies = _log_run(
+            lambda t, m: _legacy_log_event(path, t, m), args.eventos, args.threads
+        )
+        report("anterior (abre/fecha)", path, elapsed, latencies)
+
+        path = os.path.join(work, "fila.txt")
+        logger.LOG_FILE = path
+
+        def queued():
+            # Inclui o tempo de esvaziar a fila: vazão real até o disco
+            result = _log_run(logger.log_event, args.eventos, args.threads)
+            logger.flush(timeout=60)
+            return result
+
+        elapsed, (_, latencies) = _timed(queued)
+        report("fila em lote", path, elapsed, latencies)
+    finally:
+        logger.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+
+# ================= INICIALIZAÇÃO =================
+def _startup_run(args):
+    """Roda main.py uma vez; retorna (imports ms, pronto ms, processo ms)"""
+    import subprocess
+    env = dict(os.environ, BECUPE_STARTUP_TIMING="1")
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, main_py, *args], env=env, capture_output=True,
+                            text=True, timeout=120)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"main.py saiu com {result.returncode}")
+    line = [l for l in result.stdout.splitlines() if l.startswith("imports_ms=")][-1]
+    values = dict(part.split("=") for part in line.split())
+    return float(values["imports_ms"]), float(values["pronto_ms"]), elapsed
+
+
+def bench_startup(args):
+    """Tempo até a bandeja ficar pronta ao abrir com o Windows x abrir a janela"""
+    import subprocess
+
+    print("Usa o config.json/logs.txt do app: feche o BECUPE e aceite os termos antes.")
+    print(f"{'modo':<26}{'imports ms':>12}{'pronto ms':>12}{'processo ms':>13}")
+    for label, argv in (("com o Windows (bandeja)", ["startup"]), ("janela aberta", [])):
+        runs = []
+        try:
+            for _ in range(args.rodadas):
+                runs.append(_startup_run(argv))
+        except (RuntimeError, subprocess.SubprocessError) as e:
+            print(f"{label:<26} falhou: {e}")
+            continue
+        # Mediana: a primeira rodada paga o cache frio do disco
+        imports, ready, total = (_percentile([r[i] for r in runs], 50) for i in range(3))
+        print(f"{label:<26}{imports:>12.0f}{ready:>12.0f}{total:>13.0f}")
+
+
+# ================= TODOS OS JOGOS =================
+def bench_all_games(args):
+    """Backup dos dois jogos: um depois do outro x em paralelo x pela regra de discos"""
+    from backup import create_backup
+    from devices import footprint, run_scheduled
+    from tree_cache import TreeHashCache
+
+    work = tempfile.mkdtemp(prefix="becupe_bench_")
+    dest_root = tempfile.mkdtemp(prefix="becupe_bench_", dir=args.destino) if args.destino else work
+    try:
+        games = {}
+        for game in ("My Summer Car", "My Winter Car"):
+            games[game] = os.path.join(work, game)
+            os.makedirs(games[game])
+            files = max(1, args.tamanho_mb // 16)
+            make_synthetic_save(games[game], small_files=300, large_files=files, large_size=8 * 1024 * 1024)
+
+        def tasks(label, use_footprint):
+            dest = os.path.join(dest_root, label)
+            os.makedirs(dest, exist_ok=True)
+            result = []
+            for game, path in games.items():
+                # Sem cache: cada cenário relê tudo do disco
+                cache = TreeHashCache(path)
+                if os.path.exists(cache.cache_file):
+                    os.remove(cache.cache_file)
+                fp = footprint(path, dest) if use_footprint else None
+                result.append((fp, lambda path=path, dest=dest, game=game: create_backup(path, dest, game[:4])))
+            return result
+
+        def sequential(items):
+            return [(func(), None) for _fp, func in items]
+
+        fp = footprint(next(iter(games.values())), dest_root)
+        print(f"Discos: {fp}")
+        print(f"{'cenário':<28}{'segundos':>10}")
+        for label, runner, use_footprint in (
+            ("um depois do outro", sequential, False),
+            ("em paralelo (sem regra)", run_scheduled, False),
+            ("regra de discos", run_scheduled, True),
+        ):
+            items = tasks(label.split()[0], use_footprint)
+            elapsed, results = _timed(lambda: runner(items))
+            errors = [e for _r, e in results if e]
+            if errors:
+                raise errors[0]
+            print(f"{label:<28}{elapsed:>10.2f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+        if dest_root != work:
+            shutil.rmtree(dest_root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do BECUPE")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    p = sub.add_parser("compressao", help=bench_compression.__doc__)
+    p.add_argument("--pequenos", type=int, default=600)
+    p.add_argument("--grandes", type=int, default=3)
+    p.add_argument("--tamanho-grande-mb", type=int, default=24)
+    p.set_defaults(func=bench_compression)
+
+    p = sub.add_parser("processos", help=bench_processes.__doc__)
+    p.add_argument("--amostras", type=int, default=200)
+    p.set_defaults(func=bench_processes)
+
+    p = sub.add_parser("throttle", help=bench_throttle.__doc__)
+    p.add_argument("--tamanho-mb", type=int, default=200)
+    p.add_argument("--limite-mb", type=int, default=20)
+    p.set_defaults(func=bench_throttle)
+
+    p = sub.add_parser("log", help=bench_log.__doc__)
+    p.add_argument("--eventos", type=int, default=20000)
+    p.add_argument("--threads", type=int, default=4)
+    p.set_defaults(func=bench_log)
+
+    p = sub.add_parser("inicializacao", help=bench_startup.__doc__)
+    p.add_argument("--rodadas", type=int, default=5)
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("todos", help=bench_all_games.__doc__)
+    p.add_argument("--tamanho-mb", type=int, default=200, help="Tamanho de cada save")
+    p.add_argument("--destino", help="Pasta em outro disco para gravar os backups")
+    p.set_defaults(func=bench_all_games)
+
+    args = parser.parse_args(argv)
+    if args.func is bench_startup:
+        return args.func(args)
+
+    # Antes de importar os módulos do app: app_paths lê a variável na importação
+    data_dir = tempfile.mkdtemp(prefix="becupe_bench_data_")
+    os.environ["BECUPE_DATA_DIR"] = data_dir
+    try:
+        args.func(args)
+    finally:
+        if "logger" in sys.modules:
+            sys.modules["logger"].shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Catálogo (SQLite) dos backups de uma pasta de backups.
+
+O banco fica em <pasta de backups>/.becupe/catalog.sqlite3 e é atualizado
+por create_backup. Listar, filtrar e achar "o último backup do MWC antes de
+tal data" viram consultas em índice, sem percorrer as pastas por dia.
+
+Arquivos copiados ou apagados por fora do app são reconciliados por
+rescan(): só as pastas cujo mtime mudou desde a última varredura são
+listadas de novo.
+"""
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from datetime import datetime
+
+from app_paths import get_meta_dir, META_DIR_NAME
+from chunk_store import is_chunk_snapshot, read_snapshot
+from logger import log_event
+from manifest import read_manifest
+from tree_cache import merkle_root
+
+CATALOG_FILE = "catalog.sqlite3"
+CATALOG_VERSION = 1
+
+EVENT_MANUAL = "MANUAL"
+EVENT_PRE_RESTORE = "PRE_RESTORE"
+
+# <JOGO>[_<EVENTO>]_<AAAA-MM-DD_HH-MM-SS>.becupe
+_NAME_RE = re.compile(r"^(?P<prefix>.+)_(?P<stamp>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.becupe$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    game TEXT NOT NULL,
+    event TEXT NOT NULL,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    backend TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    base TEXT,
+    tree_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS backups_game_event_created ON backups (game, event, created);
+CREATE INDEX IF NOT EXISTS backups_created ON backups (created);
+CREATE INDEX IF NOT EXISTS backups_dir ON backups (dir);
+CREATE TABLE IF NOT EXISTS dirs (
+    dir TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+_COLUMNS = ("path", "dir", "game", "event", "created", "size", "files",
+            "backend", "kind", "base", "tree_hash")
+
+
+def parse_backup_name(name):
+    """
+    Extrai (jogo, evento, data) do nome de um .becupe.
+    Nomes sem data reconhecível retornam data None.
+    """
+    match = _NAME_RE.match(name)
+    if match:
+        prefix = match.group("prefix")
+        created = datetime.strptime(match.group("stamp"), "%Y-%m-%d_%H-%M-%S")
+    else:
+        prefix = os.path.splitext(name)[0]
+        created = None
+    game, _, event = prefix.partition("_")
+    return game, event or EVENT_MANUAL, created
+
+
+def describe_backup(path):
+    """
+    Lê os metadados de um .becupe (zip, incremental, antigo ou índice de
+    blocos) no formato de uma linha do catálogo, exceto path/dir.
+    """
+    game, event, created = parse_backup_name(os.path.basename(path))
+    st = os.stat(path)
+    info = {
+        "game": game,
+        "event": event,
+        "created": created.timestamp() if created else st.st_mtime,
+        "size": st.st_size,
+        "base": None,
+        "tree_hash": None,
+    }
+    if is_chunk_snapshot(path):
+        snapshot = read_snapshot(path)
+        info.update(
+            files=len(snapshot["files"]),
+            backend="chunks",
+            kind="chunks",
+            tree_hash=merkle_root(snapshot["files"], snapshot.get("dirs", [])),
+        )
+        return info
+
+    with zipfile.ZipFile(path, "r") as zip_ref:
+        manifest = read_manifest(zip_ref)
+        if manifest is None:
+            info.update(
+                files=sum(1 for i in zip_ref.infolist() if not i.is_dir()),
+                backend="zip",
+                kind="legacy",
+            )
+            return info
+    info.update(
+        files=len(manifest["files"]),
+        backend="zip",
+        kind=manifest["type"],
+        base=manifest.get("base"),
+        tree_hash=manifest.get("tree_hash"),
+    )
+    return info
+
+
+class BackupCatalog:
+    """Índice dos backups de uma pasta de backups (caminhos relativos a ela)"""
+
+    def __init__(self, backup_root):
+        self.backup_root = os.path.abspath(backup_root)
+        meta_dir = get_meta_dir(self.backup_root)
+        os.makedirs(meta_dir, exist_ok=True)
+        self.db_file = os.path.join(meta_dir, CATALOG_FILE)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f"PRAGMA user_version={CATALOG_VERSION}")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ================= CAMINHOS =================
+    def _rel(self, path):
+        try:
+            rel = os.path.relpath(os.path.abspath(path), self.backup_root)
+        except ValueError:
+            # Outro drive no Windows: guarda o caminho absoluto
+            rel = os.path.abspath(path)
+        return rel.replace(os.sep, "/")
+
+    def _abs(self, rel):
+        if os.path.isabs(rel):
+            return os.path.normpath(rel)
+        return os.path.normpath(os.path.join(self.backup_root, *rel.split("/")))
+
+    def _dir_of(self, rel):
+        return rel.rpartition("/")[0]
+
+    # ================= ESCRITA =================
+    def record(self, path, **info):
+        """Registra (ou atualiza) um backup. info segue describe_backup()"""
+        rel = self._rel(path)
+        row = dict(info, path=rel, dir=self._dir_of(rel))
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO backups ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                [row.get(col) for col in _COLUMNS]
+            )
+
+    def record_file(self, path):
+        """Registra um .becupe lendo os metadados do próprio arquivo"""
+        self.record(path, **describe_backup(path))
+
+    def remove(self, path):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM backups WHERE path = ?", (self._rel(path),))
+
+    # ================= CONSULTAS =================
+    def _row(self, row):
+        entry = dict(row)
+        entry["path"] = self._abs(row["path"])
+        return entry
+
+    def list(self, game=None, event=None, since=None, until=None, limit=None, newest_first=True):
+        """
+        Backups filtrados por jogo, evento e intervalo de datas (datetime,
+        since inclusivo, until exclusivo). Cada item é um dict com o caminho
+        absoluto em "path".
+        """
+        where, params = [], []
+        if game:
+            where.append("game = ?")
+            params.append(game)
+        if event:
+            where.append("event = ?")
+            params.append(event)
+        if since:
+            where.append("created >= ?")
+            params.append(since.timestamp())
+        if until:
+            where.append("created < ?")
+            params.append(until.timestamp())
+        sql = "SELECT * FROM backups"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created " + ("DESC" if newest_first else "ASC")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [self._row(row) for row in self._db.execute(sql, params)]
+
+    def latest(self, game, event=None, before=None):
+        """Backup mais recente do jogo (e evento) antes da data informada, ou None"""
+        found = self.list(game=game, event=event, until=before, limit=1)
+        return found[0] if found else None
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM backups").fetchone()[0]
+
+    def total_size(self, game=None):
+        sql, params = "SELECT COALESCE(SUM(size), 0) FROM backups", []
+        if game:
+            sql += " WHERE game = ?"
+            params.append(game)
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()[0]
+
+    # ================= RECONCILIAÇÃO =================
+    def _scan_dirs(self):
+        """{pasta relativa: mtime_ns} de todas as pastas da árvore de backups"""
+        found = {}
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            path = self._abs(rel) if rel else self.backup_root
+            try:
+                found[rel] = os.stat(path).st_mtime_ns
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False) and entry.name != META_DIR_NAME:
+                            stack.append(f"{rel}/{entry.name}" if rel else entry.name)
+            except OSError:
+                found.pop(rel, None)
+        return found
+
+    def rescan(self):
+        """
+        Reconcilia o catálogo com o disco. Só pastas novas ou com mtime
+        diferente são listadas (criar/apagar um arquivo muda o mtime da pasta).
+        Retorna (adicionados, removidos).
+        """
+        current = self._scan_dirs()
+        with self._lock:
+            known = dict(self._db.execute("SELECT dir, mtime_ns FROM dirs"))
+
+        added = removed = 0
+        for rel, mtime_ns in current.items():
+            if known.get(rel) == mtime_ns:
+                continue
+            a, r = self._rescan_dir(rel)
+            added += a
+            removed += r
+            with self._lock, self._db:
+                self._db.execute("INSERT OR REPLACE INTO dirs (dir, mtime_ns) VALUES (?, ?)", (rel, mtime_ns))
+
+        gone = [rel for rel in known if rel not in current]
+        if gone:
+            with self._lock, self._db:
+                for rel in gone:
+                    removed += self._db.execute("DELETE FROM backups WHERE dir = ?", (rel,)).rowcount
+                    self._db.execute("DELETE FROM dirs WHERE dir = ?", (rel,))
+
+        # Backups manuais gravados fora da pasta de backups não têm pasta varrida
+        with self._lock:
+            outside = [row[0] for row in self._db.execute(
+                "SELECT path FROM backups WHERE dir NOT IN (SELECT dir FROM dirs)"
+            )]
+        missing = [rel for rel in outside if not os.path.exists(self._abs(rel))]
+        if missing:
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM backups WHERE path = ?", [(rel,) for rel in missing])
+            removed += len(missing)
+
+        if added or removed:
+            log_event("CATALOG", f"Catálogo atualizado: {added} backups adicionados, {removed} removidos")
+        return added, removed
+
+    def _rescan_dir(self, rel):
+        path = self._abs(rel) if rel else self.backup_root
+        on_disk = set()
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".becupe"):
+                    on_disk.add(f"{rel}/{entry.name}" if rel else entry.name)
+        with self._lock:
+            listed = {row[0] for row in self._db.execute("SELECT path FROM backups WHERE dir = ?", (rel,))}
+
+        added = 0
+        for item in sorted(on_disk - listed):
+            try:
+                self.record_file(self._abs(item))
+                added += 1
+            except (OSError, ValueError, zipfile.BadZipFile) as e:
+                log_event("ERROR", f"Backup ignorado pelo catálogo ({item}): {str(e)}")
+
+        stale = listed - on_disk
+        if stale:
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM backups WHERE path = ?", [(item,) for item in stale])
+        return added, len(stale)
@@ -0,0 +1,285 @@
+"""
+Repositório de blocos com deduplicação (endereçado por conteúdo).
+
+Os arquivos do save são divididos em blocos definidos pelo conteúdo, cada
+bloco é identificado pelo seu SHA-256 e gravado uma única vez em
+<pasta de backups>/.becupe/store/chunks. Cada backup vira um índice pequeno
+(.becupe em JSON) que aponta para os blocos, então o espaço usado cresce com
+o volume de dados alterados, não com o número de backups. Blocos que nenhum
+backup usa mais são removidos por mark-and-sweep.
+
+Cortes: cada byte é misturado com os 7 seguintes (rodadas de XOR com o
+buffer deslocado, como inteiro grande, e permutações de bytes com
+bytes.translate) e vira um bit; um bloco termina onde esses bits formam um
+padrão fixo (bytes.find), com a normalização do FastCDC: padrão de 18 bits
+antes do tamanho médio, de 14 depois. O corte só depende dos bytes vizinhos,
+então inserções no começo do arquivo não deslocam os blocos seguintes, e
+tudo roda em C em vez de um hash byte a byte em Python. Os arquivos são
+lidos em janelas de READ_WINDOW bytes.
+
+Gravar blocos + registrar o índice e a coleta de lixo só rodam com o lock
+do repositório (ChunkStore.lock): sem ele a coleta apagaria blocos que um
+backup em andamento acabou de gravar ou reaproveitar, e dois backups ao
+mesmo tempo poderiam perder uma entrada do registro.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import zlib
+
+from app_paths import get_meta_dir
+from file_lock import FileLock
+
+SNAPSHOT_FORMAT = "becupe-chunks"
+SNAPSHOT_VERSION = 1
+LOCK_FILE = "lock"
+
+# Tamanhos dos blocos (bytes)
+MIN_CHUNK = 16 * 1024
+AVG_CHUNK = 64 * 1024
+MAX_CHUNK = 256 * 1024
+READ_WINDOW = 1024 * 1024
+
+# Deslocamentos (em bytes) de cada rodada da mistura: cada bit depende de
+# 1 + 1 + 2 + 4 = 8 bytes, o seu e os 7 seguintes
+_MIX_SHIFTS = (1, 2, 4)
+_LOOKAHEAD = sum(_MIX_SHIFTS)
+
+
+def _shuffled(values, rng):
+    values = list(values)
+    rng.shuffle(values)
+    return bytes(values)
+
+
+# Tabelas e padrões fixos: precisam ser iguais entre execuções para deduplicar
+_rng = random.Random(0x6265637570)
+_FIRST_TABLE = _shuffled(range(256), _rng)
+# Permutação depois de cada rodada; a última já dá o bit (metade dos bytes vira 1)
+_ROUND_TABLES = [_shuffled(range(256), _rng) for _ in _MIX_SHIFTS[1:]]
+_ROUND_TABLES.append(_shuffled([0] * 128 + [1] * 128, _rng))
+# Antes do tamanho médio o padrão é mais longo (corte mais raro), depois mais curto
+_PATTERN_SMALL = bytes(_rng.getrandbits(1) for _ in range(18))
+_PATTERN_LARGE = _PATTERN_SMALL[-14:]
+del _rng
+
+
+def _cut_bits(data):
+    """Um byte 0/1 por byte de data, calculado dele e dos _LOOKAHEAD seguintes"""
+    length = len(data)
+    mixed = data.translate(_FIRST_TABLE)
+    for shift, table in zip(_MIX_SHIFTS, _ROUND_TABLES):
+        value = int.from_bytes(mixed, "little")
+        # Byte i combinado com o byte i + shift (depois do fim entram zeros)
+        mixed = (value ^ (value >> (8 * shift))).to_bytes(length, "little").translate(table)
+    return mixed
+
+
+def chunk_boundaries(data, final=True):
+    """
+    Gera os tamanhos dos blocos definidos pelo conteúdo de data (bytes).
+    Com final=False (mais dados virão), para antes do trecho final cujo
+    corte ainda pode depender dos bytes que faltam.
+    """
+    length = len(data)
+    bits = _cut_bits(data)
+    start = 0
+    while start < length:
+        remaining = length - start
+        if not final and remaining < MAX_CHUNK + _LOOKAHEAD:
+            return
+        if remaining <= MIN_CHUNK:
+            yield remaining
+            return
+        end = start + min(remaining, MAX_CHUNK)
+        normal = start + min(remaining, AVG_CHUNK)
+        # O padrão termina no byte do corte: blocos de MIN_CHUNK a MAX_CHUNK
+        found = bits.find(_PATTERN_SMALL, start + MIN_CHUNK - len(_PATTERN_SMALL), normal)
+        if found >= 0:
+            cut = found + len(_PATTERN_SMALL)
+        else:
+            found = bits.find(_PATTERN_LARGE, normal - len(_PATTERN_LARGE), end)
+            cut = found + len(_PATTERN_LARGE) if found >= 0 else end
+        yield cut - start
+        start = cut
+
+
+def is_chunk_snapshot(path):
+    """Verifica se o .becupe é um índice do repositório de blocos"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64)
+        return head.lstrip().startswith(b"{") and SNAPSHOT_FORMAT.encode() in head
+    except OSError:
+        return False
+
+
+def read_snapshot(path):
+    """Lê o índice de um backup do repositório de blocos"""
+    with open(path, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Arquivo não é um índice de blocos: {path}")
+    return snapshot
+
+
+class ChunkStore:
+    """Repositório de blocos de uma pasta de backups"""
+
+    def __init__(self, backup_root):
+        self.backup_root = os.path.abspath(backup_root)
+        self.store_dir = os.path.join(get_meta_dir(self.backup_root), "store")
+        self.chunks_dir = os.path.join(self.store_dir, "chunks")
+        self.registry_file = os.path.join(self.store_dir, "snapshots.json")
+        # Bytes (comprimidos) de blocos novos gravados por esta instância
+        self.bytes_written = 0
+        os.makedirs(self.chunks_dir, exist_ok=True)
+
+    @classmethod
+    def for_snapshot(cls, snapshot_path, snapshot):
+        """Abre o repositório referenciado por um índice"""
+        root = os.path.join(os.path.dirname(os.path.abspath(snapshot_path)), snapshot["root"])
+        return cls(os.path.normpath(root))
+
+    def lock(self):
+        """Lock exclusivo do repositório (entre threads e processos)"""
+        return FileLock(os.path.join(self.store_dir, LOCK_FILE))
+
+    # ================= BLOCOS =================
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def has_chunk(self, digest):
+        return os.path.exists(self._chunk_path(digest))
+
+    def put_chunk(self, data):
+        """Grava o bloco se ainda não existir e retorna o hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            compressed = zlib.compress(data, 6)
+            with open(tmp, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp, path)
+            self.bytes_written += len(compressed)
+        return digest
+
+    def read_chunk(self, digest):
+        with open(self._chunk_path(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Bloco corrompido: {digest}")
+        return data
+
+    def put_file(self, path, throttle=None):
+        """Divide o arquivo em blocos e retorna a lista [[hash, tamanho], ...]"""
+        chunks = []
+        pending = b""
+        with open(path, "rb") as f:
+            while True:
+                block = throttle.read(f, READ_WINDOW) if throttle else f.read(READ_WINDOW)
+                final = len(block) < READ_WINDOW
+                data = pending + block
+                view = memoryview(data)
+                offset = 0
+                for size in chunk_boundaries(data, final):
+                    chunks.append([self.put_chunk(view[offset:offset + size]), size])
+                    offset += size
+                # O fim da janela vai junto com a próxima
+                pending = data[offset:]
+                if final:
+                    return chunks
+
+    def write_file(self, chunks, dest_path):
+        """Remonta um arquivo a partir da lista de blocos"""
+        with open(dest_path, "wb") as f:
+            for digest, _size in chunks:
+                f.write(self.read_chunk(digest))
+
+    # ================= ÍNDICES (SNAPSHOTS) =================
+    def _load_registry(self):
+        if not os.path.exists(self.registry_file):
+            return []
+        try:
+            with open(self.registry_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save_registry(self, registry):
+        tmp = self.registry_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(registry, f, indent=1)
+        os.replace(tmp, self.registry_file)
+
+    def write_snapshot(self, dest_path, files, dirs):
+        """
+        Grava o índice .becupe e registra o backup no repositório.
+        Chamar com lock(), o mesmo usado em put_file().
+        """
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "root": os.path.relpath(self.backup_root, os.path.dirname(os.path.abspath(dest_path))),
+            "files": files,
+            "dirs": dirs,
+        }
+        tmp = dest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, dest_path)
+
+        registry = self._load_registry()
+        rel = os.path.relpath(os.path.abspath(dest_path), self.backup_root)
+        if rel not in registry:
+            registry.append(rel)
+            self._save_registry(registry)
+
+    def prune_missing(self):
+        """Tira do registro backups apagados (com lock()). Retorna quantos foram removidos"""
+        registry = self._load_registry()
+        alive = [
+            rel for rel in registry
+            if os.path.exists(os.path.join(self.backup_root, rel))
+        ]
+        if len(alive) != len(registry):
+            self._save_registry(alive)
+        return len(registry) - len(alive)
+
+    def collect_garbage(self):
+        """
+        Mark-and-sweep: marca os blocos usados pelos backups registrados e
+        apaga os demais. Chamar com lock().
+
+        Returns:
+            (blocos_removidos, bytes_liberados)
+        """
+        self.prune_missing()
+        used = set()
+        for rel in self._load_registry():
+            try:
+                snapshot = read_snapshot(os.path.join(self.backup_root, rel))
+            except (OSError, ValueError):
+                # Índice ilegível: na dúvida não apaga nada
+                return 0, 0
+            for entry in snapshot["files"].values():
+                used.update(digest for digest, _size in entry["chunks"])
+
+        removed = 0
+        freed = 0
+        for prefix in os.listdir(self.chunks_dir):
+            prefix_dir = os.path.join(self.chunks_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name in used or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(prefix_dir, name)
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+        return removed, freed
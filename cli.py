@@ -0,0 +1,245 @@
+"""
+Linha de comando do BECUPE (sem Qt, sem bandeja, sem termos na tela).
+
+Uso:
+    python cli.py backup [MSC] [MWC] [--destino PASTA] [--evento NOME]
+    python cli.py restore MSC [ARQUIVO] [--modo staged|diff|full]
+    python cli.py list [MSC] [--evento OPEN] [--limite 20]
+    python cli.py verify [ARQUIVO ...] [--jogo MSC] [--todos]
+    python cli.py watch
+
+A pasta de backups e as demais opções vêm do config.json da bandeja.
+backup sem --evento faz um backup manual (zip completo, como o botão da
+aba de backup); com --evento segue as regras dos backups automáticos
+(incremental, blocos, limpeza). Vários jogos rodam em paralelo quando a
+fila de discos permite (devices.py). Códigos de saída: 0 ok, 1 falha, 2 uso
+inválido (argparse).
+"""
+import argparse
+import functools
+import os
+import sys
+from datetime import datetime
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+
+GAMES = ("MSC", "MWC")
+
+
+def _game_arg(value):
+    # nargs="*" com choices recusa a lista vazia no argparse: valida aqui
+    game = value.upper()
+    if game not in GAMES:
+        raise argparse.ArgumentTypeError(f"jogo inválido: {value} (use {' ou '.join(GAMES)})")
+    return game
+
+
+def _fail(message):
+    print(f"Erro: {message}", file=sys.stderr)
+    return EXIT_FAILED
+
+
+def _game_paths():
+    from paths import get_game_paths
+    try:
+        return get_game_paths()
+    except KeyError:
+        # get_game_paths usa %USERPROFILE%
+        raise SystemExit(_fail("USERPROFILE não definido; não sei onde ficam os saves"))
+
+
+def _backup_folder():
+    from config import config_store
+    return config_store.get_str("folder")
+
+
+def _progress_printer(quiet):
+    """Progresso numa linha só do terminal (nada com --quieto ou fora de um tty)"""
+    from progress import Progress, describe
+    if quiet or not sys.stderr.isatty():
+        return None
+
+    def show(snapshot):
+        print(f"\r{describe(snapshot):<60}", end="", file=sys.stderr, flush=True)
+    return Progress(show)
+
+
+# ================= COMANDOS =================
+def cmd_backup(args):
+    """Cria um backup agora (sem JOGO: todos os jogos encontrados)"""
+    from backup import create_backup
+    from auto_backup import event_backup_plan, event_backup_job
+    from devices import footprint, run_scheduled
+
+    games = _game_paths()
+    folder = _backup_folder()
+    status = EXIT_OK
+    tasks = []
+    for game in args.jogos or [g for g in GAMES if os.path.isdir(games[g])]:
+        if not os.path.isdir(games[game]):
+            status = _fail(f"pasta de save de {game} não encontrada: {games[game]}")
+            continue
+        if args.evento:
+            plan = event_backup_plan(game, args.evento.lower(), force=True)
+            if not plan:
+                return _fail("configure a pasta de backups na bandeja (ou use --destino sem --evento)")
+            day_folder, prefix, retention, options = plan
+            dest = args.destino or day_folder
+            run = functools.partial(event_backup_job, games[game], game, dest, prefix, retention, **options)
+        else:
+            dest = args.destino or (folder and os.path.join(folder, datetime.now().strftime("%Y-%m-%d")))
+            if not dest:
+                return _fail("informe --destino ou configure a pasta de backups na bandeja")
+            os.makedirs(dest, exist_ok=True)
+            run = functools.partial(create_backup, games[game], dest, game, catalog_root=folder or None)
+        tasks.append((game, footprint(games[game], dest), run))
+    if not tasks:
+        return status
+
+    # Um jogo só mostra a barra de progresso; vários em paralelo não
+    progress = _progress_printer(args.quieto) if len(tasks) == 1 else None
+    results = run_scheduled([(fp, functools.partial(run, progress=progress)) for _game, fp, run in tasks])
+    if progress:
+        print(file=sys.stderr)
+    for (game, _fp, _run), (path, error) in zip(tasks, results):
+        if error:
+            status = _fail(f"backup de {game} falhou: {error}")
+        else:
+            print(path)
+    return status
+
+
+def cmd_restore(args):
+    """Restaura um backup na pasta de save do jogo"""
+    from restore import restore_backup
+
+    games = _game_paths()
+    file = args.arquivo
+    if not file:
+        folder = _backup_folder()
+        if not folder or not os.path.isdir(folder):
+            return _fail("informe o arquivo ou configure a pasta de backups na bandeja")
+        from catalog import BackupCatalog
+        with BackupCatalog(folder) as catalog:
+            catalog.rescan()
+            latest = catalog.latest(args.jogo)
+        if not latest:
+            return _fail(f"nenhum backup de {args.jogo} em {folder}")
+        file = latest["path"]
+    if not os.path.isfile(file):
+        return _fail(f"arquivo não encontrado: {file}")
+
+    progress = _progress_printer(args.quieto)
+    try:
+        restore_backup(file, games[args.jogo], progress=progress, mode=args.modo)
+    except Exception as e:
+        return _fail(f"restauração falhou: {e}")
+    finally:
+        if progress:
+            print(file=sys.stderr)
+    print(f"{args.jogo} restaurado de {file}")
+    return EXIT_OK
+
+
+def cmd_list(args):
+    """Lista os backups do catálogo"""
+    from catalog import BackupCatalog
+
+    folder = _backup_folder()
+    if not folder or not os.path.isdir(folder):
+        return _fail("configure a pasta de backups na bandeja")
+    with BackupCatalog(folder) as catalog:
+        catalog.rescan()
+        entries = catalog.list(game=args.jogo, event=args.evento, limit=args.limite)
+    for entry in entries:
+        created = datetime.fromtimestamp(entry["created"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{created}  {entry['game']:<4} {entry['event']:<12} {entry['kind']:<11} "
+              f"{entry['size'] / 1048576:>8.1f} MiB  {entry['path']}")
+    return EXIT_OK
+
+
+def cmd_verify(args):
+    """Confere a integridade dos backups (cadeia completa + CRC/hash)"""
+    from restore import verify_backup
+
+    files = list(args.arquivos)
+    if args.todos or args.jogo or not files:
+        folder = _backup_folder()
+        if not folder or not os.path.isdir(folder):
+            return _fail("informe os arquivos ou configure a pasta de backups na bandeja")
+        from catalog import BackupCatalog
+        with BackupCatalog(folder) as catalog:
+            catalog.rescan()
+            limit = None if args.todos else 1
+            if args.jogo:
+                files += [e["path"] for e in catalog.list(game=args.jogo, limit=limit)]
+            else:
+                for game in GAMES:
+                    files += [e["path"] for e in catalog.list(game=game, limit=limit)]
+
+    failed = 0
+    for file in files:
+        problems = verify_backup(file)
+        if problems:
+            failed += 1
+            print(f"FALHA  {file}")
+            for problem in problems:
+                print(f"       {problem}")
+        else:
+            print(f"ok     {file}")
+    print(f"{len(files) - failed} de {len(files)} backups íntegros")
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def cmd_watch(args):
+    """Daemon: backups automáticos sem a interface"""
+    from daemon import run_daemon
+    return run_daemon()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="becupe", description="BECUPE pela linha de comando")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("backup", help=cmd_backup.__doc__)
+    p.add_argument("jogos", nargs="*", type=_game_arg, metavar="JOGO",
+                   help="MSC e/ou MWC (padrão: todos, em paralelo quando os discos permitem)")
+    p.add_argument("--destino", help="Pasta do backup (padrão: pasta do dia na pasta de backups)")
+    p.add_argument("--evento", help="Segue as regras dos backups automáticos com este nome de evento")
+    p.add_argument("--quieto", action="store_true", help="Sem barra de progresso")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("restore", help=cmd_restore.__doc__)
+    p.add_argument("jogo", choices=GAMES, metavar="JOGO")
+    p.add_argument("arquivo", nargs="?", help="Backup .becupe (padrão: o mais recente do jogo)")
+    p.add_argument("--modo", choices=("staged", "diff", "full"), default="staged",
+                   help="staged (padrão, pode ser desfeito), diff ou full")
+    p.add_argument("--quieto", action="store_true", help="Sem barra de progresso")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("list", help=cmd_list.__doc__)
+    p.add_argument("jogo", nargs="?", choices=GAMES, metavar="JOGO")
+    p.add_argument("--evento", help="OPEN, CLOSE, AUTOSAVE, SCHEDULED, MANUAL...")
+    p.add_argument("--limite", type=int, default=20)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("verify", help=cmd_verify.__doc__)
+    p.add_argument("arquivos", nargs="*", metavar="ARQUIVO")
+    p.add_argument("--jogo", choices=GAMES)
+    p.add_argument("--todos", action="store_true",
+                   help="Todos os backups do catálogo (padrão: o mais recente de cada jogo)")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("watch", help=cmd_watch.__doc__)
+    p.set_defaults(func=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
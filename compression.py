@@ -0,0 +1,87 @@
+"""
+Escolha adaptativa do método de compressão de cada arquivo do backup.
+
+Uma amostra do conteúdo é usada para estimar a entropia (bits por byte).
+Dados já comprimidos (fotos PNG/JPG da câmera do jogo, áudio, zips) são
+gravados sem compressão para não gastar CPU enquanto o jogo carrega;
+saves em texto recebem o método com a melhor taxa do perfil escolhido.
+"""
+import math
+import os
+import zipfile
+from collections import Counter
+
+PROFILE_FAST = "fast"
+PROFILE_BALANCED = "balanced"
+PROFILE_SMALL = "small"
+
+PROFILES = {
+    PROFILE_FAST: "Rápido",
+    PROFILE_BALANCED: "Equilibrado",
+    PROFILE_SMALL: "Menor tamanho",
+}
+
+# Extensões que já chegam comprimidas
+COMPRESSED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".ogg", ".mp3", ".zip", ".gz", ".7z",
+    ".rar", ".bz2", ".xz", ".becupe",
+}
+
+SAMPLE_SIZE = 64 * 1024
+TINY_FILE = 128
+# Acima disso a amostra é praticamente aleatória (incompressível)
+INCOMPRESSIBLE_ENTROPY = 7.5
+TEXT_ENTROPY = 5.5
+
+
+def sample(data):
+    """Amostra do começo e do meio dos dados"""
+    if len(data) <= 2 * SAMPLE_SIZE:
+        return data
+    middle = len(data) // 2
+    return bytes(data[:SAMPLE_SIZE]) + bytes(data[middle:middle + SAMPLE_SIZE])
+
+
+def entropy(data):
+    """Entropia de Shannon em bits por byte (0 a 8)"""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(
+        count / total * math.log2(count / total)
+        for count in Counter(data).values()
+    )
+
+
+def choose_method(path, data, size, profile=PROFILE_BALANCED):
+    """
+    Escolhe (método zip, nível) para um arquivo.
+
+    Args:
+        path: Caminho do arquivo (a extensão conta)
+        data: Conteúdo do arquivo ou uma amostra dele
+        size: Tamanho total do arquivo
+        profile: PROFILE_FAST, PROFILE_BALANCED ou PROFILE_SMALL
+    """
+    if size < TINY_FILE:
+        return zipfile.ZIP_STORED, 0
+    if os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED, 0
+
+    bits = entropy(sample(data))
+    if bits >= INCOMPRESSIBLE_ENTROPY:
+        return zipfile.ZIP_STORED, 0
+
+    if profile == PROFILE_FAST:
+        return zipfile.ZIP_DEFLATED, 1
+    if profile == PROFILE_SMALL:
+        if bits <= TEXT_ENTROPY:
+            # Texto (saves ES2): bzip2 costuma ganhar do lzma e é mais rápido
+            return zipfile.ZIP_BZIP2, 9
+        if size >= SAMPLE_SIZE:
+            return zipfile.ZIP_LZMA, 6
+        return zipfile.ZIP_DEFLATED, 9
+    # Equilibrado: dados pouco compressíveis não merecem nível alto
+    if bits > TEXT_ENTROPY + 1:
+        return zipfile.ZIP_DEFLATED, 1
+    return zipfile.ZIP_DEFLATED, 6
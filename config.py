@@ -1,48 +1,225 @@
+"""
+Configuração da aplicação (config.json).
+
+ConfigStore mantém o config em memória: leituras não tocam o disco e só
+relêem o arquivo se o mtime/tamanho dele mudou (edição externa), conferido
+no máximo a cada CHECK_INTERVAL segundos. Alterações são juntadas e gravadas
+uma vez, SAVE_DELAY segundos depois da última, num arquivo temporário que
+substitui o config.json de forma atômica. flush() grava na hora e roda no
+encerramento do app.
+
+load_config()/save_config() continuam existindo e usam o store.
+"""
+import atexit
+import copy
 import json
 import os
-import winreg
+import tempfile
+import threading
+import time
+try:
+    import winreg
+except ImportError:
+    # Fora do Windows (CLI/daemon em Linux): sem inicialização automática
+    winreg = None
 from logger import log_event
+from profiling import profiled
 from app_paths import get_config_file
 
 CONFIG_FILE = get_config_file()
 
-def load_config():
-    try:
-        if not os.path.exists(CONFIG_FILE):
+# Segundos entre conferências do mtime do config.json
+CHECK_INTERVAL = 2.0
+# Segundos de espera para juntar alterações seguidas numa gravação só
+SAVE_DELAY = 0.5
+
+
+class ConfigStore:
+    def __init__(self, path=CONFIG_FILE, check_interval=CHECK_INTERVAL, save_delay=SAVE_DELAY,
+                 clock=time.monotonic):
+        self.path = path
+        self.check_interval = check_interval
+        self.save_delay = save_delay
+        self.clock = clock
+        self._data = None
+        self._signature = None
+        self._checked = None
+        self._dirty = False
+        self._timer = None
+        self._version = 0
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+
+    # ---------- leitura ----------
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        signature = self._stat()
+        if signature is None:
             log_event("CONFIG", "Config não encontrado, usando padrão")
-            return {}
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            cfg = json.load(f)
+            self._data, self._signature = {}, None
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cfg = json.load(f)
+            if not isinstance(cfg, dict):
+                raise ValueError("o config não é um objeto JSON")
+            self._data = cfg
             log_event("CONFIG", f"Configurações carregadas: pasta={cfg.get('folder', 'N/A')}, paused={cfg.get('paused', True)}")
-            return cfg
-    except Exception as e:
-        log_event("ERROR", f"Erro ao carregar config: {str(e)}")
-        return {}
+        except Exception as e:
+            log_event("ERROR", f"Erro ao carregar config: {str(e)}")
+            if self._data is None:
+                self._data = {}
+        self._signature = signature
 
-def save_config(data):
+    def _current(self):
+        """Dados em memória, relidos se o arquivo mudou por fora"""
+        now = self.clock()
+        if self._data is None:
+            self._load()
+            self._checked = now
+        elif not self._dirty and now - self._checked >= self.check_interval:
+            # Com gravação pendente, a memória é a versão mais nova
+            self._checked = now
+            if self._stat() != self._signature:
+                self._load()
+        return self._data
+
+    def snapshot(self):
+        """Cópia do config inteiro (pode ser alterada à vontade)"""
+        with self._lock:
+            return copy.deepcopy(self._current())
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._current().get(key, default)
+            return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    def get_bool(self, key, default=False):
+        return bool(self.get(key, default))
+
+    def get_int(self, key, default=0):
+        try:
+            return int(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_str(self, key, default=""):
+        value = self.get(key, default)
+        return value if isinstance(value, str) else default
+
+    def get_dict(self, key):
+        value = self.get(key)
+        return value if isinstance(value, dict) else {}
+
+    # ---------- escrita ----------
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, changes):
+        """Aplica as alterações na memória e agenda a gravação"""
+        with self._lock:
+            self._current().update(copy.deepcopy(changes))
+            self._schedule()
+
+    def replace(self, data):
+        """Troca o config inteiro (usado por save_config)"""
+        with self._lock:
+            self._current()
+            self._data = copy.deepcopy(data)
+            self._schedule()
+
+    def _schedule(self):
+        self._dirty = True
+        self._version += 1
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.save_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    @profiled("config_write")
+    def flush(self):
+        """Grava agora se houver alteração pendente"""
+        # Uma gravação por vez; o disco fica fora do lock dos dados, então
+        # leituras não esperam o fsync
+        with self._write_lock:
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                data = self._data
+                text = json.dumps(data, indent=4)
+                version = self._version
+            try:
+                self._write(text)
+            except Exception as e:
+                log_event("ERROR", f"Erro ao salvar config: {str(e)}")
+                raise
+            with self._lock:
+                # Alterações feitas durante a gravação continuam pendentes
+                if version == self._version:
+                    self._dirty = False
+                self._signature = self._stat()
+            log_event("CONFIG", f"Configurações salvas: backup_msc_open={data.get('msc_open')}, backup_mwc_open={data.get('mwc_open')}, paused={data.get('paused')}")
+
+    def _write(self, text):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(prefix=".config_", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+config_store = ConfigStore()
+
+
+def _flush_at_exit():
     try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-        log_event("CONFIG", f"Configurações salvas: backup_msc_open={data.get('msc_open')}, backup_mwc_open={data.get('mwc_open')}, paused={data.get('paused')}")
-    except Exception as e:
-        log_event("ERROR", f"Erro ao salvar config: {str(e)}")
-        raise
+        config_store.flush()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+@profiled("config_load")
+def load_config():
+    return config_store.snapshot()
+
+@profiled("config_save")
+def save_config(data):
+    config_store.replace(data)
 
 def has_shown_disclaimer():
     """Verifica se os termos foram lidos e aceitos"""
     try:
-        cfg = load_config()
-        result = cfg.get("termos_lidos_e_aceitos", False)
-        return result
+        return config_store.get_bool("termos_lidos_e_aceitos")
     except:
         return False
 
 def mark_disclaimer_shown():
     """Marca os termos como lidos e aceitos - SALVA IMEDIATAMENTE"""
     try:
-        cfg = load_config()
-        cfg["termos_lidos_e_aceitos"] = True
-        save_config(cfg)
+        config_store.set("termos_lidos_e_aceitos", True)
+        config_store.flush()
         return True
     except Exception as e:
         print(f"Erro ao marcar termos como aceitos: {e}")
@@ -50,11 +227,12 @@ def mark_disclaimer_shown():
 
 def is_startup_enabled():
     """Verifica se a app está registrada para iniciar com Windows"""
-    cfg = load_config()
-    return cfg.get("startup_enabled", False)
+    return config_store.get_bool("startup_enabled")
 
 def enable_startup():
     """Registra a app para iniciar com Windows"""
+    if winreg is None:
+        return False
     try:
         from app_paths import get_app_dir
         app_dir = get_app_dir()
@@ -71,15 +249,15 @@ def enable_startup():
         winreg.SetValueEx(key, "BECUPE", 0, winreg.REG_SZ, startup_cmd)
         winreg.CloseKey(key)
         
-        cfg = load_config()
-        cfg["startup_enabled"] = True
-        save_config(cfg)
+        config_store.set("startup_enabled", True)
         return True
     except:
         return False
 
 def disable_startup():
     """Remove a app do startup do Windows"""
+    if winreg is None:
+        return False
     try:
         key = winreg.OpenKey(
             winreg.HKEY_CURRENT_USER,
@@ -90,9 +268,7 @@ def disable_startup():
         winreg.DeleteValue(key, "BECUPE")
         winreg.CloseKey(key)
         
-        cfg = load_config()
-        cfg["startup_enabled"] = False
-        save_config(cfg)
+        config_store.set("startup_enabled", False)
         return True
     except:
         return False
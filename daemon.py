@@ -0,0 +1,188 @@
+"""
+Daemon sem interface: detecção dos jogos, backups contínuos e agendados
+num loop asyncio, sem importar Qt.
+
+Segue as mesmas regras da bandeja (auto_backup.py + config.json): backups
+ao abrir/fechar cada jogo, contínuos enquanto ele roda e agendados. Os
+backups rodam num pool de threads, um por vez por jogo; um backup igual
+(mesmo jogo + evento) já na espera absorve o novo. Encerra com Ctrl+C ou
+SIGTERM, esperando o backup em andamento terminar.
+
+Uso: python cli.py watch
+"""
+import asyncio
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+from auto_backup import (
+    event_backup_plan, event_backup_job, event_throttle,
+    add_configured_schedules, mark_schedule_run,
+    EVENT_AUTOSAVE, EVENT_SCHEDULED
+)
+from config import config_store
+from logger import log_event
+from paths import get_game_paths
+from process_watcher import ProcessWatcher
+from save_watcher import SaveChangeDetector, QUIET_PERIOD
+from scheduler import ScheduleCore, CATCH_UP_ONCE
+
+# Teto da espera do agendador: percebe saltos do relógio e agendamentos
+# alterados no config.json pela bandeja
+SCHEDULE_RECHECK = 60.0
+
+
+class BackupDaemon:
+    def __init__(self, games=None, backend=None, workers=2):
+        self.games = games or get_game_paths()
+        self.watcher = ProcessWatcher(self._on_open, self._on_close, backend=backend)
+        self.scheduler = ScheduleCore(self._on_schedule)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="becupe-daemon")
+        self._locks = {}
+        self._waiting = set()
+        self._tasks = set()
+        self._save_tasks = {}
+        self._schedules = None
+        self._loop = None
+        self._stop = None
+        self._stopping = False
+
+    # ================= BACKUPS =================
+    def _submit(self, game, event):
+        if config_store.get_bool("paused", True):
+            return
+        if (game, event) in self._waiting:
+            log_event("INFO", f"Backup {game}_{event.upper()} já na espera, pedido agrupado")
+            return
+        plan = event_backup_plan(game, event)
+        if not plan:
+            return
+        task = self._loop.create_task(self._run_backup(game, event, plan))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_backup(self, game, event, plan):
+        folder, prefix, retention, options = plan
+        self._waiting.add((game, event))
+        lock = self._locks.setdefault(game, asyncio.Lock())
+        async with lock:
+            self._waiting.discard((game, event))
+            if self._stopping:
+                return
+            throttle = event_throttle(lambda: any(self.watcher.states.values()))
+            try:
+                path = await self._loop.run_in_executor(
+                    self.executor,
+                    lambda: event_backup_job(self.games[game], game, folder, prefix, retention,
+                                             throttle=throttle, **options)
+                )
+                print(f"Backup {prefix}: {path}", flush=True)
+            except Exception as e:
+                # create_backup já registrou o erro no log
+                print(f"Backup {prefix} falhou: {e}", flush=True)
+
+    # ================= EVENTOS =================
+    def _on_open(self, game):
+        print(f"{game} aberto", flush=True)
+        self._submit(game, "open")
+        if config_store.get_bool("continuous"):
+            task = self._loop.create_task(self._watch_saves(game))
+            self._save_tasks[game] = task
+
+    def _on_close(self, game):
+        print(f"{game} fechado", flush=True)
+        task = self._save_tasks.pop(game, None)
+        if task:
+            task.cancel()
+        self._submit(game, "close")
+
+    def _on_schedule(self, game, job):
+        mark_schedule_run(game, job.last_run)
+        self._submit(game, EVENT_SCHEDULED)
+
+    async def _watch_saves(self, game):
+        """Backups contínuos: varredura de stat até o jogo fechar"""
+        detector = SaveChangeDetector(
+            self.games[game],
+            config_store.get_int("continuous_quiet", int(QUIET_PERIOD)),
+            config_store.get_int("continuous_interval_min", 5) * 60
+        )
+        log_event("WATCH", f"Observando a pasta de save de {game}: {self.games[game]}")
+        while True:
+            await asyncio.sleep(detector.next_delay())
+            try:
+                if detector.poll():
+                    log_event("WATCH", f"{game} terminou de salvar, backup contínuo enfileirado")
+                    self._submit(game, EVENT_AUTOSAVE)
+            except Exception as e:
+                log_event("ERROR", f"Erro ao verificar a pasta de save de {game}: {str(e)}")
+
+    # ================= LOOPS =================
+    async def _process_loop(self):
+        while True:
+            try:
+                delay = self.watcher.poll()
+            except Exception as e:
+                log_event("ERROR", f"Erro ao verificar processos: {str(e)}")
+                delay = self.watcher.max_interval
+            await asyncio.sleep(delay)
+
+    def _reload_schedules(self):
+        schedules = config_store.get_dict("schedules")
+        catch_up = config_store.get_str("schedule_catch_up", CATCH_UP_ONCE)
+        if (schedules, catch_up) == self._schedules:
+            return
+        self._schedules = (schedules, catch_up)
+        self.scheduler.clear()
+        self.scheduler.catch_up = catch_up
+        add_configured_schedules(self.scheduler.add, schedules)
+        log_event("SCHEDULE", f"Daemon: {len(self.scheduler.jobs)} agendamento(s) ativo(s)")
+
+    async def _schedule_loop(self):
+        while True:
+            self._reload_schedules()
+            self.scheduler.run_due()
+            delay = self.scheduler.next_delay()
+            await asyncio.sleep(SCHEDULE_RECHECK if delay is None else min(delay + 0.001, SCHEDULE_RECHECK))
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows: Ctrl+C chega como KeyboardInterrupt
+                pass
+
+        log_event("INFO", "Daemon de backups iniciado")
+        if config_store.get_bool("paused", True):
+            print("Backups automáticos estão pausados no config; só a detecção está ativa.", flush=True)
+        loops = [self._loop.create_task(self._process_loop()),
+                 self._loop.create_task(self._schedule_loop())]
+        try:
+            await self._stop.wait()
+        finally:
+            for task in loops + list(self._save_tasks.values()):
+                task.cancel()
+            # Backups já iniciados terminam; os da espera são descartados
+            self._stopping = True
+            pending = [t for t in self._tasks if not t.done()]
+            if pending:
+                print("Esperando o backup em andamento terminar...", flush=True)
+                await asyncio.gather(*pending, return_exceptions=True)
+            self.executor.shutdown(wait=True)
+            config_store.flush()
+            log_event("INFO", "Daemon de backups encerrado")
+
+    def stop(self):
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+
+def run_daemon(**kwargs):
+    daemon = BackupDaemon(**kwargs)
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        pass
+    return 0
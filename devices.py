@@ -0,0 +1,184 @@
+"""
+Em qual disco físico cada backup lê e grava, para decidir o que pode rodar
+ao mesmo tempo.
+
+Um backup cuja pasta de save e destino ficam no mesmo disco lê e grava nele
+ao mesmo tempo; outro backup em paralelo no mesmo disco só aumenta o vaivém
+da cabeça (HD) ou a fila do controlador, e os dois terminam mais tarde. Já
+um backup que lê de um disco e grava em outro pode rodar junto com outros.
+
+Regra (DeviceFootprint.conflicts): dois trabalhos não rodam juntos se usam
+algum disco em comum e pelo menos um deles lê e grava no mesmo disco. Os
+trabalhos em conflito são executados um de cada vez, intercalados na ordem
+da fila.
+
+Disco físico:
+- Windows: número do disco do volume (IOCTL_VOLUME_GET_VOLUME_DISK_EXTENTS),
+  então C: e D: na mesma unidade contam como um disco só;
+- Linux: o disco dono da partição em /sys/dev/block;
+- nos demais casos (rede, RAM, LVM...), o st_dev do sistema de arquivos.
+"""
+import ctypes
+import os
+import sys
+import threading
+
+from logger import log_event
+
+_IOCTL_VOLUME_GET_VOLUME_DISK_EXTENTS = 0x00560000
+_FILE_SHARE_READ_WRITE = 0x00000003
+_OPEN_EXISTING = 3
+_MAX_EXTENTS = 16
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+# ================= DISCO FÍSICO =================
+def _existing_parent(path):
+    """O próprio caminho ou o primeiro pai que existe (destino ainda não criado)"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _windows_disks(path):
+    from ctypes import wintypes
+
+    class DiskExtent(ctypes.Structure):
+        _fields_ = [("DiskNumber", wintypes.DWORD),
+                    ("StartingOffset", ctypes.c_longlong),
+                    ("ExtentLength", ctypes.c_longlong)]
+
+    class VolumeDiskExtents(ctypes.Structure):
+        _fields_ = [("NumberOfDiskExtents", wintypes.DWORD),
+                    ("Extents", DiskExtent * _MAX_EXTENTS)]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    volume = ctypes.create_unicode_buffer(260)
+    if not kernel32.GetVolumePathNameW(path, volume, len(volume)):
+        return None
+    # "C:\" -> "\\.\C:"; volumes de rede não têm disco local
+    root = volume.value.rstrip("\\")
+    if root.startswith("\\\\"):
+        return None
+    handle = kernel32.CreateFileW("\\\\.\\" + root, 0, _FILE_SHARE_READ_WRITE, None,
+                                  _OPEN_EXISTING, 0, None)
+    if handle in (None, wintypes.HANDLE(-1).value):
+        return None
+    try:
+        extents = VolumeDiskExtents()
+        returned = wintypes.DWORD()
+        if not kernel32.DeviceIoControl(handle, _IOCTL_VOLUME_GET_VOLUME_DISK_EXTENTS, None, 0,
+                                        ctypes.byref(extents), ctypes.sizeof(extents),
+                                        ctypes.byref(returned), None):
+            return None
+        count = min(extents.NumberOfDiskExtents, _MAX_EXTENTS)
+        return frozenset(f"disk{extents.Extents[i].DiskNumber}" for i in range(count))
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _linux_disks(st_dev):
+    block = f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}"
+    if not os.path.exists(block):
+        return None
+    path = os.path.realpath(block)
+    if os.path.exists(os.path.join(path, "partition")):
+        path = os.path.dirname(path)
+    return frozenset([os.path.basename(path)])
+
+
+def physical_devices(path):
+    """Discos físicos onde path está (conjunto, pois um volume pode ocupar vários)"""
+    path = _existing_parent(path)
+    st_dev = os.stat(path).st_dev
+    with _cache_lock:
+        cached = _cache.get(st_dev)
+    if cached is not None:
+        return cached
+
+    disks = None
+    try:
+        if sys.platform == "win32":
+            disks = _windows_disks(path)
+        elif sys.platform.startswith("linux"):
+            disks = _linux_disks(st_dev)
+    except (OSError, AttributeError, ValueError) as e:
+        log_event("INFO", f"Não foi possível identificar o disco de {path}: {str(e)}")
+    if not disks:
+        disks = frozenset([f"dev{st_dev}"])
+    with _cache_lock:
+        _cache[st_dev] = disks
+    return disks
+
+
+# ================= CONFLITOS =================
+class DeviceFootprint:
+    """Discos que um trabalho lê (source) e grava (dest)"""
+
+    def __init__(self, source, dest):
+        self.read = physical_devices(source)
+        self.write = physical_devices(dest)
+        self.devices = self.read | self.write
+        # Lê e grava no mesmo disco: precisa dele só para si
+        self.shared = bool(self.read & self.write)
+
+    def conflicts(self, other):
+        return bool(self.devices & other.devices) and (self.shared or other.shared)
+
+    def __repr__(self):
+        return f"DeviceFootprint(read={sorted(self.read)}, write={sorted(self.write)})"
+
+
+def footprint(source, dest):
+    """DeviceFootprint de source -> dest, ou None se algum caminho não puder ser lido"""
+    try:
+        return DeviceFootprint(source, dest)
+    except OSError as e:
+        log_event("INFO", f"Sem informação de disco para {source} -> {dest}: {str(e)}")
+        return None
+
+
+def run_scheduled(tasks):
+    """
+    Roda tasks [(DeviceFootprint ou None, func), ...] em threads, começando
+    cada uma assim que não conflitar com as em execução (ordem preservada
+    entre as que conflitam). Retorna [(resultado, exceção), ...] na ordem.
+    """
+    results = [None] * len(tasks)
+    pending = list(range(len(tasks)))
+    running = {}
+    cond = threading.Condition()
+
+    def run(index, func):
+        try:
+            outcome = (func(), None)
+        except Exception as e:
+            outcome = (None, e)
+        with cond:
+            results[index] = outcome
+            del running[index]
+            cond.notify_all()
+
+    with cond:
+        while pending or running:
+            started = False
+            for index in list(pending):
+                fp = tasks[index][0]
+                ahead = [tasks[i][0] for i in pending if i < index] + list(running.values())
+                if fp is not None and any(o is not None and fp.conflicts(o) for o in ahead):
+                    continue
+                pending.remove(index)
+                running[index] = fp
+                threading.Thread(target=run, args=(index, tasks[index][1]),
+                                 name=f"becupe-device-{index}", daemon=True).start()
+                started = True
+            if not started:
+                cond.wait()
+    return results
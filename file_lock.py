@@ -0,0 +1,65 @@
+"""
+Lock exclusivo entre processos (e entre threads) baseado num arquivo.
+
+A bandeja, a linha de comando e o daemon podem mexer na mesma pasta de
+backups ao mesmo tempo, e a fila da bandeja roda trabalhos em paralelo.
+FileLock serializa os trechos que leem e regravam arquivos compartilhados.
+
+O lock é do sistema operacional (flock no Linux, LockFile no Windows): se
+o processo morrer ele é liberado sozinho, e o arquivo nunca é apagado.
+"""
+import os
+import sys
+import time
+
+# Segundos entre tentativas no Windows (msvcrt não tem espera sem limite)
+POLL_INTERVAL = 0.05
+
+
+class FileLock:
+    """Uso: with FileLock(caminho): ... (não é reentrante)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+b")
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(POLL_INTERVAL)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+        self._file = f
+
+    def release(self):
+        f, self._file = self._file, None
+        if f is None:
+            return
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            # Fechar o arquivo também libera o flock
+            f.close()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
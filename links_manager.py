@@ -1,5 +1,4 @@
 import os
-import webbrowser
 
 LINKS_FILE = "links.txt"
 
@@ -24,6 +23,7 @@ def load_links():
 def open_link(link_type):
     """Abre um link no navegador"""
     try:
+        import webbrowser
         from logger import log_event
         links = load_links()
         url = links.get(link_type, "")
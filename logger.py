@@ -1,9 +1,191 @@
+"""
+Log da aplicação (logs.txt).
+
+log_event() só coloca o registro numa fila e retorna; uma thread de
+gravação junta os registros e escreve em lote, quando passa FLUSH_INTERVAL
+desde o primeiro pendente ou quando acumulam BATCH_SIZE registros. A fila
+é esvaziada no encerramento (atexit) e antes de um erro não tratado
+derrubar o app; flush() força a gravação na hora.
+
+Rotação: quando logs.txt passa de MAX_BYTES ou seu primeiro registro fica
+mais velho que MAX_AGE_DAYS, ele vira logs-AAAAMMDD-HHMMSS.txt.gz e um
+logs.txt novo começa; só os MAX_SEGMENTS arquivos mais recentes ficam.
+iter_log() percorre arquivos e log atual linha a linha, sem carregar tudo.
+"""
+import atexit
+import glob
+import gzip
 import os
-from datetime import datetime
+import shutil
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
 from app_paths import get_log_file
 
 LOG_FILE = get_log_file()
 
+# Segundos que um registro pode esperar na fila antes de ir para o disco
+FLUSH_INTERVAL = 0.5
+# Registros que forçam a gravação antes do intervalo
+BATCH_SIZE = 256
+
+# Rotação do logs.txt
+MAX_BYTES = 1024 * 1024
+MAX_AGE_DAYS = 7
+MAX_SEGMENTS = 10
+# Linhas devolvidas por read_log()
+READ_LINES = 5000
+
+_queue = queue.SimpleQueue()
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+_closed = False
+_file_lock = threading.Lock()
+# Horário do primeiro registro do logs.txt atual (idade para a rotação)
+_segment_started = None
+
+
+# ================= ROTAÇÃO =================
+def _archive_pattern():
+    base, ext = os.path.splitext(LOG_FILE)
+    return f"{glob.escape(base)}-*{ext}.gz"
+
+
+def list_archives():
+    """Segmentos comprimidos do log, do mais antigo para o mais novo"""
+    # O nome leva data e hora, então a ordem alfabética é a cronológica
+    return sorted(glob.glob(_archive_pattern()))
+
+
+def _first_timestamp(path):
+    """Horário do primeiro registro de um log (None se não der para ler)"""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            head = f.read(21)
+        return datetime.strptime(head[1:20], "%Y-%m-%d %H:%M:%S")
+    except (OSError, ValueError):
+        return None
+
+
+def _needs_rotation(size):
+    if size >= MAX_BYTES:
+        return True
+    if MAX_AGE_DAYS and _segment_started and size:
+        return datetime.now() - _segment_started >= timedelta(days=MAX_AGE_DAYS)
+    return False
+
+
+def rotate():
+    """Comprime o logs.txt atual num segmento e apaga os segmentos excedentes"""
+    global _segment_started
+    if not os.path.exists(LOG_FILE):
+        return None
+    base, ext = os.path.splitext(LOG_FILE)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    archive = f"{base}-{stamp}{ext}.gz"
+    counter = 1
+    while os.path.exists(archive):
+        counter += 1
+        # "_" vem depois de "." na ordem alfabética: o segundo fica depois
+        archive = f"{base}-{stamp}_{counter:03d}{ext}.gz"
+
+    # Renomear primeiro: o logs.txt novo começa na hora, a compressão vem depois
+    pending = archive[:-3] + ".rotating"
+    os.replace(LOG_FILE, pending)
+    _segment_started = None
+    with open(pending, "rb") as src, gzip.open(archive + ".tmp", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(archive + ".tmp", archive)
+    os.remove(pending)
+
+    archives = list_archives()
+    for old in archives[:max(0, len(archives) - MAX_SEGMENTS)]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return archive
+
+
+def _write_lines(lines):
+    global _segment_started
+    try:
+        with _file_lock:
+            try:
+                size = os.path.getsize(LOG_FILE)
+            except OSError:
+                size = 0
+            if size and _segment_started is None:
+                _segment_started = _first_timestamp(LOG_FILE) or datetime.now()
+            if _needs_rotation(size):
+                try:
+                    rotate()
+                except Exception as e:
+                    # Sem rotação o log só cresce; melhor que perder registros
+                    print(f"Erro ao rotacionar o log: {e}")
+            with open(LOG_FILE, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            if _segment_started is None:
+                _segment_started = datetime.now()
+    except Exception as e:
+        print(f"Erro ao escrever no log: {e}")
+
+
+def _writer_loop():
+    while True:
+        item = _queue.get()
+        batch = []
+        waiters = []
+        stop = False
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while True:
+            if item is None:
+                stop = True
+            elif isinstance(item, threading.Event):
+                # Pedido de flush: grava o que tem e avisa
+                waiters.append(item)
+            else:
+                batch.append(item)
+            if stop or waiters or len(batch) >= BATCH_SIZE:
+                break
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = _queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+        if batch:
+            _write_lines(batch)
+        for waiter in waiters:
+            waiter.set()
+        if stop:
+            return
+
+
+def _ensure_writer():
+    global _writer, _writer_pid
+    with _writer_lock:
+        # Depois de um fork a thread não existe no processo filho
+        if _writer and _writer.is_alive() and _writer_pid == os.getpid():
+            return True
+        if _closed:
+            return False
+        try:
+            _writer = threading.Thread(target=_writer_loop, name="becupe-log", daemon=True)
+            _writer.start()
+            _writer_pid = os.getpid()
+            return True
+        except RuntimeError:
+            # Interpretador encerrando: não dá mais para criar threads
+            return False
+
+
 def log_event(event_type: str, message: str):
     """
     Registra um evento no arquivo de log
@@ -12,27 +194,231 @@ def log_event(event_type: str, message: str):
     try:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_message = f"[{timestamp}] [{event_type}] {message}\n"
-        
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_message)
+
+        if _ensure_writer():
+            _queue.put(log_message)
+        else:
+            _write_lines([log_message])
     except Exception as e:
         print(f"Erro ao escrever no log: {e}")
 
-def read_log():
-    """Lê todo o arquivo de log"""
+
+def flush(timeout=5.0):
+    """Espera tudo que já foi registrado chegar ao arquivo"""
+    if not _ensure_writer():
+        return
+    done = threading.Event()
+    _queue.put(done)
+    done.wait(timeout)
+
+
+def shutdown():
+    """Grava o que falta e encerra a thread de gravação"""
+    global _closed
+    with _writer_lock:
+        writer = _writer if _writer_pid == os.getpid() else None
+        _closed = True
+    if writer and writer.is_alive():
+        _queue.put(None)
+        writer.join(5.0)
+    # Registros de threads que ainda logaram depois do fim da gravação
+    lines = []
+    while True:
+        try:
+            item = _queue.get_nowait()
+        except queue.Empty:
+            break
+        if isinstance(item, str):
+            lines.append(item)
+        elif isinstance(item, threading.Event):
+            item.set()
+    if lines:
+        _write_lines(lines)
+
+
+def _log_crash(exc_type, exc, tb):
+    text = "".join(traceback.format_exception(exc_type, exc, tb)).rstrip()
+    log_event("ERROR", f"Erro não tratado:\n{text}")
+    flush()
+
+
+_previous_excepthook = sys.excepthook
+_previous_thread_excepthook = threading.excepthook
+
+
+def _excepthook(exc_type, exc, tb):
+    if not issubclass(exc_type, KeyboardInterrupt):
+        _log_crash(exc_type, exc, tb)
+    _previous_excepthook(exc_type, exc, tb)
+
+
+def _thread_excepthook(args):
+    if args.exc_type is not SystemExit:
+        _log_crash(args.exc_type, args.exc_value, args.exc_traceback)
+    _previous_thread_excepthook(args)
+
+
+sys.excepthook = _excepthook
+threading.excepthook = _thread_excepthook
+atexit.register(shutdown)
+
+
+# ================= LEITURA =================
+def iter_log(archives=True):
+    """
+    Linhas do log em ordem cronológica: segmentos comprimidos (se archives)
+    e depois o logs.txt atual. Lê em fluxo, uma linha por vez.
+    """
+    flush()
+    paths = list_archives() if archives else []
+    for path in paths:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+                yield from f
+        except (OSError, EOFError):
+            # Segmento apagado pela rotação ou corrompido: segue para o próximo
+            continue
+    try:
+        with open(LOG_FILE, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+    except FileNotFoundError:
+        return
+
+
+def _open_shared(path):
+    """
+    open(path, "rb") que não impede a rotação de renomear ou apagar o
+    arquivo enquanto ele está aberto (no Windows o open() comum impede)
+    """
+    if sys.platform != "win32":
+        return open(path, "rb")
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    generic_read = 0x80000000
+    share_all = 0x00000007  # leitura, gravação e exclusão
+    open_existing = 3
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    handle = kernel32.CreateFileW(path, generic_read, share_all, None, open_existing, 0, None)
+    if handle in (None, wintypes.HANDLE(-1).value):
+        error = ctypes.get_last_error()
+        if error in (2, 3):  # arquivo ou pasta não encontrados
+            raise FileNotFoundError(error, "Arquivo não encontrado", path)
+        raise ctypes.WinError(error)
+    return os.fdopen(msvcrt.open_osfhandle(handle, os.O_RDONLY), "rb")
+
+
+class LogTail:
+    """
+    Acompanha o logs.txt como `tail -f`: lembra o offset e a identidade do
+    arquivo (dispositivo + inode) e a cada read_new() lê só os bytes novos.
+    O arquivo fica aberto entre as leituras: na rotação (arquivo trocado) o
+    resto do antigo é lido pelo handle aberto antes de passar para o começo
+    do novo, então nada do que foi gravado entre duas leituras se perde
+    (também quando o logs.txt novo ainda não foi criado). Truncamento pede
+    para a tela ser limpa; antes de apagar o log, chamar reset().
+    """
+
+    # Na primeira leitura (ou depois de limpar) só o fim do arquivo interessa
+    INITIAL_BYTES = 256 * 1024
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = None
+        self.reset()
+
+    def reset(self):
+        """Esquece a posição e fecha o arquivo (chamar antes de apagar o log)"""
+        if self._file:
+            self._file.close()
+            self._file = None
+        self.offset = None
+        self.identity = None
+        self._partial = b""
+
+    def read_new(self):
+        """
+        Retorna (texto, recomeçou). Com recomeçou=True a tela deve ser limpa
+        antes de mostrar o texto. Só devolve linhas completas.
+        """
+        path = self.path or LOG_FILE
+        try:
+            current = _open_shared(path)
+        except FileNotFoundError:
+            if self._file is None:
+                # Ainda sem log (ou esperando o logs.txt novo da rotação)
+                return "", False
+            # Rotação antes do primeiro registro do logs.txt novo: termina o antigo
+            self._file.seek(self.offset)
+            rotated = self._file.read()
+            self._file.close()
+            self._file = None
+            self.offset = 0
+            return self._complete_lines(rotated), False
+        st = os.fstat(current.fileno())
+        identity = (st.st_dev, st.st_ino)
+
+        restart = False
+        rotated = b""
+        if self.offset is None:
+            restart = True
+            self.offset = max(0, st.st_size - self.INITIAL_BYTES)
+        elif identity != self.identity:
+            # logs.txt novo depois da rotação: termina o antigo e continua do começo do novo
+            if self._file:
+                self._file.seek(self.offset)
+                rotated = self._file.read()
+            self.offset = 0
+        elif st.st_size < self.offset:
+            restart = True
+            self.offset = max(0, st.st_size - self.INITIAL_BYTES)
+
+        if self._file and identity == self.identity:
+            current.close()
+        else:
+            if self._file:
+                self._file.close()
+            self._file = current
+        self.identity = identity
+        if restart:
+            self._partial = b""
+
+        start = self.offset
+        self._file.seek(start)
+        data = self._file.read(st.st_size - start)
+        self.offset = start + len(data)
+        if restart and start:
+            # Começou no meio de uma linha: descarta até a próxima
+            data = data[data.find(b"\n") + 1:] if b"\n" in data else b""
+        return self._complete_lines(rotated + data), restart
+
+    def _complete_lines(self, data):
+        """Texto das linhas completas; o pedaço final espera a próxima leitura"""
+        data = self._partial + data
+        cut = data.rfind(b"\n") + 1
+        self._partial = data[cut:]
+        return data[:cut].decode("utf-8", errors="replace")
+
+
+def read_log(max_lines=READ_LINES, archives=False):
+    """Últimas max_lines linhas do log (memória limitada ao que é devolvido)"""
     try:
-        if not os.path.exists(LOG_FILE):
-            return ""
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            return f.read()
+        return "".join(deque(iter_log(archives), maxlen=max_lines))
     except Exception as e:
         return f"Erro ao ler log: {e}"
 
 def clear_log():
-    """Limpa o arquivo de log"""
+    """Limpa o arquivo de log e os segmentos antigos"""
+    global _segment_started
     try:
-        if os.path.exists(LOG_FILE):
-            os.remove(LOG_FILE)
+        flush()
+        with _file_lock:
+            for path in list_archives() + [LOG_FILE]:
+                if os.path.exists(path):
+                    os.remove(path)
+            _segment_started = None
         return True
     except Exception as e:
         print(f"Erro ao limpar log: {e}")
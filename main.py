@@ -1,32 +1,69 @@
+import time
+# Antes de qualquer import: mede o custo de abrir com o Windows
+_started = time.perf_counter()
+
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QMessageBox
+from single_instance import SingleInstanceLock, parse_command, COMMAND_SHOW
+
+# BECUPE_STARTUP_TIMING=1: imprime os tempos e fecha (python benchmark.py inicializacao)
+timing = bool(os.environ.get('BECUPE_STARTUP_TIMING'))
+
+# Segunda execução: repassa o comando para a instância aberta e sai,
+# sem carregar a interface
+command = parse_command(sys.argv[1:])
+lock = SingleInstanceLock()
+if lock.is_running():
+    if timing:
+        print("A aplicação já está sendo executada", file=sys.stderr)
+        sys.exit(1)
+    if command is None or lock.send(*command):
+        sys.exit(0)
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    app = QApplication(sys.argv)
+    QMessageBox.warning(None, "PERKELE", "A aplicação já está sendo executada, mas não respondeu.\n\nFeche a instância atual antes de iniciar novamente.")
+    sys.exit(1)
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
 from app_paths import ensure_app_dir_exists
-from single_instance import SingleInstanceLock
 from ui_main import MainWindow
+from logger import log_event
+
+_imported = time.perf_counter()
 
 # Garante que o diretório da aplicação existe
 ensure_app_dir_exists()
 
-# Tenta adquirir lock de instância única (mantém em escopo global)
-lock = None
-try:
-    lock = SingleInstanceLock()
-    if not lock.acquire():
-        # Se não conseguir, mostra mensagem e fecha
-        app = QApplication(sys.argv)
-        QMessageBox.warning(None, "PERKELE", "A aplicação já está sendo executada!\n\nFeche a instância atual antes de iniciar novamente.")
-        sys.exit(1)
-except Exception as e:
-    print(f"Erro ao verificar instância única: {e}")
-    sys.exit(1)
-
 # Se foi iniciado via startup do Windows, define uma variável de ambiente
 if len(sys.argv) > 1 and 'startup' in sys.argv[1].lower():
     os.environ['BECUPE_STARTUP'] = '1'
 
 app = QApplication(sys.argv)
+
+# Escuta antes de montar a janela: outra execução nesse meio tempo repassa o
+# comando, que é atendido quando o loop de eventos começar
+if not lock.acquire():
+    if not timing and command is not None:
+        lock.send(*command)
+    sys.exit(1 if timing else 0)
+app.aboutToQuit.connect(lock.release)
+
 window = MainWindow()
-# A função check_startup_and_minimize() será chamada automaticamente
-sys.exit(app.exec_())
+lock.on_command = window.handle_command
+# A função check_startup_and_minimize() já deixou só a bandeja (ou abriu a janela)
+_ready = time.perf_counter()
+imports_ms = (_imported - _started) * 1000
+ready_ms = (_ready - _started) * 1000
+log_event("INFO", f"Inicialização: imports {imports_ms:.0f} ms, pronto em {ready_ms:.0f} ms")
+
+# Backup/restauração pedidos na linha de comando da primeira execução
+if command is not None and command[0] != COMMAND_SHOW:
+    QTimer.singleShot(0, lambda: window.handle_command(*command))
 
+if timing:
+    print(f"imports_ms={imports_ms:.1f} pronto_ms={ready_ms:.1f}", flush=True)
+    # Fecha depois da primeira volta do loop de eventos (bandeja desenhada)
+    QTimer.singleShot(0, window.force_exit)
+
+sys.exit(app.exec_())
@@ -0,0 +1,134 @@
+"""
+Manifesto de arquivos dos backups (.becupe).
+
+Cada backup carrega um manifesto com o estado completo da pasta do jogo
+(caminho, tamanho, mtime e hash de cada arquivo). Backups incrementais
+guardam apenas os arquivos novos/alterados e apontam para o backup anterior
+da cadeia, então a restauração reconstrói o estado completo a partir dela.
+"""
+import hashlib
+import json
+import os
+import zlib
+
+from app_paths import get_meta_dir
+
+# Nome do membro do zip que guarda o manifesto (nunca é extraído para o jogo)
+MANIFEST_MEMBER = "__becupe__/manifest.json"
+MANIFEST_VERSION = 1
+
+# Depois de tantos incrementais seguidos, força um backup completo
+MAX_CHAIN_LENGTH = 10
+
+READ_BLOCK = 1024 * 1024
+
+
+def hash_file(path, throttle=None):
+    """Retorna (sha1, crc32) do conteúdo do arquivo"""
+    sha1 = hashlib.sha1()
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK)
+            if not block:
+                break
+            if throttle:
+                throttle.consume(len(block))
+            sha1.update(block)
+            crc = zlib.crc32(block, crc)
+    return sha1.hexdigest(), crc & 0xFFFFFFFF
+
+
+def scan_tree(root, previous=None, throttle=None):
+    """
+    Varre a pasta e monta o manifesto atual.
+
+    Arquivos com mesmo tamanho e mtime do manifesto anterior reaproveitam o
+    hash já calculado; apenas os demais são lidos do disco.
+
+    Returns:
+        (files, dirs): files é {caminho_relativo: entrada}, dirs é a lista
+        de subpastas (para recriar pastas vazias na restauração)
+    """
+    previous = previous or {}
+    files = {}
+    dirs = []
+    # os.scandir já traz o stat no Windows (sem uma chamada extra por arquivo)
+    stack = [(root, "")]
+    while stack:
+        dirpath, rel_dir = stack.pop()
+        with os.scandir(dirpath) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            rel = rel_dir + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(rel)
+                stack.append((entry.path, rel + "/"))
+                continue
+            st = entry.stat()
+            old = previous.get(rel)
+            if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+                files[rel] = old
+                continue
+            sha1, crc = hash_file(entry.path, throttle)
+            files[rel] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "sha1": sha1,
+                "crc": crc,
+            }
+    dirs.sort()
+    return files, dirs
+
+
+def diff_files(previous, current):
+    """Retorna (alterados_ou_novos, removidos) entre dois manifestos"""
+    changed = [
+        rel for rel, entry in current.items()
+        if rel not in previous or previous[rel]["sha1"] != entry["sha1"]
+    ]
+    deleted = [rel for rel in previous if rel not in current]
+    return changed, deleted
+
+
+def read_manifest(zip_ref):
+    """Lê o manifesto de um zip aberto. Backups antigos não têm manifesto (None)"""
+    try:
+        with zip_ref.open(MANIFEST_MEMBER) as f:
+            return json.loads(f.read().decode("utf-8"))
+    except KeyError:
+        return None
+
+
+def resolve_base(becupe_file, manifest):
+    """Caminho absoluto do backup base de um incremental"""
+    return os.path.normpath(
+        os.path.join(os.path.dirname(os.path.abspath(becupe_file)), manifest["base"])
+    )
+
+
+# ================= ESTADO POR JOGO =================
+def _state_file(root, game_key):
+    return os.path.join(get_meta_dir(root), "manifests", f"{game_key}.json")
+
+
+def load_state(root, game_key):
+    """Carrega o manifesto do último backup do jogo nesta pasta de backups"""
+    path = _state_file(root, game_key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(root, game_key, state):
+    """Salva o manifesto do último backup (escrita atômica)"""
+    path = _state_file(root, game_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
@@ -0,0 +1,230 @@
+"""
+Métricas de desempenho dos backups e restaurações.
+
+Cada operação vira uma linha no SQLite em metrics.sqlite3 (pasta da
+aplicação): duração total e por fase (varredura, compressão, gravação),
+bytes lidos e gravados, arquivos, taxa de compressão e resultado. summary()
+agrupa por jogo e evento com percentis e tendência para a aba de
+estatísticas.
+
+Gravar métricas nunca pode derrubar um backup: record_operation() só
+registra o erro no log.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from app_paths import get_metrics_file
+from logger import log_event
+
+METRICS_VERSION = 1
+
+OP_BACKUP = "backup"
+OP_RESTORE = "restore"
+
+OUTCOME_OK = "ok"
+OUTCOME_SKIPPED = "skipped"
+OUTCOME_CANCELLED = "cancelled"
+OUTCOME_FAILED = "failed"
+
+PHASES = ("scan", "compress", "write")
+
+# Linhas mais velhas que isso são apagadas ao gravar
+KEEP_DAYS = 365
+# Operações comparadas no cálculo da tendência (últimas N x N anteriores)
+TREND_WINDOW = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    operation TEXT NOT NULL,
+    game TEXT NOT NULL,
+    event TEXT NOT NULL,
+    backend TEXT,
+    kind TEXT,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    scan REAL NOT NULL,
+    compress REAL NOT NULL,
+    write REAL NOT NULL,
+    bytes_read INTEGER NOT NULL,
+    bytes_written INTEGER NOT NULL,
+    bytes_in INTEGER NOT NULL,
+    bytes_out INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    changed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS operations_op_started ON operations (operation, started);
+"""
+
+_COLUMNS = ("started", "operation", "game", "event", "backend", "kind", "outcome",
+            "duration", "scan", "compress", "write", "bytes_read", "bytes_written",
+            "bytes_in", "bytes_out", "files", "changed")
+
+
+class OperationMetrics:
+    """
+    Medições de uma operação em andamento. bytes_in/bytes_out são o total
+    antes e depois da compressão (a taxa de compressão sai deles).
+    """
+
+    def __init__(self, operation, game="", event=""):
+        self.operation = operation
+        self.game = game or ""
+        self.event = event or ""
+        self.backend = None
+        self.kind = None
+        self.outcome = OUTCOME_FAILED
+        self.started = time.time()
+        self.duration = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.files = 0
+        self.changed = 0
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Soma o tempo do bloco à fase name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def finish(self, outcome=OUTCOME_OK):
+        self.outcome = outcome
+        self.duration = time.perf_counter() - self._start
+
+    @property
+    def ratio(self):
+        """Tamanho original / comprimido (0 sem dados)"""
+        return self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+
+    @property
+    def throughput(self):
+        """Bytes lidos por segundo"""
+        return self.bytes_read / self.duration if self.duration else 0.0
+
+    def row(self):
+        values = dict(self.phases, started=self.started, operation=self.operation,
+                      game=self.game, event=self.event, backend=self.backend, kind=self.kind,
+                      outcome=self.outcome, duration=self.duration, bytes_read=self.bytes_read,
+                      bytes_written=self.bytes_written, bytes_in=self.bytes_in,
+                      bytes_out=self.bytes_out, files=self.files, changed=self.changed)
+        return [values[col] for col in _COLUMNS]
+
+
+def percentile(values, pct):
+    """Percentil por interpolação linear (values já ordenados)"""
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * pct / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def _median(values):
+    return percentile(sorted(values), 50)
+
+
+class MetricsStore:
+    def __init__(self, path=None):
+        self.path = path or get_metrics_file()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f"PRAGMA user_version={METRICS_VERSION}")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, metrics):
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT INTO operations ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                metrics.row()
+            )
+            self._db.execute("DELETE FROM operations WHERE started < ?",
+                             (time.time() - KEEP_DAYS * 86400,))
+
+    def query(self, operation=None, game=None, event=None, since=None, outcome=None, limit=None):
+        """Operações filtradas, da mais antiga para a mais nova (dicts)"""
+        where, params = [], []
+        for column, value in (("operation", operation), ("game", game),
+                              ("event", event), ("outcome", outcome)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            where.append("started >= ?")
+            params.append(since)
+        sql = "SELECT * FROM operations"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started"
+        if limit:
+            # As últimas `limit`, ainda em ordem cronológica
+            sql = f"SELECT * FROM ({sql} DESC LIMIT ?) ORDER BY started"
+            params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def summary(self, operation=OP_BACKUP, since=None):
+        """
+        Estatísticas por (jogo, evento) das operações concluídas: quantidade,
+        p50/p90/p99 da duração, vazão e taxa de compressão medianas, tempo
+        mediano de cada fase e tendência (% da duração mediana das últimas
+        TREND_WINDOW operações sobre as TREND_WINDOW anteriores).
+        """
+        groups = {}
+        for row in self.query(operation=operation, since=since, outcome=OUTCOME_OK):
+            groups.setdefault((row["game"], row["event"]), []).append(row)
+
+        result = []
+        for (game, event), rows in sorted(groups.items()):
+            durations = sorted(r["duration"] for r in rows)
+            recent = [r["duration"] for r in rows[-TREND_WINDOW:]]
+            before = [r["duration"] for r in rows[-2 * TREND_WINDOW:-TREND_WINDOW]]
+            trend = None
+            if before and recent and _median(before):
+                trend = (_median(recent) / _median(before) - 1) * 100
+            result.append({
+                "game": game,
+                "event": event,
+                "count": len(rows),
+                "p50": percentile(durations, 50),
+                "p90": percentile(durations, 90),
+                "p99": percentile(durations, 99),
+                "throughput": _median([r["bytes_read"] / r["duration"] for r in rows if r["duration"]]),
+                "ratio": _median([r["bytes_in"] / r["bytes_out"] for r in rows if r["bytes_out"]]),
+                "size": _median([r["bytes_written"] for r in rows]),
+                "phases": {name: _median([r[name] for r in rows]) for name in PHASES},
+                "trend": trend,
+            })
+        return result
+
+
+def record_operation(metrics, path=None):
+    """Grava as métricas; um erro aqui só vai para o log"""
+    try:
+        with MetricsStore(path) as store:
+            store.record(metrics)
+    except Exception as e:
+        log_event("ERROR", f"Erro ao gravar métricas: {str(e)}")
@@ -1,43 +1,288 @@
-import psutil
-from PyQt5.QtCore import QTimer
+"""
+Detecção de abertura/fechamento dos jogos.
 
+Enquanto nenhum jogo roda, a tabela de processos é varrida com intervalo
+adaptativo: volta ao mínimo quando surgem processos novos (alguém abriu
+algo) e cresce até o máximo quando nada muda. A varredura só busca o nome
+de processos que ainda não conhecia (PID + horário de início, já que PIDs
+são reusados).
 
-class GameProcessWatcher:
-    def __init__(self, on_open, on_close):
-        self.on_open = on_open
-        self.on_close = on_close
+Quando um jogo é encontrado, só o PID dele é acompanhado (existe e tem o
+mesmo horário de criação?) até ele fechar; nada de varrer tudo de novo.
 
-        self.states = {
-            "MSC": False,
-            "MWC": False
-        }
+O núcleo (ProcessWatcher) não depende de Qt; GameProcessWatcher é o
+adaptador com QTimer usado pela interface. O PyQt5 só é importado quando o
+adaptador é criado, então a CLI e o daemon carregam este módulo sem Qt.
+"""
+import os
+import sys
+import time
 
-        self.process_names = {
-            "MSC": "mysummercar.exe",
-            "MWC": "mywintercar.exe"
-        }
+from logger import log_event
+from profiling import profiled
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.check_processes)
+PROCESS_NAMES = {
+    "MSC": "mysummercar.exe",
+    "MWC": "mywintercar.exe"
+}
 
-    def start(self):
-        self.timer.start(2000)
+MIN_INTERVAL = 2.0
+MAX_INTERVAL = 10.0
+BACKOFF = 1.5
+TRACK_INTERVAL = 2.0
 
-    def check_processes(self):
-        running = set()
-        for proc in psutil.process_iter(attrs=["name"]):
+
+# ================= BACKENDS =================
+class PsutilBackend:
+    """Tabela de processos via psutil (Windows e demais sistemas)"""
+
+    name_limit = None
+
+    def __init__(self):
+        import psutil
+        self._psutil = psutil
+        # (pid, horário de criação) -> nome: o Windows reusa PIDs rápido, e um
+        # PID que morreu e voltou entre duas varreduras é outro processo
+        self._names = {}
+
+    def scan(self):
+        """{pid: nome em minúsculas}; só processos novos têm o nome consultado"""
+        names = {}
+        for pid in self._psutil.pids():
             try:
-                running.add(proc.info["name"].lower())
+                process = self._psutil.Process(pid)
+                key = (pid, process.create_time())
+                name = self._names.get(key)
+                if name is None:
+                    name = process.name().lower()
             except Exception:
-                pass
+                # Processo sumiu ou sem permissão: tenta de novo na próxima
+                continue
+            names[key] = name
+        self._names = names
+        return {pid: name for (pid, _created), name in names.items()}
 
-        for game, exe in self.process_names.items():
-            is_running = exe in running
+    def identity(self, pid):
+        """Marca que distingue o processo de outro que reuse o PID"""
+        try:
+            return self._psutil.Process(pid).create_time()
+        except Exception:
+            return None
 
-            if is_running and not self.states[game]:
-                self.states[game] = True
-                self.on_open(game)
+    def is_running(self, pid, identity):
+        return identity is not None and self.identity(pid) == identity
+
+    def forget(self, pid):
+        for key in [key for key in self._names if key[0] == pid]:
+            del self._names[key]
+
+
+class ProcBackend:
+    """Leitura direta de /proc (Linux, jogos rodando pelo Proton/Wine)"""
+
+    # /proc/<pid>/comm guarda só os 15 primeiros caracteres do nome
+    name_limit = 15
+
+    def __init__(self, proc_dir="/proc"):
+        self.proc_dir = proc_dir
+        # (pid, instante de início) -> nome: um PID reusado é outro processo
+        self._names = {}
+
+    def _read(self, pid, name):
+        with open(os.path.join(self.proc_dir, str(pid), name), "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def scan(self):
+        """{pid: nome em minúsculas}; só processos novos têm o nome consultado"""
+        names = {}
+        for entry in os.listdir(self.proc_dir):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            key = (pid, self.identity(pid))
+            if key[1] is None:
+                # Processo sumiu: tenta de novo na próxima
+                continue
+            name = self._names.get(key)
+            if name is None:
+                try:
+                    name = self._read(pid, "comm").strip().lower()
+                except OSError:
+                    continue
+            names[key] = name
+        self._names = names
+        return {pid: name for (pid, _started), name in names.items()}
+
+    def identity(self, pid):
+        """Instante de início do processo (campo 22 de /proc/<pid>/stat)"""
+        try:
+            stat = self._read(pid, "stat")
+        except OSError:
+            return None
+        # O nome entre parênteses pode ter espaços: conta a partir do último ")"
+        return stat.rpartition(")")[2].split()[19]
+
+    def is_running(self, pid, identity):
+        return identity is not None and self.identity(pid) == identity
+
+    def forget(self, pid):
+        for key in [key for key in self._names if key[0] == pid]:
+            del self._names[key]
+
+
+class FakeProcessTable:
+    """Tabela de processos em memória para testes e benchmarks"""
+
+    name_limit = None
+
+    def __init__(self):
+        self.processes = {}
+        self.scans = 0
+        self._next_pid = 1000
+        self._generation = 0
+
+    def spawn(self, name, pid=None):
+        """Novo processo; com pid, reusa o número de um processo que já fechou"""
+        if pid is None:
+            self._next_pid += 1
+            pid = self._next_pid
+        self._generation += 1
+        self.processes[pid] = (name.lower(), self._generation)
+        return pid
+
+    def kill(self, pid):
+        self.processes.pop(pid, None)
+
+    def scan(self):
+        self.scans += 1
+        return {pid: name for pid, (name, _gen) in self.processes.items()}
+
+    def identity(self, pid):
+        entry = self.processes.get(pid)
+        return entry[1] if entry else None
 
-            elif not is_running and self.states[game]:
+    def is_running(self, pid, identity):
+        return identity is not None and self.identity(pid) == identity
+
+    def forget(self, pid):
+        pass
+
+
+def default_backend():
+    """psutil quando disponível; sem ele, /proc no Linux"""
+    try:
+        return PsutilBackend()
+    except ImportError:
+        if sys.platform.startswith("linux"):
+            return ProcBackend()
+        raise
+
+
+# ================= NÚCLEO =================
+class ProcessWatcher:
+    """
+    Máquina de estados da detecção, sem Qt. poll() verifica os processos,
+    dispara on_open/on_close e retorna em quantos segundos chamar de novo.
+    """
+
+    def __init__(self, on_open, on_close, backend=None, process_names=None,
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 backoff=BACKOFF, track_interval=TRACK_INTERVAL, clock=time.monotonic):
+        self.on_open = on_open
+        self.on_close = on_close
+        self._backend = backend
+        self.process_names = dict(process_names or PROCESS_NAMES)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.track_interval = track_interval
+        self.clock = clock
+
+        self.states = {game: False for game in self.process_names}
+        # game -> (pid, identidade) do processo acompanhado
+        self.tracked = {}
+        self.interval = min_interval
+        self._known_pids = None
+        self._next_scan = 0.0
+
+    @property
+    def backend(self):
+        # psutil só é carregado na primeira verificação: a bandeja aparece antes
+        if self._backend is None:
+            self._backend = default_backend()
+        return self._backend
+
+    def _match(self, exe):
+        limit = self.backend.name_limit
+        return exe[:limit] if limit else exe
+
+    def poll(self):
+        # Jogos abertos: só confere se o PID acompanhado continua vivo
+        for game, (pid, identity) in list(self.tracked.items()):
+            if not self.backend.is_running(pid, identity):
+                del self.tracked[game]
+                self.backend.forget(pid)
                 self.states[game] = False
                 self.on_close(game)
+
+        waiting = [game for game in self.process_names if game not in self.tracked]
+        if not waiting:
+            return self.track_interval
+        now = self.clock()
+        if now < self._next_scan:
+            # Um jogo aberto é conferido antes da próxima varredura pelo outro
+            return min(self.track_interval, self._next_scan - now)
+
+        names = self.backend.scan()
+        wanted = {self._match(self.process_names[game]): game for game in waiting}
+        for pid, name in names.items():
+            game = wanted.get(name)
+            if game and game not in self.tracked:
+                identity = self.backend.identity(pid)
+                if identity is None:
+                    continue
+                self.tracked[game] = (pid, identity)
+                self.states[game] = True
+                self.on_open(game)
+
+        # Processos novos desde a última varredura: algo está sendo aberto
+        pids = set(names)
+        if self._known_pids is None or pids - self._known_pids:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        self._known_pids = pids
+        self._next_scan = now + self.interval
+
+        if self.tracked:
+            return min(self.interval, self.track_interval)
+        return self.interval
+
+
+# ================= ADAPTADOR QT =================
+class GameProcessWatcher:
+    def __init__(self, on_open, on_close, backend=None):
+        from PyQt5.QtCore import QTimer
+
+        self.core = ProcessWatcher(on_open, on_close, backend=backend)
+        self.states = self.core.states
+        self.process_names = self.core.process_names
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.check_processes)
+
+    def start(self):
+        self.timer.start(int(self.core.min_interval * 1000))
+
+    def stop(self):
+        self.timer.stop()
+
+    @profiled("process_check")
+    def check_processes(self):
+        try:
+            delay = self.core.poll()
+        except Exception as e:
+            log_event("ERROR", f"Erro ao verificar processos: {str(e)}")
+            delay = self.core.max_interval
+        self.timer.start(int(delay * 1000))
@@ -0,0 +1,224 @@
+"""
+Modo de diagnóstico: profiling sob demanda das operações do app.
+
+Desligado por padrão. Liga com a variável de ambiente BECUPE_PROFILE=1 ou
+pelo menu da bandeja. Funções marcadas com @profiled("nome") passam a rodar
+sob cProfile, e o tracemalloc acompanha a memória. Desligado, o decorador
+só confere uma variável global antes de chamar a função.
+
+Arquivos gravados em <pasta do app>/profiles/:
+- <nome>.prof: profile acumulado de todas as chamadas da operação
+  (abre com pstats ou snakeviz);
+- <nome>_<data>.prof: uma chamada que demorou mais que SLOW_CALL segundos;
+- summary.txt: chamadas, tempos e pico de memória por operação, as TOP_N
+  funções mais caras de cada uma e as linhas que mais alocam memória.
+
+Só um cProfile pode estar ativo por vez no processo (no Python 3.12 ele é
+global); uma chamada que chega com outra sendo perfilada só é cronometrada.
+O profile cobre a thread que chamou a função, não os pools que ela usa.
+cProfile, pstats e tracemalloc só são importados quando o modo é ligado.
+"""
+import atexit
+import functools
+import io
+import os
+import threading
+import time
+from datetime import datetime
+
+from app_paths import get_data_dir
+from logger import log_event
+
+ENV_VAR = "BECUPE_PROFILE"
+PROFILE_DIR = os.path.join(get_data_dir(), "profiles")
+
+# Chamadas acima disso ganham um .prof próprio
+SLOW_CALL = 0.5
+# .prof de chamadas lentas guardados por operação
+MAX_SLOW_DUMPS = 10
+# Funções listadas por operação no summary.txt
+TOP_N = 20
+# Segundos entre gravações dos acumulados enquanto o modo estiver ligado
+DUMP_INTERVAL = 60.0
+TRACEMALLOC_FRAMES = 10
+
+_enabled = False
+_profiler_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_operations = {}
+_last_dump = 0.0
+
+
+class _OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.profiled = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.peak_memory = 0
+        self.stats = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    """Liga o modo de diagnóstico"""
+    global _enabled, _last_dump
+    if _enabled:
+        return
+    import tracemalloc
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    _last_dump = time.monotonic()
+    _enabled = True
+    log_event("INFO", f"Modo de diagnóstico ligado (profiles em {PROFILE_DIR})")
+
+
+def disable():
+    """Desliga o modo de diagnóstico e grava os resultados"""
+    global _enabled
+    if not _enabled:
+        return
+    _enabled = False
+    dump()
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    with _stats_lock:
+        _operations.clear()
+    log_event("INFO", f"Modo de diagnóstico desligado, resultados em {PROFILE_DIR}")
+
+
+def profiled(name):
+    """Decorador: perfila a função com o nome de operação name quando ligado"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            return _run_profiled(name, func, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def _run_profiled(name, func, args, kwargs):
+    import cProfile
+    import tracemalloc
+
+    if not _profiler_lock.acquire(blocking=False):
+        # Outra operação está sendo perfilada: só mede o tempo
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _account(name, time.perf_counter() - start, None, 0)
+
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - before if tracing else 0
+        _profiler_lock.release()
+        _account(name, elapsed, profiler, peak)
+
+
+def _account(name, elapsed, profiler, peak):
+    import pstats
+
+    try:
+        with _stats_lock:
+            op = _operations.setdefault(name, _OperationStats())
+            op.calls += 1
+            op.total += elapsed
+            op.slowest = max(op.slowest, elapsed)
+            op.peak_memory = max(op.peak_memory, peak)
+            if profiler is not None:
+                op.profiled += 1
+                if op.stats is None:
+                    op.stats = pstats.Stats(profiler)
+                else:
+                    op.stats.add(profiler)
+        if profiler is not None and elapsed >= SLOW_CALL:
+            _dump_slow_call(name, profiler)
+        if time.monotonic() - _last_dump >= DUMP_INTERVAL:
+            dump()
+    except Exception as e:
+        # Diagnóstico nunca derruba a operação
+        log_event("ERROR", f"Erro no profiling de {name}: {str(e)}")
+
+
+def _dump_slow_call(name, profiler):
+    stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f")
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name}_{stamp}.prof"))
+    prefix = f"{name}_"
+    dumps = sorted(
+        f for f in os.listdir(PROFILE_DIR)
+        if f.startswith(prefix) and f.endswith(".prof") and f[len(prefix):len(prefix) + 1].isdigit()
+    )
+    for old in dumps[:max(0, len(dumps) - MAX_SLOW_DUMPS)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError:
+            pass
+
+
+def dump():
+    """Grava os profiles acumulados e o summary.txt"""
+    import tracemalloc
+    global _last_dump
+
+    _last_dump = time.monotonic()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    out = io.StringIO()
+    out.write(f"BECUPE - diagnóstico gerado em {datetime.now():%Y-%m-%d %H:%M:%S}\n\n")
+    with _stats_lock:
+        for name, op in sorted(_operations.items()):
+            average = op.total / op.calls if op.calls else 0.0
+            out.write(
+                f"== {name}: {op.calls} chamadas ({op.profiled} perfiladas), "
+                f"total {op.total:.3f}s, média {average * 1000:.1f}ms, "
+                f"mais lenta {op.slowest * 1000:.1f}ms, pico de memória {op.peak_memory / 1024:.0f} KiB\n"
+            )
+            if op.stats is None:
+                out.write("\n")
+                continue
+            op.stats.dump_stats(os.path.join(PROFILE_DIR, f"{name}.prof"))
+            op.stats.stream = out
+            op.stats.sort_stats("cumulative").print_stats(TOP_N)
+
+    if tracemalloc.is_tracing():
+        out.write(f"== Memória: {TOP_N} linhas que mais alocam (vivas agora)\n")
+        for stat in tracemalloc.take_snapshot().statistics("lineno")[:TOP_N]:
+            out.write(f"{stat}\n")
+
+    tmp = os.path.join(PROFILE_DIR, "summary.txt.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    os.replace(tmp, os.path.join(PROFILE_DIR, "summary.txt"))
+
+
+def _dump_at_exit():
+    if _enabled:
+        try:
+            dump()
+        except Exception:
+            pass
+
+
+atexit.register(_dump_at_exit)
+
+if os.environ.get(ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on"):
+    enable()
@@ -0,0 +1,133 @@
+"""
+Progresso e cancelamento cooperativo de backups e restaurações.
+
+A operação chama advance() conforme avança; o objeto calcula vazão e tempo
+restante e repassa um resumo ao callback (no máximo a cada min_interval
+segundos). cancel() pode ser chamado de qualquer thread: a operação percebe
+na próxima chamada de advance()/check() e levanta OperationCancelled.
+"""
+import threading
+import time
+
+
+class OperationCancelled(Exception):
+    """A operação foi cancelada pelo usuário"""
+
+
+class Progress:
+    def __init__(self, callback=None, min_interval=0.2):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.phase = ""
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.cancellable = True
+        self._cancel = threading.Event()
+        self._started = time.monotonic()
+        self._last_report = 0.0
+
+    # ================= CONTROLE =================
+    def start(self, phase, files_total, bytes_total):
+        """Inicia uma fase (ex: "backup", "restauração") com os totais conhecidos"""
+        self.phase = phase
+        self.files_total = files_total
+        self.bytes_total = bytes_total
+        self.files_done = 0
+        self.bytes_done = 0
+        self._started = time.monotonic()
+        self._report(force=True)
+
+    def advance(self, files=0, nbytes=0):
+        """Registra o avanço; levanta OperationCancelled se foi cancelado"""
+        self.files_done += files
+        self.bytes_done += nbytes
+        self.check()
+        self._report()
+
+    def finish(self):
+        self.files_done = self.files_total
+        self.bytes_done = max(self.bytes_done, self.bytes_total)
+        self._report(force=True)
+
+    def set_cancellable(self, cancellable):
+        """Marca trechos que não podem ser interrompidos com segurança"""
+        self.cancellable = cancellable
+        self._report(force=True)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self.cancellable and self._cancel.is_set():
+            raise OperationCancelled(f"Operação cancelada pelo usuário ({self.phase})")
+
+    # ================= MÉTRICAS =================
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    @property
+    def throughput(self):
+        """Bytes por segundo desde o início da fase"""
+        elapsed = self.elapsed
+        return self.bytes_done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Segundos restantes estimados (None enquanto não dá para estimar)"""
+        speed = self.throughput
+        if speed <= 0 or not self.bytes_total:
+            return None
+        return max(0.0, (self.bytes_total - self.bytes_done) / speed)
+
+    @property
+    def percent(self):
+        if self.bytes_total:
+            return min(100, int(self.bytes_done * 100 / self.bytes_total))
+        if self.files_total:
+            return min(100, int(self.files_done * 100 / self.files_total))
+        return 0
+
+    def snapshot(self):
+        """Resumo imutável para mandar a outra thread"""
+        return {
+            "phase": self.phase,
+            "files_done": self.files_done,
+            "files_total": self.files_total,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.bytes_total,
+            "throughput": self.throughput,
+            "eta": self.eta,
+            "percent": self.percent,
+            "cancellable": self.cancellable,
+        }
+
+    def _report(self, force=False):
+        if not self.callback:
+            return
+        now = time.monotonic()
+        if force or now - self._last_report >= self.min_interval:
+            self._last_report = now
+            self.callback(self.snapshot())
+
+
+def format_bytes(nbytes):
+    """Formata bytes para exibição (KB, MB, GB)"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if nbytes < 1024 or unit == "GB":
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+
+
+def describe(snapshot):
+    """Texto curto do progresso (para barra de status e tooltip da bandeja)"""
+    text = f"{snapshot['phase']} {snapshot['percent']}% ({format_bytes(snapshot['throughput'])}/s"
+    if snapshot["eta"] is not None:
+        text += f", faltam {snapshot['eta']:.0f}s"
+    return text + ")"
@@ -1,31 +1,488 @@
 import shutil
 import os
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logger import log_event
+from manifest import read_manifest, resolve_base
+from chunk_store import ChunkStore, is_chunk_snapshot, read_snapshot
+from progress import OperationCancelled
+from tree_cache import TreeHashCache
+from zip_writer import default_workers
+from profiling import profiled
+from catalog import parse_backup_name
+from metrics import (
+    OperationMetrics, record_operation, OP_RESTORE,
+    OUTCOME_CANCELLED, OUTCOME_FAILED
+)
 
-def restore_backup(becupe_file, target_path):
+RESTORE_FULL = "full"
+RESTORE_DIFF = "diff"
+RESTORE_STAGED = "staged"
+
+# Pastas irmãs da pasta do jogo usadas pela restauração atômica
+STAGING_SUFFIX = ".becupe_staging"
+ROLLBACK_SUFFIX = ".becupe_rollback"
+# Rollback da restauração anterior enquanto a troca não termina
+OLD_ROLLBACK_SUFFIX = ".becupe_rollback_old"
+
+
+def resolve_chain(becupe_file):
+    """
+    Monta a cadeia de backups necessária para restaurar um .becupe.
+
+    Returns:
+        (chain, manifest): chain vai do backup completo até becupe_file;
+        manifest é o manifesto do backup pedido (None para backups antigos)
+    """
+    chain = []
+    manifest = None
+    current = becupe_file
+    while True:
+        with zipfile.ZipFile(current, 'r') as zip_ref:
+            current_manifest = read_manifest(zip_ref)
+        if not chain:
+            manifest = current_manifest
+        chain.insert(0, current)
+        if not current_manifest or current_manifest.get("type") != "incremental":
+            return chain, manifest
+        base = resolve_base(current, current_manifest)
+        if not os.path.exists(base):
+            raise FileNotFoundError(f"Backup base da cadeia não encontrado: {base}")
+        if base in chain:
+            raise ValueError(f"Cadeia de backups circular: {base}")
+        current = base
+
+
+def safe_join(target_path, rel):
+    """Junta o caminho relativo do backup à pasta do jogo sem permitir sair dela"""
+    parts = [p for p in rel.split("/") if p not in ("", ".")]
+    if not parts or ".." in parts or os.path.isabs(rel) or ":" in parts[0]:
+        raise ValueError(f"Caminho inválido no backup: {rel}")
+    return os.path.join(target_path, *parts)
+
+
+class _CountingPlan:
+    """Contadores de bytes lidos do backup e gravados no disco (entre threads)"""
+
+    def _init_counters(self):
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._count_lock = threading.Lock()
+
+    def _count(self, read, written):
+        with self._count_lock:
+            self.bytes_read += read
+            self.bytes_written += written
+
+
+class ZipRestorePlan(_CountingPlan):
+    """
+    Plano de restauração de um .becupe zip (completo, incremental ou antigo).
+
+    files: {caminho_relativo: {"size", "crc", ...}} com o estado final do save
+    dirs: subpastas a recriar (inclusive vazias)
+    """
+
+    def __init__(self, becupe_file):
+        chain, manifest = resolve_chain(becupe_file)
+        self._init_counters()
+        self._zips = {}
+        self.sources = {}
+        if manifest is None:
+            # Backup antigo (sem manifesto): o próprio zip define o estado
+            zip_ref = self._open(becupe_file)
+            self.files = {}
+            self.dirs = []
+            for info in zip_ref.infolist():
+                if info.is_dir():
+                    self.dirs.append(info.filename.rstrip("/"))
+                else:
+                    self.files[info.filename] = {"size": info.file_size, "crc": info.CRC}
+                    self.sources[info.filename] = becupe_file
+            return
+
+        self.files = manifest["files"]
+        self.dirs = manifest.get("dirs", [])
+        # Do mais novo para o mais antigo: a versão mais recente de cada arquivo vence
+        for archive in reversed(chain):
+            names = set(self._open(archive).namelist())
+            for rel in self.files:
+                if rel not in self.sources and rel in names:
+                    self.sources[rel] = archive
+
+        missing = [rel for rel in self.files if rel not in self.sources]
+        if missing:
+            self.close()
+            raise FileNotFoundError(f"Arquivos ausentes na cadeia de backups: {', '.join(missing[:5])}")
+
+    def _open(self, archive):
+        if archive not in self._zips:
+            self._zips[archive] = zipfile.ZipFile(archive, 'r')
+        return self._zips[archive]
+
+    def write(self, rel, dest_path):
+        """Grava o arquivo rel do backup em dest_path"""
+        zip_ref = self._open(self.sources[rel])
+        info = zip_ref.getinfo(rel)
+        with zip_ref.open(info) as src, open(dest_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        self._count(info.compress_size, info.file_size)
+
+    def close(self):
+        for zip_ref in self._zips.values():
+            zip_ref.close()
+        self._zips = {}
+
+
+class ChunkRestorePlan(_CountingPlan):
+    """Plano de restauração de um índice do repositório de blocos"""
+
+    def __init__(self, becupe_file):
+        snapshot = read_snapshot(becupe_file)
+        self._init_counters()
+        self.store = ChunkStore.for_snapshot(becupe_file, snapshot)
+        self.files = snapshot["files"]
+        self.dirs = snapshot.get("dirs", [])
+
+    def write(self, rel, dest_path):
+        """Remonta o arquivo rel a partir dos blocos em dest_path"""
+        self.store.write_file(self.files[rel]["chunks"], dest_path)
+        size = self.files[rel]["size"]
+        self._count(size, size)
+
+    def close(self):
+        pass
+
+
+def open_restore_plan(becupe_file):
+    """Abre o plano de restauração adequado ao tipo do .becupe"""
+    if is_chunk_snapshot(becupe_file):
+        return ChunkRestorePlan(becupe_file)
+    return ZipRestorePlan(becupe_file)
+
+
+def verify_backup(becupe_file):
+    """
+    Confere se um backup pode ser restaurado: a cadeia de incrementais está
+    completa e todo o conteúdo bate com o CRC (zip) ou o SHA-256 (blocos).
+    Retorna a lista de problemas encontrados (vazia = backup íntegro).
+    """
+    try:
+        plan = open_restore_plan(becupe_file)
+    except Exception as e:
+        return [str(e)]
+    problems = []
+    try:
+        if isinstance(plan, ChunkRestorePlan):
+            checked = set()
+            for rel, entry in plan.files.items():
+                for digest, _size in entry["chunks"]:
+                    if digest in checked:
+                        continue
+                    checked.add(digest)
+                    try:
+                        plan.store.read_chunk(digest)
+                    except FileNotFoundError:
+                        problems.append(f"{rel}: bloco ausente {digest[:12]}")
+                    except Exception as e:
+                        problems.append(f"{rel}: {str(e)}")
+        else:
+            for archive in sorted(set(plan.sources.values())):
+                try:
+                    bad = plan._open(archive).testzip()
+                except Exception as e:
+                    problems.append(f"{os.path.basename(archive)}: {str(e)}")
+                    continue
+                if bad:
+                    problems.append(f"{os.path.basename(archive)}: CRC inválido em {bad}")
+    finally:
+        plan.close()
+    return problems
+
+
+def _write_entry(plan, rel, dest):
+    """Grava um arquivo do backup (via temporário) com o mtime original"""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = dest + ".becupe_tmp"
+    plan.write(rel, tmp)
+    mtime = plan.files[rel].get("mtime")
+    if mtime:
+        os.utime(tmp, ns=(mtime, mtime))
+    os.replace(tmp, dest)
+
+
+def _restore_full(plan, target_path, progress):
+    """Apaga a pasta do jogo e grava todos os arquivos do backup"""
+    if progress:
+        # Daqui em diante parar no meio deixaria o save pela metade
+        progress.set_cancellable(False)
+    # Remove a pasta existente se houver
+    if os.path.exists(target_path):
+        shutil.rmtree(target_path)
+
+    # Cria a pasta do jogo
+    os.makedirs(target_path, exist_ok=True)
+
+    for rel in plan.dirs:
+        os.makedirs(safe_join(target_path, rel), exist_ok=True)
+    for rel in plan.files:
+        _write_entry(plan, rel, safe_join(target_path, rel))
+        if progress:
+            progress.advance(files=1, nbytes=plan.files[rel]["size"])
+    return len(plan.files), 0
+
+
+def _restore_diff(plan, target_path, progress):
+    """
+    Grava só os arquivos cujo tamanho/CRC difere do disco e apaga os que não
+    existem no backup. O CRC do disco vem do cache da árvore (só arquivos com
+    stat alterado são relidos).
+    """
+    if progress:
+        progress.set_cancellable(False)
+    os.makedirs(target_path, exist_ok=True)
+    cache = TreeHashCache(target_path)
+    cache.refresh()
+    on_disk = cache.files
+
+    removed = 0
+    for rel in on_disk:
+        if rel not in plan.files:
+            os.remove(safe_join(target_path, rel))
+            removed += 1
+
+    # Pastas: remove (de baixo para cima) as que não existem no backup
+    keep = set(plan.dirs)
+    for rel in plan.files:
+        parent = rel.rpartition("/")[0]
+        while parent:
+            keep.add(parent)
+            parent = parent.rpartition("/")[0]
+    for rel in sorted(cache.dirs, key=lambda d: d.count("/"), reverse=True):
+        if rel not in keep:
+            shutil.rmtree(safe_join(target_path, rel), ignore_errors=True)
+    for rel in plan.dirs:
+        os.makedirs(safe_join(target_path, rel), exist_ok=True)
+
+    written = 0
+    for rel, entry in plan.files.items():
+        current = on_disk.get(rel)
+        if not (current and current["size"] == entry["size"] and current["crc"] == entry["crc"]):
+            _write_entry(plan, rel, safe_join(target_path, rel))
+            written += 1
+        if progress:
+            progress.advance(files=1, nbytes=entry["size"])
+
+    cache.refresh()
+    return written, removed
+
+
+def _fill_staging(plan, target_path, staging, progress, workers):
+    """
+    Monta o estado do backup em staging. Arquivos idênticos ao disco são
+    copiados da pasta atual (mais barato que descomprimir); o resto é extraído
+    em paralelo.
+    """
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+    for rel in plan.dirs:
+        os.makedirs(safe_join(staging, rel), exist_ok=True)
+
+    on_disk = {}
+    if os.path.isdir(target_path):
+        cache = TreeHashCache(target_path)
+        cache.refresh()
+        on_disk = cache.files
+
+    def build(rel, entry):
+        dest = safe_join(staging, rel)
+        current = on_disk.get(rel)
+        if current and current["size"] == entry["size"] and current["crc"] == entry["crc"]:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copy2(safe_join(target_path, rel), dest)
+            return False
+        _write_entry(plan, rel, dest)
+        return True
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as executor:
+        futures = {
+            executor.submit(build, rel, entry): entry
+            for rel, entry in plan.files.items()
+        }
+        try:
+            for future in as_completed(futures):
+                if future.result():
+                    written += 1
+                if progress:
+                    progress.advance(files=1, nbytes=futures[future]["size"])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return written
+
+
+def _swap_in(staging, target_path):
+    """
+    Troca a pasta do jogo pela pasta montada com dois renames. A pasta antiga
+    vira o ponto de rollback (backup de proteção instantâneo).
+
+    O rollback da restauração anterior só é apagado depois da troca dar
+    certo: se um rename falhar (no Windows, com o jogo segurando arquivos
+    do save), tudo volta como estava.
+    """
+    rollback = target_path + ROLLBACK_SUFFIX
+    if not os.path.exists(target_path):
+        # Sem save atual não há o que guardar: o rollback anterior continua valendo
+        os.rename(staging, target_path)
+        return None
+
+    previous = None
+    if os.path.exists(rollback):
+        previous = target_path + OLD_ROLLBACK_SUFFIX
+        if os.path.exists(previous):
+            shutil.rmtree(previous)
+        os.rename(rollback, previous)
+
+    try:
+        os.rename(target_path, rollback)
+        try:
+            os.rename(staging, target_path)
+        except OSError as error:
+            # Desfaz o primeiro rename para o jogo nunca ficar sem a pasta
+            try:
+                os.rename(rollback, target_path)
+            except OSError:
+                # Tratado abaixo: o save atual continua em rollback
+                pass
+            raise error
+    except OSError as error:
+        if os.path.exists(rollback):
+            # O save atual ficou preso no lugar do rollback: nada é movido por cima
+            where = f"save atual em {rollback}"
+            if previous:
+                where += f", save da restauração anterior em {previous}"
+            log_event("ERROR", f"Troca de pastas falhou ({error}) e não foi desfeita: {where}")
+        elif previous:
+            try:
+                os.rename(previous, rollback)
+            except OSError:
+                log_event("ERROR", f"Save da restauração anterior ficou em {previous}")
+        raise error
+
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+    return rollback
+
+
+def has_rollback(target_path):
+    """Existe um save anterior guardado pela última restauração atômica?"""
+    return os.path.isdir(target_path + ROLLBACK_SUFFIX)
+
+
+def undo_restore(target_path):
+    """Volta o save guardado pela última restauração atômica"""
+    rollback = target_path + ROLLBACK_SUFFIX
+    if not os.path.isdir(rollback):
+        raise FileNotFoundError("Nenhuma restauração para desfazer")
+    discarded = target_path + STAGING_SUFFIX
+    if os.path.exists(discarded):
+        shutil.rmtree(discarded)
+    os.rename(target_path, discarded)
+    try:
+        os.rename(rollback, target_path)
+    except OSError:
+        os.rename(discarded, target_path)
+        raise
+    shutil.rmtree(discarded, ignore_errors=True)
+    log_event("RESTORE", f"Restauração desfeita: {target_path}")
+
+
+def _restore_staged(plan, target_path, progress, workers):
+    """Monta o save numa pasta irmã e troca de lugar com a atual"""
+    staging = target_path + STAGING_SUFFIX
+    try:
+        written = _fill_staging(plan, target_path, staging, progress, workers)
+        if progress:
+            progress.set_cancellable(False)
+        rollback = _swap_in(staging, target_path)
+    except BaseException:
+        # Cancelamento ou erro: a pasta do jogo não foi tocada (ou a troca foi desfeita)
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if rollback:
+        log_event("RESTORE", f"Save anterior guardado para desfazer: {rollback}")
+    return written, 0
+
+
+@profiled("restore")
+def restore_backup(becupe_file, target_path, progress=None, mode=RESTORE_FULL, workers=None):
     """
     Restaura um backup .becupe para a pasta do jogo.
-    
+    Backups incrementais são reconstruídos a partir da cadeia completa e
+    índices do repositório de blocos são remontados a partir dos blocos.
+
     Args:
-        becupe_file: Caminho do arquivo .becupe (zip)
+        becupe_file: Caminho do arquivo .becupe
         target_path: Caminho da pasta do jogo onde extrair
+        progress: progress.Progress para acompanhar. O cancelamento é aceito até
+                  a pasta atual ser alterada (no modo atômico, até a troca)
+        mode: RESTORE_FULL apaga a pasta e extrai tudo; RESTORE_DIFF reescreve só
+              os arquivos diferentes e apaga os que não estão no backup;
+              RESTORE_STAGED monta o save numa pasta irmã e troca as pastas com
+              renames, guardando a pasta antiga para undo_restore()
+        workers: Threads de extração do modo atômico
     """
+    game, event, _created = parse_backup_name(os.path.basename(becupe_file))
+    metrics = OperationMetrics(OP_RESTORE, game, event)
+    metrics.kind = mode
     try:
-        log_event("RESTORE", f"Iniciando restauração de: {becupe_file}")
-        
-        # Remove a pasta existente se houver
-        if os.path.exists(target_path):
-            shutil.rmtree(target_path)
-
-        # Cria a pasta do jogo
-        os.makedirs(target_path, exist_ok=True)
-
-        # Extrai o arquivo zip diretamente na pasta do jogo
-        with zipfile.ZipFile(becupe_file, 'r') as zip_ref:
-            zip_ref.extractall(target_path)
-        
-        log_event("RESTORE", f"Restauração concluída: {target_path}")
+        log_event("RESTORE", f"Iniciando restauração ({mode}) de: {becupe_file}")
+
+        # Resolve a cadeia antes de mexer em qualquer coisa
+        with metrics.phase("scan"):
+            plan = open_restore_plan(becupe_file)
+        metrics.backend = "chunks" if isinstance(plan, ChunkRestorePlan) else "zip"
+        try:
+            if progress:
+                progress.start("Restauração", len(plan.files),
+                               sum(entry["size"] for entry in plan.files.values()))
+                progress.check()
+
+            with metrics.phase("write"):
+                if mode == RESTORE_STAGED:
+                    written, removed = _restore_staged(plan, target_path, progress, workers)
+                elif mode == RESTORE_DIFF:
+                    written, removed = _restore_diff(plan, target_path, progress)
+                else:
+                    written, removed = _restore_full(plan, target_path, progress)
+        finally:
+            plan.close()
+            metrics.files = len(plan.files)
+            metrics.bytes_read = plan.bytes_read
+            metrics.bytes_written = plan.bytes_written
+            metrics.bytes_in = plan.bytes_written
+            metrics.bytes_out = plan.bytes_read
+        if progress:
+            progress.finish()
+        metrics.changed = written
+        metrics.finish()
+
+        log_event(
+            "RESTORE",
+            f"Restauração concluída: {target_path} "
+            f"({written} de {len(plan.files)} arquivos gravados, {removed} removidos)"
+        )
+    except OperationCancelled:
+        log_event("RESTORE", f"Restauração cancelada: {becupe_file}")
+        metrics.finish(OUTCOME_CANCELLED)
+        raise
     except Exception as e:
         log_event("ERROR", f"Erro ao restaurar backup: {str(e)}")
+        metrics.finish(OUTCOME_FAILED)
         raise
+    finally:
+        record_operation(metrics)
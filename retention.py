@@ -0,0 +1,284 @@
+"""
+Retenção (limpeza) dos backups automáticos no esquema avô-pai-filho.
+
+Regras, por jogo + evento:
+- os `last` backups mais recentes ficam sempre;
+- o mais recente de cada um dos `daily` últimos dias com backup fica;
+- o mesmo para as `weekly` últimas semanas e os `monthly` últimos meses;
+- com `max_gb`, os mais antigos que sobraram saem até o total caber na cota
+  (a cota vale para a pasta toda, todos os jogos juntos).
+
+Tudo é decidido a partir do catálogo (catalog.py), sem percorrer a pasta.
+Backups que ainda servem de base para um incremental mantido, e o último
+backup de cada jogo (base do próximo incremental), nunca são apagados.
+
+As exclusões são gravadas num diário antes de começar; se o app fechar no
+meio, a próxima limpeza termina o que ficou pendente. Uma limpeza por vez
+por pasta de backups (lock em .becupe/prune.lock), já que as limpezas de
+cada jogo e a da aba de retenção podem rodar em paralelo.
+"""
+import json
+import os
+from datetime import datetime
+
+from app_paths import get_meta_dir
+from catalog import BackupCatalog
+from chunk_store import ChunkStore
+from file_lock import FileLock
+from logger import log_event
+from progress import format_bytes
+
+JOURNAL_FILE = "prune_journal.json"
+LOCK_FILE = "prune.lock"
+
+DEFAULT_POLICY = {
+    "enabled": False,
+    "last": 10,
+    "daily": 7,
+    "weekly": 4,
+    "monthly": 12,
+    "max_gb": 0,
+}
+
+
+def _day(entry):
+    return entry["created_dt"].strftime("%Y-%m-%d")
+
+
+def _week(entry):
+    year, week, _ = entry["created_dt"].isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _month(entry):
+    return entry["created_dt"].strftime("%Y-%m")
+
+
+def _base_path(entry):
+    """Caminho absoluto da base de um incremental (None para os demais)"""
+    if not entry.get("base"):
+        return None
+    return os.path.normpath(os.path.join(os.path.dirname(entry["path"]), entry["base"]))
+
+
+def _state_snapshots(backup_root):
+    """Últimos backups registrados nos manifestos de estado (base do próximo incremental)"""
+    protected = set()
+    manifests = os.path.join(get_meta_dir(backup_root), "manifests")
+    if not os.path.isdir(manifests):
+        return protected
+    for name in os.listdir(manifests):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(manifests, name), "r", encoding="utf-8") as f:
+                snapshot = json.load(f).get("snapshot")
+        except (OSError, ValueError):
+            continue
+        if snapshot:
+            protected.add(os.path.normpath(os.path.join(backup_root, snapshot)))
+    return protected
+
+
+def plan_retention(catalog, policy, game=None):
+    """
+    Decide o que apagar sem tocar em nada (também serve de simulação).
+
+    Args:
+        catalog: BackupCatalog da pasta de backups
+        policy: dict no formato de DEFAULT_POLICY
+        game: Aplica as regras avô-pai-filho só a esse jogo (usado depois de
+              cada backup); os backups dos outros jogos ficam, mas contam
+              na cota, que vale para a pasta toda
+
+    Returns:
+        dict com "delete" (entradas do catálogo), "kept" (quantidade) e
+        "reclaim" (bytes liberados pelos arquivos apagados)
+    """
+    # Backups manuais gravados em outras pastas não entram na limpeza
+    inside = os.path.join(os.path.normpath(catalog.backup_root), "")
+    entries = [
+        entry for entry in catalog.list()
+        if os.path.normpath(entry["path"]).startswith(inside)
+    ]
+    for entry in entries:
+        entry["path"] = os.path.normpath(entry["path"])
+        entry["created_dt"] = datetime.fromtimestamp(entry["created"])
+    by_path = {entry["path"]: entry for entry in entries}
+
+    groups = {}
+    for entry in entries:
+        groups.setdefault((entry["game"], entry["event"]), []).append(entry)
+
+    rules = [
+        (_day, policy.get("daily") or 0),
+        (_week, policy.get("weekly") or 0),
+        (_month, policy.get("monthly") or 0),
+    ]
+    last = max(1, policy.get("last") or 0)
+    gfs = any(n for _key, n in rules) or policy.get("last")
+
+    keep = set()
+    protected = _state_snapshots(catalog.backup_root)
+    for (group_game, _event), group in groups.items():
+        # Já vem do mais novo para o mais antigo
+        if not gfs or (game and group_game != game):
+            keep.update(entry["path"] for entry in group)
+            continue
+        protected.add(group[0]["path"])
+        keep.update(entry["path"] for entry in group[:last])
+        for key, count in rules:
+            seen = set()
+            for entry in group:
+                if len(seen) >= count:
+                    break
+                period = key(entry)
+                if period not in seen:
+                    seen.add(period)
+                    keep.add(entry["path"])
+    protected &= set(by_path)
+    keep |= protected
+
+    def close_chains(paths):
+        """Inclui as bases de todos os incrementais mantidos"""
+        closed = set(paths)
+        for path in paths:
+            base = _base_path(by_path[path])
+            while base and base in by_path and base not in closed:
+                closed.add(base)
+                base = _base_path(by_path[base])
+        return closed
+
+    keep = close_chains(keep)
+
+    max_bytes = int((policy.get("max_gb") or 0) * 1024 ** 3)
+    if max_bytes:
+        total = sum(by_path[path]["size"] for path in keep)
+        # Quantos incrementais mantidos dependem de cada backup
+        dependents = {}
+        for path in keep:
+            base = _base_path(by_path[path])
+            if base in by_path:
+                dependents[base] = dependents.get(base, 0) + 1
+        oldest_first = sorted((by_path[p] for p in keep), key=lambda e: e["created"])
+        changed = True
+        while total > max_bytes and changed:
+            changed = False
+            for entry in oldest_first:
+                if total <= max_bytes:
+                    break
+                path = entry["path"]
+                if path not in keep or path in protected or dependents.get(path):
+                    continue
+                keep.discard(path)
+                total -= entry["size"]
+                base = _base_path(entry)
+                if base in dependents:
+                    # A base pode sair numa próxima passada
+                    dependents[base] -= 1
+                    changed = True
+
+    delete = [entry for entry in entries if entry["path"] not in keep]
+    delete.sort(key=lambda e: e["created"])
+    return {
+        "delete": delete,
+        "kept": len(keep),
+        "reclaim": sum(entry["size"] for entry in delete),
+    }
+
+
+def format_report(report):
+    """Texto da simulação para mostrar ao usuário"""
+    lines = [
+        f"{len(report['delete'])} backups seriam apagados, {report['kept']} mantidos.",
+        f"Espaço liberado: {format_bytes(report['reclaim'])}",
+    ]
+    if any(entry["backend"] == "chunks" for entry in report["delete"]):
+        lines.append("Blocos deduplicados sem uso também seriam liberados.")
+    for entry in report["delete"][:20]:
+        lines.append(f"- {os.path.basename(entry['path'])} ({format_bytes(entry['size'])})")
+    if len(report["delete"]) > 20:
+        lines.append(f"... e mais {len(report['delete']) - 20}")
+    return "\n".join(lines)
+
+
+# ================= EXCLUSÃO SEGURA =================
+def _journal_path(backup_root):
+    return os.path.join(get_meta_dir(backup_root), JOURNAL_FILE)
+
+
+def _write_journal(backup_root, paths):
+    journal = _journal_path(backup_root)
+    os.makedirs(os.path.dirname(journal), exist_ok=True)
+    tmp = journal + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"paths": [os.path.relpath(p, backup_root) for p in paths]}, f)
+    os.replace(tmp, journal)
+
+
+def _run_journal(catalog):
+    """Apaga o que está no diário. Retorna (apagados, bytes liberados)"""
+    journal = _journal_path(catalog.backup_root)
+    if not os.path.exists(journal):
+        return 0, 0
+    with open(journal, "r", encoding="utf-8") as f:
+        paths = [os.path.join(catalog.backup_root, rel) for rel in json.load(f)["paths"]]
+
+    removed = freed = 0
+    folders = set()
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            removed += 1
+            freed += size
+        except FileNotFoundError:
+            pass
+        catalog.remove(path)
+        folders.add(os.path.dirname(path))
+
+    # Pastas por dia que ficaram vazias
+    for folder in folders:
+        if os.path.normpath(folder) != os.path.normpath(catalog.backup_root):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                pass
+    os.remove(journal)
+    return removed, freed
+
+
+def apply_retention(backup_root, policy, game=None, dry_run=False):
+    """
+    Aplica a política de retenção na pasta de backups.
+
+    Com dry_run nada é apagado; o relatório diz o que seria.
+    Retorna o relatório de plan_retention() com "removed"/"freed" quando aplicado.
+    """
+    if dry_run:
+        with BackupCatalog(backup_root) as catalog:
+            catalog.rescan()
+            return plan_retention(catalog, policy, game=game)
+
+    with FileLock(os.path.join(get_meta_dir(backup_root), LOCK_FILE)), BackupCatalog(backup_root) as catalog:
+        # Termina uma limpeza interrompida antes de planejar outra
+        removed, freed = _run_journal(catalog)
+        catalog.rescan()
+        report = plan_retention(catalog, policy, game=game)
+        if report["delete"]:
+            _write_journal(backup_root, [entry["path"] for entry in report["delete"]])
+            r, f = _run_journal(catalog)
+            removed += r
+            freed += f
+
+    if removed:
+        log_event("RETENTION", f"Limpeza de backups antigos: {removed} apagados ({format_bytes(freed)})")
+    if removed and os.path.isdir(os.path.join(get_meta_dir(backup_root), "store")):
+        store = ChunkStore(backup_root)
+        with store.lock():
+            if store.prune_missing():
+                chunks, chunk_bytes = store.collect_garbage()
+                log_event("RETENTION", f"Limpeza do repositório de blocos: {chunks} blocos removidos ({format_bytes(chunk_bytes)})")
+    report["removed"] = removed
+    report["freed"] = freed
+    return report
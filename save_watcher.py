@@ -0,0 +1,201 @@
+"""
+Backups contínuos: percebe quando o jogo terminou de gravar o save.
+
+Enquanto o jogo roda, a pasta de save é observada por notificações nativas
+(QFileSystemWatcher) e, como garantia, por uma varredura periódica de stat
+(tamanho + mtime de cada arquivo, sem ler conteúdo). Uma rajada de escritas
+só vira backup depois de `quiet_period` segundos sem mudanças, e nunca mais
+de um a cada `min_interval` segundos.
+
+SaveChangeDetector não depende de Qt; SaveFolderWatcher é o adaptador usado
+pela interface. A classe dele só é montada (e o PyQt5 importado) no primeiro
+acesso a save_watcher.SaveFolderWatcher, então a CLI e o daemon usam este
+módulo sem Qt.
+"""
+import os
+import time
+
+from logger import log_event
+
+QUIET_PERIOD = 10.0
+MIN_INTERVAL = 300.0
+POLL_INTERVAL = 15.0
+CHECK_INTERVAL = 2.0
+
+
+def stat_index(root):
+    """{caminho relativo: (tamanho, mtime_ns)} de todos os arquivos, só com stat"""
+    index = {}
+    stack = [("", root)]
+    while stack:
+        rel_dir, path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        index[rel + "/"] = None
+                        stack.append((rel, entry.path))
+                    else:
+                        st = entry.stat(follow_symlinks=False)
+                        index[rel] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            # Pasta apagada no meio da varredura: conta como mudança
+            continue
+    return index
+
+
+def _inside(path, root):
+    path = os.path.normcase(os.path.abspath(path))
+    root = os.path.normcase(os.path.abspath(root))
+    return path == root or path.startswith(os.path.join(root, ""))
+
+
+class SaveChangeDetector:
+    """Decide quando uma sequência de escritas no save terminou"""
+
+    def __init__(self, path, quiet_period=QUIET_PERIOD, min_interval=MIN_INTERVAL, clock=time.monotonic):
+        self.path = path
+        self.quiet_period = quiet_period
+        self.min_interval = min_interval
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """O estado atual do disco passa a ser o último salvo"""
+        self.baseline = stat_index(self.path)
+        self.current = self.baseline
+        self._last_change = self.clock()
+        self._last_fire = self.clock()
+
+    @property
+    def pending(self):
+        """Há mudanças ainda sem backup"""
+        return self.current != self.baseline
+
+    def poll(self):
+        """Varre o stat da pasta. True quando é hora de fazer o backup"""
+        now = self.clock()
+        index = stat_index(self.path)
+        if index != self.current:
+            # Ainda gravando: reinicia o período de silêncio
+            self.current = index
+            self._last_change = now
+            return False
+        if index == self.baseline:
+            return False
+        if now - self._last_change < self.quiet_period:
+            return False
+        if now - self._last_fire < self.min_interval:
+            return False
+        self.baseline = index
+        self._last_fire = now
+        return True
+
+    def next_delay(self):
+        """Segundos até valer a pena chamar poll() de novo"""
+        if not self.pending:
+            return POLL_INTERVAL
+        now = self.clock()
+        wait = max(
+            self.quiet_period - (now - self._last_change),
+            self.min_interval - (now - self._last_fire),
+            0.0
+        )
+        return max(CHECK_INTERVAL, min(wait, POLL_INTERVAL))
+
+
+def _build_qt_watcher():
+    from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+    class SaveFolderWatcher(QObject):
+        """Observa as pastas de save dos jogos abertos e emite settled(jogo)"""
+
+        settled = pyqtSignal(str)
+
+        def __init__(self, quiet_period=QUIET_PERIOD, min_interval=MIN_INTERVAL, parent=None):
+            super().__init__(parent)
+            self.quiet_period = quiet_period
+            self.min_interval = min_interval
+            self.detectors = {}
+            self.timers = {}
+            self.native = QFileSystemWatcher(self)
+            self.native.directoryChanged.connect(self._on_native_event)
+            self.native.fileChanged.connect(self._on_native_event)
+
+        def watch(self, game, path):
+            if game in self.detectors or not path or not os.path.isdir(path):
+                return
+            detector = SaveChangeDetector(path, self.quiet_period, self.min_interval)
+            self.detectors[game] = detector
+            self._add_native_paths(path, detector.current)
+
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda game=game: self._check(game))
+            self.timers[game] = timer
+            timer.start(int(detector.next_delay() * 1000))
+            log_event("WATCH", f"Observando a pasta de save de {game}: {path}")
+
+        def unwatch(self, game):
+            detector = self.detectors.pop(game, None)
+            timer = self.timers.pop(game, None)
+            if timer:
+                timer.stop()
+                timer.deleteLater()
+            if detector:
+                watched = self.native.directories() + self.native.files()
+                stale = [p for p in watched if _inside(p, detector.path)]
+                if stale:
+                    self.native.removePaths(stale)
+
+        def set_limits(self, quiet_period, min_interval):
+            self.quiet_period = quiet_period
+            self.min_interval = min_interval
+            for detector in self.detectors.values():
+                detector.quiet_period = quiet_period
+                detector.min_interval = min_interval
+
+        def _add_native_paths(self, path, index):
+            # Pastas avisam de arquivos criados/renomeados; arquivos, de regravações
+            paths = [path]
+            for rel in index:
+                paths.append(os.path.join(path, *rel.rstrip("/").split("/")))
+            known = set(self.native.directories() + self.native.files())
+            paths = [p for p in paths if p not in known]
+            if paths:
+                # Se o sistema recusar (limite de observadores), sobra a varredura
+                self.native.addPaths(paths)
+
+        def _on_native_event(self, changed):
+            for game, detector in self.detectors.items():
+                if _inside(changed, detector.path):
+                    # Confere logo; o período de silêncio continua valendo
+                    self.timers[game].start(int(CHECK_INTERVAL * 1000))
+
+        def _check(self, game):
+            detector = self.detectors.get(game)
+            if not detector:
+                return
+            try:
+                before = detector.current
+                if detector.poll():
+                    self.settled.emit(game)
+                if detector.current.keys() != before.keys() and os.path.isdir(detector.path):
+                    # Arquivos novos entram na observação nativa
+                    self._add_native_paths(detector.path, detector.current)
+            except Exception as e:
+                log_event("ERROR", f"Erro ao verificar a pasta de save de {game}: {str(e)}")
+            if game in self.timers:
+                self.timers[game].start(int(detector.next_delay() * 1000))
+
+    return SaveFolderWatcher
+
+
+def __getattr__(name):
+    # Adaptador Qt montado sob demanda (PEP 562)
+    if name == "SaveFolderWatcher":
+        cls = _build_qt_watcher()
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,290 @@
-from PyQt5.QtCore import QTimer, QTime
+"""
+Agendamento de backups (estilo cron e por intervalo).
 
+Cada agendamento tem o próximo horário de disparo num heap; um único timer
+é armado para o mais próximo, então o app não acorda à toa. Ao disparar,
+tudo que venceu roda. Se o PC estava suspenso ou o relógio pulou para a
+frente, os disparos perdidos seguem a política de recuperação:
+
+- CATCH_UP_ONCE: roda uma vez (não uma vez por disparo perdido);
+- CATCH_UP_SKIP: ignora os perdidos e segue para o próximo horário.
+
+Formatos aceitos por parse_schedule():
+    "0 3 * * *"      cron de 5 campos (minuto hora dia mês dia-da-semana)
+    "@every 2h"      intervalo (s, m, h, d)
+    "@hourly", "@daily", "@weekly", "@monthly"
+    "03:30"          todo dia nesse horário
+
+ScheduleCore não depende de Qt; AutoBackupScheduler é o adaptador com QTimer
+(o PyQt5 só é importado quando ele é criado).
+"""
+import heapq
+import itertools
+import re
+import time
+from datetime import datetime, timedelta
+
+from logger import log_event
+
+CATCH_UP_ONCE = "once"
+CATCH_UP_SKIP = "skip"
+
+# Atraso tolerado antes de um disparo contar como perdido
+GRACE_SECONDS = 120
+# Diferença entre relógio de parede e monotônico que indica salto/suspensão
+JUMP_THRESHOLD = 60
+# Teto do timer: garante perceber saltos do relógio para a frente
+MAX_SLEEP = 600
+
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+# ================= EXPRESSÕES =================
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Passo inválido: {step_text}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = high
+        if start < low or end > high or start > end:
+            raise ValueError(f"Valor fora do intervalo {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+class CronSchedule:
+    """Expressão cron de 5 campos (dia-da-semana 0 ou 7 = domingo)"""
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expressão cron precisa de 5 campos: {expr}")
+        self.expr = expr
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = set(_parse_field(fields[2], 1, 31))
+        self.months = set(_parse_field(fields[3], 1, 12))
+        self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}
+        # Como no cron: com dia do mês e da semana restritos, vale qualquer um
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        weekday = (day.weekday() + 1) % 7
+        if self._any_day and self._any_weekday:
+            return True
+        if self._any_day:
+            return weekday in self.weekdays
+        if self._any_weekday:
+            return day.day in self.days
+        return day.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment):
+        """Próximo disparo estritamente depois de moment (datetime local)"""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        # 5 anos cobre até 29 de fevereiro em dia da semana específico
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Expressão cron nunca dispara: {self.expr}")
+
+    def __str__(self):
+        return self.expr
+
+
+class IntervalSchedule:
+    """A cada N segundos, contados a partir de anchor"""
+
+    def __init__(self, seconds, anchor=None):
+        if seconds <= 0:
+            raise ValueError("O intervalo precisa ser positivo")
+        self.seconds = seconds
+        self.anchor = anchor or datetime(2000, 1, 1)
+
+    def next_after(self, moment):
+        elapsed = (moment - self.anchor).total_seconds()
+        steps = int(elapsed // self.seconds) + 1
+        return self.anchor + timedelta(seconds=steps * self.seconds)
+
+    def __str__(self):
+        return f"@every {self.seconds}s"
+
+
+def parse_schedule(text):
+    """Converte o texto de um agendamento (ver docstring do módulo)"""
+    text = text.strip()
+    text = _ALIASES.get(text.lower(), text)
+    match = re.fullmatch(r"@every\s+(\d+)\s*([smhd])", text, re.IGNORECASE)
+    if match:
+        return IntervalSchedule(int(match.group(1)) * _UNITS[match.group(2).lower()])
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", text)
+    if match:
+        return CronSchedule(f"{int(match.group(2))} {int(match.group(1))} * * *")
+    return CronSchedule(text)
+
+
+# ================= NÚCLEO =================
+class ScheduledJob:
+    def __init__(self, job_id, game, schedule, next_fire, last_run=None):
+        self.id = job_id
+        self.game = game
+        self.schedule = schedule
+        self.next_fire = next_fire
+        self.last_run = last_run
+
+
+class ScheduleCore:
+    """
+    Heap de próximos disparos, sem Qt. run_due() executa o que venceu;
+    next_delay() diz quantos segundos esperar até o próximo.
+    """
+
+    def __init__(self, callback, catch_up=CATCH_UP_ONCE, now=datetime.now):
+        self.callback = callback
+        self.catch_up = catch_up
+        self.now = now
+        self.jobs = {}
+        self._heap = []
+        self._ids = itertools.count(1)
+
+    def add(self, game, schedule, last_run=None):
+        """
+        Agenda backups de game. Com last_run (datetime do último disparo,
+        guardado pelo app) um horário perdido com o app fechado é recuperado.
+        """
+        if isinstance(schedule, str):
+            schedule = parse_schedule(schedule)
+        job = ScheduledJob(next(self._ids), game, schedule,
+                           schedule.next_after(last_run or self.now()), last_run)
+        self.jobs[job.id] = job
+        heapq.heappush(self._heap, (job.next_fire, job.id))
+        return job
+
+    def remove(self, job_id):
+        # A entrada no heap é descartada quando chegar ao topo
+        self.jobs.pop(job_id, None)
+
+    def clear(self):
+        self.jobs = {}
+        self._heap = []
+
+    def _top(self):
+        while self._heap and self._heap[0][1] not in self.jobs:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def next_fire(self):
+        top = self._top()
+        return top[0] if top else None
+
+    def next_delay(self):
+        """Segundos até o próximo disparo (None sem agendamentos)"""
+        fire = self.next_fire()
+        if fire is None:
+            return None
+        return max(0.0, (fire - self.now()).total_seconds())
+
+    def run_due(self):
+        """Dispara os agendamentos vencidos. Retorna quantos rodaram"""
+        now = self.now()
+        ran = 0
+        while True:
+            top = self._top()
+            if not top or top[0] > now:
+                break
+            heapq.heappop(self._heap)
+            job = self.jobs[top[1]]
+            late = (now - job.next_fire).total_seconds()
+            if late <= GRACE_SECONDS or self.catch_up == CATCH_UP_ONCE:
+                if late > GRACE_SECONDS:
+                    log_event("SCHEDULE", f"Agendamento perdido de {job.game} ({job.schedule}) executado agora")
+                job.last_run = now
+                ran += 1
+                try:
+                    self.callback(job.game, job)
+                except Exception as e:
+                    log_event("ERROR", f"Erro no agendamento de {job.game}: {str(e)}")
+            else:
+                log_event("SCHEDULE", f"Agendamento perdido de {job.game} ({job.schedule}) ignorado")
+            # Próximo disparo depois de agora: perdidos nunca rodam mais de uma vez
+            job.next_fire = job.schedule.next_after(now)
+            heapq.heappush(self._heap, (job.next_fire, job.id))
+        return ran
+
+
+# ================= ADAPTADOR QT =================
 class AutoBackupScheduler:
-    def __init__(self, callback):
+    """Timer único armado para o próximo disparo; callback(game, job)"""
+
+    def __init__(self, callback, catch_up=CATCH_UP_ONCE):
+        from PyQt5.QtCore import QTimer
+
+        self.core = ScheduleCore(callback, catch_up)
         self.timer = QTimer()
+        self.timer.setSingleShot(True)
         self.timer.timeout.connect(self.check_time)
-        self.callback = callback
-        self.target_time = None
+        self._armed_at = None
+
+    def add(self, game, schedule, last_run=None):
+        job = self.core.add(game, schedule, last_run)
+        self._arm()
+        return job
+
+    def remove(self, job_id):
+        self.core.remove(job_id)
+        self._arm()
 
-    def set_time(self, qtime: QTime):
-        self.target_time = qtime
+    def clear(self):
+        self.core.clear()
+        self.timer.stop()
+
+    def set_time(self, qtime, game=None):
+        """Compatibilidade: um backup diário no horário informado (QTime)"""
+        self.clear()
+        self.add(game, f"{qtime.minute()} {qtime.hour()} * * *")
 
     def start(self):
-        self.timer.start(60000)
+        self._arm()
+
+    def _arm(self):
+        delay = self.core.next_delay()
+        if delay is None:
+            self.timer.stop()
+            return
+        self._armed_at = (time.monotonic(), time.time())
+        # Um ms a mais para o disparo não chegar um instante antes do horário
+        self.timer.start(int(min(delay, MAX_SLEEP) * 1000) + 1)
 
     def check_time(self):
-        if self.target_time and QTime.currentTime().hour() == self.target_time.hour() \
-           and QTime.currentTime().minute() == self.target_time.minute():
-            self.callback()
+        if self._armed_at:
+            mono, wall = self._armed_at
+            drift = (time.time() - wall) - (time.monotonic() - mono)
+            if abs(drift) > JUMP_THRESHOLD:
+                log_event("SCHEDULE", f"Relógio pulou {drift:+.0f}s (ajuste de hora ou retorno da suspensão)")
+        self.core.run_due()
+        self._arm()
@@ -1,80 +1,169 @@
 """
 Módulo para prevenir múltiplas instâncias da aplicação rodando simultaneamente.
-Usa lock file com arquivo mantido aberto para garantir apenas uma instância por vez.
+
+A instância aberta escuta num servidor local (QLocalServer: pipe nomeado no
+Windows, socket Unix no Linux) com nome próprio do usuário e da pasta do app.
+Uma segunda execução conecta nele, repassa o comando da linha de comando
+(mostrar a janela, backup agora, restaurar um arquivo) e sai em alguns
+milissegundos, sem carregar a interface.
+
+Instância morta: se ninguém atende a conexão, o socket que sobrou é de um
+processo que já fechou (ou travou) e é recriado. Não há arquivo de lock.
+
+Protocolo: uma linha JSON {"command": ..., "args": [...]} por conexão,
+respondida com "ok".
 """
+import json
 import os
 import sys
-import tempfile
-from app_paths import get_lock_file
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+from app_paths import get_instance_name
+
+COMMAND_SHOW = "show"
+COMMAND_BACKUP = "backup"
+COMMAND_RESTORE = "restore"
+
+# Milissegundos: a instância aberta responde na hora pelo loop de eventos
+CONNECT_TIMEOUT = 500
+REPLY_TIMEOUT = 2000
+
+_REPLY = b"ok\n"
+
+
+def parse_command(argv):
+    """
+    Comando da linha de comando (sem o nome do programa):
+    - sem argumentos: mostrar a janela;
+    - startup: nenhum (iniciado com o Windows, já está aberto);
+    - --backup [MSC] [MWC]: backup agora (padrão: todos os jogos);
+    - arquivo .becupe: restaurar esse arquivo.
+    Retorna (comando, argumentos) ou None.
+    """
+    if not argv:
+        return COMMAND_SHOW, []
+    if "startup" in argv[0].lower():
+        return None
+    if argv[0] == "--backup":
+        return COMMAND_BACKUP, [game.upper() for game in argv[1:]]
+    if argv[0].lower().endswith(".becupe"):
+        return COMMAND_RESTORE, [os.path.abspath(argv[0])]
+    return COMMAND_SHOW, []
+
 
 class SingleInstanceLock:
     """
     Gerencia lock de instância única.
-    Mantém um arquivo aberto exclusivamente para garantir apenas uma instância.
+    Mantém um servidor local aberto enquanto a aplicação roda.
     """
-    
-    def __init__(self):
-        self.lock_file = get_lock_file()
+
+    def __init__(self, name=None):
+        self.name = name or get_instance_name()
+        self.server = None
         self.lock_acquired = False
-        self.lock_handle = None
-    
+        # Chamado com (comando, argumentos) na thread da interface
+        self.on_command = None
+
+    # ================= SEGUNDA EXECUÇÃO =================
+    def _connect(self, timeout=CONNECT_TIMEOUT):
+        socket = QLocalSocket()
+        socket.connectToServer(self.name)
+        if socket.waitForConnected(timeout):
+            return socket
+        return None
+
+    def is_running(self):
+        """Outra instância atende no servidor? (não precisa de QApplication)"""
+        socket = self._connect()
+        if not socket:
+            return False
+        socket.disconnectFromServer()
+        return True
+
+    def send(self, command, args=()):
+        """Repassa um comando para a instância aberta; True se ela confirmou"""
+        socket = self._connect()
+        if not socket:
+            return False
+        if sys.platform == "win32":
+            # Deixa a instância aberta trazer a janela para a frente
+            import ctypes
+            ctypes.windll.user32.AllowSetForegroundWindow(-1)
+        message = json.dumps({"command": command, "args": list(args)}) + "\n"
+        socket.write(message.encode("utf-8"))
+        if not socket.waitForBytesWritten(REPLY_TIMEOUT):
+            return False
+        reply = b""
+        while not reply.endswith(b"\n") and socket.waitForReadyRead(REPLY_TIMEOUT):
+            reply += bytes(socket.readAll())
+        socket.disconnectFromServer()
+        return reply == _REPLY
+
+    # ================= INSTÂNCIA ABERTA =================
     def acquire(self):
         """
-        Tenta adquirir o lock mantendo o arquivo aberto.
-        Se conseguir, retorna True.
-        Se não conseguir (outra instância está rodando), retorna False.
+        Passa a escutar no servidor local (precisa da QApplication já criada).
+        Retorna False se outra instância está rodando.
         """
-        try:
-            # Primeiro, remove lock file antigo se existir (de processo morto)
-            if os.path.exists(self.lock_file):
-                try:
-                    # Tenta remover - se conseguir, era de um processo morto
-                    os.remove(self.lock_file)
-                except:
-                    # Se não conseguir remover, significa que está em uso por outro processo
-                    return False
-            
-            # Tenta abrir o arquivo em modo exclusivo e manter aberto
-            # No Windows, quando um arquivo está aberto, outros processos não conseguem deletar
-            try:
-                self.lock_handle = open(self.lock_file, 'w')
-                self.lock_handle.write(str(os.getpid()))
-                self.lock_handle.flush()
-                self.lock_acquired = True
-                return True
-            except IOError:
+        if self.lock_acquired:
+            return True
+        if self.is_running():
+            return False
+
+        # Ninguém atendeu: socket de instância morta (no Linux o arquivo fica)
+        QLocalServer.removeServer(self.name)
+        self.server = QLocalServer()
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        if not self.server.listen(self.name):
+            # Outra instância começou a escutar entre a tentativa e agora
+            error = self.server.errorString()
+            self.server = None
+            if self.is_running():
                 return False
-            
-        except Exception as e:
-            print(f"Erro ao adquirir lock: {e}")
+            print(f"Erro ao adquirir lock: {error}")
             return False
-    
+        self.server.newConnection.connect(self._on_new_connection)
+        self.lock_acquired = True
+        return True
+
     def release(self):
-        """Libera o lock fechando e removendo o arquivo"""
-        try:
-            if self.lock_handle:
-                self.lock_handle.close()
-                self.lock_handle = None
-            
-            if os.path.exists(self.lock_file):
-                os.remove(self.lock_file)
-            
-            self.lock_acquired = False
-        except Exception as e:
-            print(f"Erro ao liberar lock: {e}")
-    
-    def __enter__(self):
-        if not self.acquire():
-            raise RuntimeError("Outra instância da aplicação já está rodando!")
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.release()
-    
+        """Libera o lock fechando o servidor"""
+        if self.server:
+            self.server.close()
+            self.server = None
+        self.lock_acquired = False
+
+    def _on_new_connection(self):
+        while self.server and self.server.hasPendingConnections():
+            # O socket pertence ao servidor até desconectar
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self._read(s))
+            socket.disconnected.connect(socket.deleteLater)
+            self._read(socket)
+
+    def _read(self, socket):
+        while socket.canReadLine():
+            line = bytes(socket.readLine()).decode("utf-8", "replace")
+            try:
+                message = json.loads(line)
+                command, args = message["command"], list(message.get("args", []))
+            except (ValueError, KeyError, TypeError):
+                socket.disconnectFromServer()
+                return
+            socket.write(_REPLY)
+            socket.flush()
+            socket.disconnectFromServer()
+            if self.on_command:
+                # Fora do slot do socket: o comando pode abrir diálogos modais
+                QTimer.singleShot(0, lambda c=command, a=args: self.on_command(c, a))
+            return
+
     def __enter__(self):
         if not self.acquire():
             raise RuntimeError("Outra instância da aplicação já está rodando!")
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.release()
@@ -0,0 +1,103 @@
+"""
+Testes da detecção dos jogos (ProcessWatcher) com a tabela de processos
+em memória, sem psutil nem /proc.
+
+Uso: python -m unittest test_process_watcher  (ou python -m pytest)
+"""
+import unittest
+
+from process_watcher import (
+    ProcessWatcher, FakeProcessTable, PROCESS_NAMES,
+    MIN_INTERVAL, MAX_INTERVAL, TRACK_INTERVAL
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ProcessWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.table = FakeProcessTable()
+        self.clock = FakeClock()
+        self.events = []
+        self.watcher = ProcessWatcher(
+            lambda game: self.events.append(("open", game)),
+            lambda game: self.events.append(("close", game)),
+            backend=self.table,
+            clock=self.clock
+        )
+
+    def poll(self):
+        """Avança o relógio até a próxima verificação pedida e verifica"""
+        delay = self.watcher.poll()
+        self.clock.now += delay
+        return delay
+
+    def test_open_and_close_callbacks(self):
+        self.table.spawn("explorer.exe")
+        self.poll()
+        self.assertEqual(self.events, [])
+
+        pid = self.table.spawn(PROCESS_NAMES["MSC"])
+        self.poll()
+        self.poll()
+        self.assertEqual(self.events, [("open", "MSC")])
+        self.assertTrue(self.watcher.states["MSC"])
+        self.assertFalse(self.watcher.states["MWC"])
+
+        self.table.kill(pid)
+        self.poll()
+        self.assertEqual(self.events, [("open", "MSC"), ("close", "MSC")])
+        self.assertFalse(self.watcher.states["MSC"])
+
+    def test_interval_backs_off_while_idle(self):
+        self.table.spawn("explorer.exe")
+        delays = [self.poll() for _ in range(12)]
+        self.assertEqual(delays[0], MIN_INTERVAL)
+        self.assertEqual(delays, sorted(delays))
+        self.assertEqual(delays[-1], MAX_INTERVAL)
+
+        # Um processo novo (alguém abrindo algo) volta ao intervalo mínimo
+        self.table.spawn("notepad.exe")
+        self.assertEqual(self.poll(), MIN_INTERVAL)
+
+    def test_scans_stop_while_all_games_are_tracked(self):
+        self.table.spawn(PROCESS_NAMES["MSC"])
+        self.table.spawn(PROCESS_NAMES["MWC"])
+        self.poll()
+        scans = self.table.scans
+        for _ in range(5):
+            self.assertEqual(self.poll(), TRACK_INTERVAL)
+        self.assertEqual(self.table.scans, scans)
+
+    def test_reused_pid_is_another_process(self):
+        pid = self.table.spawn(PROCESS_NAMES["MSC"])
+        self.poll()
+        self.assertEqual(self.events, [("open", "MSC")])
+        first = self.watcher.tracked["MSC"]
+
+        # O jogo fecha e outro programa nasce com o mesmo PID antes da verificação
+        self.table.kill(pid)
+        self.table.spawn("explorer.exe", pid=pid)
+        self.poll()
+        self.assertEqual(self.events, [("open", "MSC"), ("close", "MSC")])
+        self.assertNotIn("MSC", self.watcher.tracked)
+
+        # O jogo reaberto com esse PID de novo é um processo novo
+        self.table.kill(pid)
+        self.table.spawn(PROCESS_NAMES["MSC"], pid=pid)
+        while len(self.events) < 3:
+            self.poll()
+        self.assertEqual(self.events[2], ("open", "MSC"))
+        self.assertEqual(self.watcher.tracked["MSC"][0], pid)
+        self.assertNotEqual(self.watcher.tracked["MSC"], first)
+        self.assertTrue(self.table.is_running(*self.watcher.tracked["MSC"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
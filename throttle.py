@@ -0,0 +1,198 @@
+"""
+Modo econômico dos backups: limite de bytes/s e prioridade baixa.
+
+Throttle é um balde de fichas compartilhado por todas as threads de um
+backup; leituras e gravações são feitas em pedaços de `chunk_size` e cada
+pedaço consome fichas, então o disco recebe um fluxo constante em vez de
+rajadas. O limite só vale enquanto `active()` for verdadeiro (ex.: enquanto
+o jogo está aberto), então o backup volta à velocidade total quando o jogo
+fecha.
+
+Com low_priority, a cada pedaço a thread que lê/grava tem a prioridade
+baixada enquanto active() for verdadeiro e devolvida quando deixar de ser.
+background_priority() baixa a prioridade de CPU e de disco da thread atual:
+- Windows: SetThreadPriority(THREAD_MODE_BACKGROUND_BEGIN);
+- Linux: nice da thread (setpriority no TID) + classe idle de I/O (ioprio_set).
+Nos demais sistemas só o limite de bytes/s vale.
+
+No Linux, voltar o nice exige permissão que um usuário comum não tem; por
+isso operações com prioridade baixa rodam numa thread própria e curta
+(own_thread), nunca nas threads fixas da fila de trabalhos ou do daemon.
+"""
+import ctypes
+import functools
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from logger import log_event
+
+DEFAULT_RATE = 20 * 1024 * 1024
+DEFAULT_CHUNK = 256 * 1024
+BACKGROUND_NICE = 10
+
+_THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+_THREAD_MODE_BACKGROUND_END = 0x00020000
+
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_CLASS_IDLE = 3
+# Números da syscall ioprio_get/ioprio_set por arquitetura
+_IOPRIO_SYSCALLS = {
+    "x86_64": (252, 251),
+    "aarch64": (31, 30),
+    "i686": (290, 289),
+    "i386": (290, 289),
+}
+
+
+class Throttle:
+    """Balde de fichas (bytes/s) seguro entre threads"""
+
+    def __init__(self, rate=DEFAULT_RATE, chunk_size=DEFAULT_CHUNK, low_priority=True,
+                 active=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.low_priority = low_priority
+        self.active = active or (lambda: True)
+        self.clock = clock
+        self.sleep = sleep
+        # Permite rajadas de até 1/4 de segundo de dados
+        self.burst = max(chunk_size, rate // 4) if rate else 0
+        self._tokens = self.burst
+        self._last = clock()
+        self._lock = threading.Lock()
+        # Prioridade baixada em cada thread (background_priority em uso)
+        self._local = threading.local()
+        self.waited = 0.0
+
+    def consume(self, nbytes):
+        """Bloqueia até nbytes poderem passar pelo limite"""
+        active = self.active()
+        if self.low_priority:
+            self._update_priority(active)
+        if not self.rate or not active:
+            return
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= nbytes
+            # Dívida de fichas: espera (fora do lock) o tempo de pagá-la
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self.waited += wait
+            self.sleep(wait)
+
+    def _update_priority(self, active):
+        """Prioridade baixa na thread atual só enquanto o limite vale"""
+        lowered = getattr(self._local, "priority", None)
+        if active and lowered is None:
+            lowered = background_priority()
+            lowered.__enter__()
+            self._local.priority = lowered
+        elif not active and lowered is not None:
+            self._local.priority = None
+            lowered.__exit__(None, None, None)
+
+    def read(self, f, size=-1):
+        """f.read() em pedaços com ritmo controlado"""
+        parts = []
+        remaining = size
+        while remaining != 0:
+            want = self.chunk_size if remaining < 0 else min(self.chunk_size, remaining)
+            block = f.read(want)
+            if not block:
+                break
+            self.consume(len(block))
+            parts.append(block)
+            if remaining > 0:
+                remaining -= len(block)
+        return b"".join(parts)
+
+    def write(self, f, data):
+        """f.write() em pedaços com ritmo controlado"""
+        view = memoryview(data)
+        for offset in range(0, len(view), self.chunk_size):
+            block = view[offset:offset + self.chunk_size]
+            self.consume(len(block))
+            f.write(block)
+
+
+def read_file(path, throttle=None):
+    """Lê um arquivo inteiro, respeitando o throttle se houver"""
+    with open(path, "rb") as f:
+        return throttle.read(f) if throttle else f.read()
+
+
+# ================= PRIORIDADE =================
+def _ioprio_syscalls():
+    return _IOPRIO_SYSCALLS.get(platform.machine())
+
+
+@contextmanager
+def background_priority():
+    """Baixa a prioridade de CPU e disco da thread atual enquanto durar o bloco"""
+    restore = []
+    try:
+        if sys.platform == "win32":
+            kernel32 = ctypes.windll.kernel32
+            thread = kernel32.GetCurrentThread()
+            if kernel32.SetThreadPriority(thread, _THREAD_MODE_BACKGROUND_BEGIN):
+                restore.append(lambda: kernel32.SetThreadPriority(thread, _THREAD_MODE_BACKGROUND_END))
+        elif sys.platform.startswith("linux"):
+            tid = threading.get_native_id()
+            old_nice = os.getpriority(os.PRIO_PROCESS, tid)
+            os.setpriority(os.PRIO_PROCESS, tid, max(old_nice, BACKGROUND_NICE))
+            # Voltar o nice pode exigir permissão; se falhar, a thread segue mais gentil
+            restore.append(lambda: os.setpriority(os.PRIO_PROCESS, tid, old_nice))
+            numbers = _ioprio_syscalls()
+            if numbers:
+                libc = ctypes.CDLL(None, use_errno=True)
+                old_io = libc.syscall(numbers[0], _IOPRIO_WHO_PROCESS, tid)
+                idle = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+                if old_io >= 0 and libc.syscall(numbers[1], _IOPRIO_WHO_PROCESS, tid, idle) == 0:
+                    restore.append(lambda: libc.syscall(numbers[1], _IOPRIO_WHO_PROCESS, tid, old_io))
+    except (OSError, AttributeError) as e:
+        log_event("INFO", f"Não foi possível baixar a prioridade do backup: {str(e)}")
+
+    try:
+        yield
+    finally:
+        for undo in reversed(restore):
+            try:
+                undo()
+            except OSError:
+                pass
+
+
+def own_thread(func):
+    """
+    Decorador de operações com argumento throttle=: com low_priority, func
+    roda numa thread própria que termina com ela, então a prioridade baixada
+    não fica na thread de quem chamou.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        throttle = kwargs.get("throttle")
+        if not throttle or not throttle.low_priority:
+            return func(*args, **kwargs)
+        outcome = []
+
+        def run():
+            try:
+                outcome.append((func(*args, **kwargs), None))
+            except BaseException as e:
+                outcome.append((None, e))
+
+        thread = threading.Thread(target=run, name="becupe-low-priority", daemon=True)
+        thread.start()
+        thread.join()
+        result, error = outcome[0]
+        if error is not None:
+            raise error
+        return result
+    return wrapper
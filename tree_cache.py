@@ -0,0 +1,87 @@
+"""
+Cache da árvore de hashes (Merkle) da pasta de save de cada jogo.
+
+O cache fica em <pasta do app>/cache e guarda o stat e o hash de cada
+arquivo. A cada atualização só os arquivos com tamanho/mtime diferentes são
+lidos de novo; o hash raiz muda se, e somente se, algum arquivo ou pasta
+mudou. Assim dá para saber em milissegundos se o save mudou desde o último
+backup.
+"""
+import hashlib
+import json
+import os
+
+from app_paths import get_data_dir
+from manifest import scan_tree
+
+
+def merkle_root(files, dirs):
+    """
+    Hash raiz da árvore: cada pasta é o hash dos nomes + hashes dos filhos.
+
+    Args:
+        files: {caminho_relativo: entrada com "sha1"}
+        dirs: lista de subpastas (pastas vazias também contam)
+    """
+    children = {"": []}
+    for rel in dirs:
+        children.setdefault(rel, [])
+        parent, _, name = rel.rpartition("/")
+        children.setdefault(parent, []).append(("d", name, rel))
+    for rel, entry in files.items():
+        parent, _, name = rel.rpartition("/")
+        children.setdefault(parent, []).append(("f", name, entry["sha1"]))
+
+    def dir_hash(rel):
+        h = hashlib.sha1()
+        for kind, name, ref in sorted(children.get(rel, [])):
+            child = dir_hash(ref) if kind == "d" else ref
+            h.update(f"{kind}\0{name}\0{child}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    return dir_hash("")
+
+
+class TreeHashCache:
+    """Estado em cache (stat + hashes) da pasta de save de um jogo"""
+
+    def __init__(self, game_path):
+        self.game_path = game_path
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(game_path)).encode("utf-8")).hexdigest()[:16]
+        self.cache_file = os.path.join(get_data_dir(), "cache", f"tree_{key}.json")
+        self.files = {}
+        self.dirs = []
+        self.root_hash = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.dirs = data.get("dirs", [])
+            self.root_hash = data.get("root")
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp = self.cache_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"root": self.root_hash, "files": self.files, "dirs": self.dirs}, f)
+        os.replace(tmp, self.cache_file)
+
+    def refresh(self, throttle=None):
+        """Atualiza o cache com o disco e retorna o hash raiz atual"""
+        files, dirs = scan_tree(self.game_path, self.files, throttle)
+        if files == self.files and dirs == self.dirs and self.root_hash:
+            return self.root_hash
+        self.files = files
+        self.dirs = dirs
+        self.root_hash = merkle_root(files, dirs)
+        try:
+            self._save()
+        except OSError:
+            # Sem cache em disco o próximo refresh só fica mais lento
+            pass
+        return self.root_hash
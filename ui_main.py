@@ -1,29 +1,45 @@
 import os
-import subprocess
+import time
 from datetime import datetime
 
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFileDialog, QMessageBox, QDialog,
     QCheckBox, QSystemTrayIcon, QMenu, QAction,
-    QStyle, QApplication, QTextEdit
+    QStyle, QApplication, QPlainTextEdit, QComboBox, QProgressBar, QListWidget,
+    QListWidgetItem, QSpinBox, QDoubleSpinBox, QLineEdit,
+    QTableWidget, QTableWidgetItem, QHeaderView
 )
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QEvent
 
 from paths import get_game_paths
-from backup import create_backup
-from restore import restore_backup
+import profiling
 from config import (
-    load_config, save_config,
+    load_config, save_config, config_store,
     has_shown_disclaimer, mark_disclaimer_shown,
     is_startup_enabled, enable_startup, disable_startup
 )
 from process_watcher import GameProcessWatcher
-from logger import log_event, read_log, clear_log
+from save_watcher import SaveFolderWatcher, QUIET_PERIOD, MIN_INTERVAL
+from auto_backup import (
+    event_backup_plan, event_backup_job, event_throttle,
+    add_configured_schedules, mark_schedule_run
+)
+from scheduler import AutoBackupScheduler, parse_schedule, CATCH_UP_ONCE, CATCH_UP_SKIP
+from backup_queue import (
+    BackupJobQueue, PRIORITY_MANUAL, PRIORITY_AUTO,
+    STATE_PENDING, STATE_RUNNING, STATE_DONE
+)
+from progress import describe, format_bytes
+from logger import log_event, clear_log, LogTail, READ_LINES
 from links_manager import open_link
+from single_instance import COMMAND_BACKUP, COMMAND_RESTORE
 from app_paths import get_log_file
 
+# Backup, restauração, catálogo, retenção e métricas são importados só
+# quando usados: na inicialização com o sistema o app fica só na bandeja
+
 
 class DisclaimerDialog(QDialog):
     """Dialog de disclaimer mostrado na primeira execução - 2 etapas"""
@@ -210,13 +226,26 @@ class MainWindow(QMainWindow):
         self.paused = True  # Por padrão sempre pausado
         self.auto_folder = None
 
-        self.tabs = QTabWidget()
-        self.setCentralWidget(self.tabs)
+        # Abas montadas na primeira vez que a janela abre (init_window)
+        self.tabs = None
+        self.tab_builders = {}
+        self.backup_tab = self.restore_tab = self.auto_tab = None
+        self.stats_tab = self.logs_tab = None
+
+        # Backups e restaurações rodam fora da thread da interface
+        self.jobs = BackupJobQueue(parent=self)
+        self.jobs.job_started.connect(self.on_job_started)
+        self.jobs.job_finished.connect(self.on_job_finished)
+        self.jobs.job_failed.connect(self.on_job_failed)
+        self.jobs.job_cancelled.connect(self.on_job_cancelled)
+        self.jobs.job_progress.connect(self.on_job_progress)
+        self.jobs.idle.connect(lambda: self.show_status("Pronto", 3000))
+        self.progress_job = None
+        # Trabalhos com progresso em execução (a barra mostra um de cada vez)
+        self.progress_jobs = []
+        # (trabalhos, descrição): um aviso só quando todos terminam
+        self.job_groups = []
 
-        self.init_backup_tab()
-        self.init_restore_tab()
-        self.init_auto_tab()
-        self.init_logs_tab()
         self.init_tray()
 
         self.watcher = GameProcessWatcher(
@@ -225,6 +254,12 @@ class MainWindow(QMainWindow):
         )
         self.watcher.start()
 
+        # Backups contínuos enquanto o jogo está aberto
+        self.save_watcher = SaveFolderWatcher(parent=self)
+        self.save_watcher.settled.connect(self.on_save_settled)
+
+        self.scheduler = AutoBackupScheduler(self.on_schedule_fired)
+
         self.load_auto_config()
         self.load_pause_state()
         
@@ -246,21 +281,84 @@ class MainWindow(QMainWindow):
         act_show = QAction("Abrir", self)
         act_show.triggered.connect(self.show_from_tray)
 
+        act_backup_all = QAction("Backup de todos os jogos...", self)
+        act_backup_all.setEnabled(all(self.games_exist.values()))
+        act_backup_all.triggered.connect(self.backup_all_games)
+
         self.act_pause = QAction("Pausar backups automáticos", self)
         self.act_pause.triggered.connect(self.toggle_pause)
 
+        # Profiling sob demanda para investigar lentidão (ver profiling.py)
+        self.act_profile = QAction("Modo de diagnóstico (profiling)", self)
+        self.act_profile.setCheckable(True)
+        self.act_profile.setChecked(profiling.is_enabled())
+        self.act_profile.toggled.connect(self.toggle_profiling)
+
         act_exit = QAction("Sair", self)
         act_exit.triggered.connect(self.force_exit)
 
         menu.addAction(act_show)
+        menu.addAction(act_backup_all)
         menu.addAction(self.act_pause)
         menu.addSeparator()
+        menu.addAction(self.act_profile)
+        menu.addSeparator()
         menu.addAction(act_exit)
 
         self.tray.setContextMenu(menu)
+        self.tray.setToolTip(self.windowTitle())
         self.tray.activated.connect(self.on_tray_click)
         self.tray.show()
 
+    # ================= OUTRA EXECUÇÃO =================
+    def handle_command(self, command, args):
+        """Comando repassado por outra execução do app (single_instance)"""
+        log_event("INFO", f"Comando recebido: {command} {' '.join(args)}".rstrip())
+        if command == COMMAND_BACKUP:
+            self.backup_now(args)
+        elif command == COMMAND_RESTORE and args:
+            self.restore_from_file(args[0])
+        else:
+            self.show_from_tray()
+
+    def backup_now(self, games=None):
+        """Backup imediato na pasta de backups automáticos (todos os jogos por padrão)"""
+        games = [g for g in (games or self.games) if self.games_exist.get(g)]
+        if not self.auto_folder:
+            # Sem pasta configurada: pergunta o destino
+            self.show_from_tray()
+            self.backup_all_games()
+            return
+        for game in games:
+            self.run_event_backup(game, "manual", force=True)
+        self.tray.showMessage("Backup iniciado", ", ".join(games) or "Nenhum jogo encontrado")
+
+    def restore_from_file(self, file):
+        """Abre a janela e restaura um .becupe (ex.: aberto pelo Explorer)"""
+        from catalog import parse_backup_name
+
+        self.show_from_tray()
+        game = parse_backup_name(os.path.basename(file))[0]
+        if game not in self.games or not self.games_exist[game]:
+            QMessageBox.warning(self, "Erro", f"Não foi possível identificar o jogo de:\n{file}")
+            return
+        self.tabs.setCurrentWidget(self.restore_tab)
+        self.restore_game(game, file)
+
+    def toggle_profiling(self, checked):
+        if checked:
+            profiling.enable()
+            self.tray.showMessage("Modo de diagnóstico ligado",
+                                  "Use o app normalmente; desligue para gravar os resultados.")
+        else:
+            try:
+                profiling.disable()
+            except Exception as e:
+                log_event("ERROR", f"Erro ao gravar o diagnóstico: {str(e)}")
+                return
+            self.tray.showMessage("Modo de diagnóstico desligado",
+                                  f"Resultados em {profiling.PROFILE_DIR}")
+
     def check_startup_and_minimize(self):
         """Verifica se foi iniciado com o sistema e minimiza para tray"""
         import sys
@@ -270,31 +368,88 @@ class MainWindow(QMainWindow):
             log_event("INFO", "Aplicação iniciada com o sistema - aberta na bandeja")
         else:
             # Caso contrário, mostra normalmente
+            self.init_window()
             self.show()
 
+    # ================= JANELA (SOB DEMANDA) =================
+    def init_window(self):
+        """
+        Monta as abas e a barra de status na primeira vez que a janela abre.
+        Cada aba só é construída quando é selecionada pela primeira vez.
+        """
+        if self.tabs is not None:
+            return
+        started = time.perf_counter()
+        self.tabs = QTabWidget()
+        self.setCentralWidget(self.tabs)
+        self.init_progress_bar()
+
+        self.backup_tab = self.add_lazy_tab(self.init_backup_tab, "💾 Backup Manual")
+        self.restore_tab = self.add_lazy_tab(self.init_restore_tab, "↩️ Restaurar")
+        self.auto_tab = self.add_lazy_tab(self.init_auto_tab, "Auto Backup")
+        self.stats_tab = self.add_lazy_tab(self.init_stats_tab, "📊 Estatísticas")
+        self.logs_tab = self.add_lazy_tab(self.init_logs_tab, "📋 Logs")
+        self.build_tab(self.tabs.currentWidget())
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        log_event("INFO", f"Janela montada em {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def add_lazy_tab(self, builder, title):
+        page = QWidget()
+        self.tab_builders[page] = builder
+        self.tabs.addTab(page, title)
+        return page
+
+    def build_tab(self, page):
+        builder = self.tab_builders.pop(page, None)
+        if builder:
+            builder(page)
+
+    def is_tab_built(self, page):
+        return page is not None and page not in self.tab_builders
+
+    def show_status(self, text, timeout=0):
+        if self.tabs is not None:
+            self.statusBar().showMessage(text, timeout)
+
     def on_tray_click(self, reason):
         if reason == QSystemTrayIcon.Trigger:
             self.show_from_tray()
 
     def show_from_tray(self):
+        self.init_window()
         self.showNormal()
         self.raise_()
         self.activateWindow()
 
     def force_exit(self):
         self.tray.hide()
+        # Espera o trabalho em andamento terminar para não deixar backup pela metade
+        self.jobs.shutdown(wait=True)
+        config_store.flush()
         QApplication.quit()
 
     def closeEvent(self, event):
         event.ignore()
         self.hide()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_log_timer()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_log_timer()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.update_log_timer()
+
     def toggle_pause(self):
         self.toggle_pause_ui()
 
     # ================= BACKUP MANUAL =================
-    def init_backup_tab(self):
-        tab = QWidget()
+    def init_backup_tab(self, tab):
         layout = QVBoxLayout()
 
         # Título
@@ -331,6 +486,13 @@ class MainWindow(QMainWindow):
         btn_mwc.clicked.connect(lambda: self.manual_backup("MWC"))
         layout.addWidget(btn_mwc)
 
+        # Todos os jogos de uma vez (em paralelo se os discos permitirem)
+        btn_all = QPushButton("🎮 Backup de todos os jogos")
+        btn_all.setEnabled(all(self.games_exist.values()))
+        btn_all.setMinimumHeight(40)
+        btn_all.clicked.connect(self.backup_all_games)
+        layout.addWidget(btn_all)
+
         layout.addStretch()
 
         # Nota
@@ -339,20 +501,44 @@ class MainWindow(QMainWindow):
         layout.addWidget(lbl_note)
 
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "💾 Backup Manual")
 
     def manual_backup(self, game):
         dest = QFileDialog.getExistingDirectory(self, "Destino do Backup")
         if not dest:
             return
         log_event("BACKUP", f"Backup manual de {game} solicitado para: {dest}")
-        create_backup(self.games[game], dest, game)
-        log_event("BACKUP", f"Backup manual de {game} concluído")
-        QMessageBox.information(self, "Sucesso", "Backup criado com sucesso.")
+        self.submit_manual_backup(game, dest, notify="Backup criado com sucesso.")
+
+    def backup_all_games(self):
+        """Backup manual de todos os jogos encontrados para a mesma pasta"""
+        games = [game for game, exists in self.games_exist.items() if exists]
+        dest = QFileDialog.getExistingDirectory(self, "Destino do Backup", self.auto_folder or "")
+        if not dest:
+            return
+        log_event("BACKUP", f"Backup de todos os jogos ({', '.join(games)}) solicitado para: {dest}")
+        # A fila decide pelos discos: em paralelo ou um depois do outro
+        jobs = [self.submit_manual_backup(game, dest) for game in games]
+        self.job_groups.append((jobs, "Backup de todos os jogos"))
+
+    def submit_manual_backup(self, game, dest, notify=None):
+        from backup import create_backup
+        from devices import footprint
+
+        return self.jobs.submit(
+            game, "manual", create_backup, self.games[game], dest, game,
+            catalog_root=config_store.get("folder"),
+            priority=PRIORITY_MANUAL,
+            coalesce=False,
+            track_progress=True,
+            footprint=footprint(self.games[game], dest),
+            description=f"Backup manual de {game}",
+            notify=notify
+        )
 
     # ================= RESTAURAÇÃO (SEPARADA) =================
-    def init_restore_tab(self):
-        tab = QWidget()
+    def init_restore_tab(self, tab):
+        from restore import RESTORE_FULL, RESTORE_DIFF, RESTORE_STAGED
+
         layout = QVBoxLayout()
 
         # Título
@@ -393,63 +579,223 @@ class MainWindow(QMainWindow):
         )
         layout.addWidget(self.btn_restore_mwc)
 
+        # Backups conhecidos pelo catálogo da pasta de auto backup
+        layout_filter = QHBoxLayout()
+        layout_filter.addWidget(QLabel("Backups no catálogo:"))
+        self.cmb_catalog_game = QComboBox()
+        self.cmb_catalog_game.addItem("Todos", None)
+        self.cmb_catalog_game.addItem("My Summer Car", "MSC")
+        self.cmb_catalog_game.addItem("My Winter Car", "MWC")
+        self.cmb_catalog_game.currentIndexChanged.connect(self.refresh_catalog)
+        layout_filter.addWidget(self.cmb_catalog_game)
+        btn_rescan = QPushButton("🔄 Atualizar")
+        btn_rescan.clicked.connect(self.refresh_catalog)
+        layout_filter.addWidget(btn_rescan)
+        layout_filter.addStretch()
+        layout.addLayout(layout_filter)
+
+        self.list_catalog = QListWidget()
+        self.list_catalog.itemDoubleClicked.connect(self.restore_selected)
+        layout.addWidget(self.list_catalog)
+
+        btn_restore_selected = QPushButton("↩️ Restaurar selecionado")
+        btn_restore_selected.clicked.connect(self.restore_selected)
+        layout.addWidget(btn_restore_selected)
+
+        layout_mode = QHBoxLayout()
+        layout_mode.addWidget(QLabel("Modo de restauração:"))
+        self.cmb_restore_mode = QComboBox()
+        self.cmb_restore_mode.addItem("Atômica (monta ao lado e troca as pastas)", RESTORE_STAGED)
+        self.cmb_restore_mode.addItem("Diferencial (só arquivos diferentes)", RESTORE_DIFF)
+        self.cmb_restore_mode.addItem("Completa (apaga e extrai tudo)", RESTORE_FULL)
+        self.cmb_restore_mode.setToolTip(
+            "Atômica extrai o backup numa pasta ao lado do save e troca as pastas\n"
+            "no fim: o save nunca fica pela metade e o anterior pode ser desfeito.\n"
+            "Diferencial compara tamanho e CRC de cada arquivo com o disco e\n"
+            "reescreve apenas o que mudou, apagando o que não está no backup."
+        )
+        mode = config_store.get_str("restore_mode", RESTORE_STAGED)
+        self.cmb_restore_mode.setCurrentIndex(max(self.cmb_restore_mode.findData(mode), 0))
+        self.cmb_restore_mode.currentIndexChanged.connect(self.save_restore_mode)
+        layout_mode.addWidget(self.cmb_restore_mode)
+        layout_mode.addStretch()
+        layout.addLayout(layout_mode)
+
+        # Desfazer (save anterior guardado pela restauração atômica)
+        layout_undo = QHBoxLayout()
+        self.btn_undo_restore = {}
+        for game in ("MSC", "MWC"):
+            btn = QPushButton(f"↶ Desfazer última restauração ({game})")
+            btn.clicked.connect(lambda _, g=game: self.undo_last_restore(g))
+            layout_undo.addWidget(btn)
+            self.btn_undo_restore[game] = btn
+        layout.addLayout(layout_undo)
+        self.update_undo_buttons()
+
         layout.addStretch()
 
         # Nota de aviso
-        lbl_warning = QLabel("⚠️ Aviso: A restauração substitui seu save atual. Um backup de proteção será criado automaticamente.")
+        lbl_warning = QLabel("⚠️ Aviso: A restauração substitui seu save atual. No modo atômico o save anterior fica guardado até a próxima restauração; nos outros modos é oferecido um backup de proteção.")
         lbl_warning.setStyleSheet("color: #f44336; font-size: 10px; margin-top: 10px;")
         lbl_warning.setWordWrap(True)
         layout.addWidget(lbl_warning)
 
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "↩️ Restaurar")
 
-    def restore_game(self, game):
-        file, _ = QFileDialog.getOpenFileName(
-            self,
-            f"Selecionar backup de {game}",
-            "",
-            "Backup (*.becupe)"
-        )
+    def on_tab_changed(self, index):
+        self.build_tab(self.tabs.widget(index))
+        if self.tabs.widget(index) is self.restore_tab:
+            self.refresh_catalog()
+        elif self.tabs.widget(index) is self.stats_tab:
+            self.refresh_stats()
+        self.update_log_timer()
+
+    def refresh_catalog(self):
+        """Reconcilia o catálogo com a pasta de backups e preenche a lista"""
+        from catalog import BackupCatalog
+
+        self.list_catalog.clear()
+        folder = config_store.get("folder")
+        if not folder or not os.path.isdir(folder):
+            return
+        try:
+            with BackupCatalog(folder) as catalog:
+                catalog.rescan()
+                entries = catalog.list(game=self.cmb_catalog_game.currentData(), limit=500)
+        except Exception as e:
+            log_event("ERROR", f"Erro ao ler o catálogo de backups: {str(e)}")
+            return
+        for entry in entries:
+            when = datetime.fromtimestamp(entry["created"]).strftime("%d/%m/%Y %H:%M:%S")
+            item = QListWidgetItem(
+                f"{entry['game']}  {entry['event']}  {when}  "
+                f"({entry['files']} arquivos, {format_bytes(entry['size'])}, {entry['kind']})"
+            )
+            item.setData(Qt.UserRole, (entry["game"], entry["path"]))
+            self.list_catalog.addItem(item)
+
+    def restore_selected(self, *_):
+        item = self.list_catalog.currentItem()
+        if not item:
+            return
+        game, file = item.data(Qt.UserRole)
+        if game not in self.games or not self.games_exist[game]:
+            QMessageBox.warning(self, "Erro", f"Pasta de save de {game} não encontrada.")
+            return
+        self.restore_game(game, file)
+
+    def save_restore_mode(self):
+        mode = self.cmb_restore_mode.currentData()
+        config_store.set("restore_mode", mode)
+        log_event("CONFIG", f"Modo de restauração: {mode}")
+
+    def restore_game(self, game, file=None):
+        from devices import footprint
+        from restore import RESTORE_STAGED
+
+        if not file:
+            file, _ = QFileDialog.getOpenFileName(
+                self,
+                f"Selecionar backup de {game}",
+                "",
+                "Backup (*.becupe)"
+            )
         if not file:
             return
 
         log_event("RESTORE", f"Restauração de {game} iniciada: {file}")
 
-        resp = QMessageBox.question(
-            self,
-            "Confirmação",
-            "Isso substituirá o save atual.\nDeseja fazer backup antes?",
-            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
-        )
+        mode = self.cmb_restore_mode.currentData()
+        if mode == RESTORE_STAGED:
+            # A pasta antiga vira o backup de proteção: nada de segunda cópia completa
+            resp = QMessageBox.question(
+                self,
+                "Confirmação",
+                "Isso substituirá o save atual.\n"
+                "O save atual ficará guardado e poderá ser desfeito. Continuar?",
+                QMessageBox.Yes | QMessageBox.Cancel
+            )
+        else:
+            resp = QMessageBox.question(
+                self,
+                "Confirmação",
+                "Isso substituirá o save atual.\nDeseja fazer backup antes?",
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+            )
 
         if resp == QMessageBox.Cancel:
             log_event("RESTORE", f"Restauração de {game} cancelada pelo usuário")
             return
 
-        if resp == QMessageBox.Yes:
-            dest = QFileDialog.getExistingDirectory(
+        pre_dest = None
+        if resp == QMessageBox.Yes and mode != RESTORE_STAGED:
+            pre_dest = QFileDialog.getExistingDirectory(
                 self, "Destino do Backup Atual"
             )
-            if dest:
-                create_backup(
-                    self.games[game],
-                    dest,
-                    f"{game}_PRE_RESTORE"
-                )
-                log_event("BACKUP", f"Backup de proteção criado antes de restaurar {game}")
-
-        restore_backup(file, self.games[game])
+
+        # Backup de proteção e restauração no mesmo trabalho: se o backup falhar, não restaura
+        self.jobs.submit(
+            game, "restore", self.restore_job, game, file, pre_dest, mode,
+            priority=PRIORITY_MANUAL,
+            coalesce=False,
+            track_progress=True,
+            footprint=footprint(file, self.games[game]),
+            description=f"Restauração de {game}",
+            notify=f"{game} restaurado com sucesso."
+        )
+
+    def restore_job(self, game, file, pre_dest, mode, progress=None):
+        """Executado na fila de trabalhos (sem acesso à interface)"""
+        from backup import create_backup
+        from restore import restore_backup
+
+        if pre_dest:
+            create_backup(
+                self.games[game],
+                pre_dest,
+                f"{game}_PRE_RESTORE",
+                progress=progress,
+                catalog_root=config_store.get("folder")
+            )
+            log_event("BACKUP", f"Backup de proteção criado antes de restaurar {game}")
+
+        restore_backup(file, self.games[game], progress=progress, mode=mode,
+                       workers=config_store.get("compression_workers"))
         log_event("RESTORE", f"Restauração de {game} concluída com sucesso")
-        QMessageBox.information(
+
+    def undo_last_restore(self, game):
+        from restore import undo_restore
+
+        resp = QMessageBox.question(
             self,
-            "Concluído",
-            f"{game} restaurado com sucesso."
+            "Desfazer restauração",
+            f"Voltar o save de {game} para como estava antes da última restauração?",
+            QMessageBox.Yes | QMessageBox.No
         )
+        if resp != QMessageBox.Yes:
+            return
+        self.jobs.submit(
+            game, "undo_restore", undo_restore, self.games[game],
+            priority=PRIORITY_MANUAL,
+            coalesce=False,
+            description=f"Desfazer restauração de {game}",
+            notify=f"Save de {game} voltou ao estado anterior."
+        )
+
+    def update_undo_buttons(self):
+        if not self.is_tab_built(self.restore_tab):
+            return
+        from restore import has_rollback
+
+        for game, btn in self.btn_undo_restore.items():
+            btn.setEnabled(bool(self.games[game]) and has_rollback(self.games[game]))
 
     # ================= AUTO BACKUP =================
-    def init_auto_tab(self):
-        tab = QWidget()
+    def init_auto_tab(self, tab):
+        from compression import PROFILES, PROFILE_BALANCED
+        from retention import DEFAULT_POLICY
+        from throttle import DEFAULT_RATE
+
         layout = QVBoxLayout()
 
         # ===== CONTROLES =====
@@ -498,6 +844,150 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.chk_mwc_open)
         layout.addWidget(self.chk_mwc_close)
 
+        self.chk_incremental = QCheckBox("Backups incrementais (salva apenas arquivos alterados)")
+        self.chk_incremental.setToolTip(
+            "Cada backup automático guarda só o que mudou desde o anterior.\n"
+            "A restauração reconstrói o save completo a partir da cadeia."
+        )
+        self.chk_incremental.stateChanged.connect(lambda: self.auto_save_config())
+        layout.addWidget(self.chk_incremental)
+
+        self.chk_dedup = QCheckBox("Armazenamento deduplicado (cada bloco de dados é salvo uma vez)")
+        self.chk_dedup.setToolTip(
+            "Os backups automáticos viram índices pequenos que apontam para blocos\n"
+            "guardados uma única vez em .becupe/store dentro da pasta de backups."
+        )
+        self.chk_dedup.stateChanged.connect(lambda: self.auto_save_config())
+        layout.addWidget(self.chk_dedup)
+
+        layout_profile = QHBoxLayout()
+        layout_profile.addWidget(QLabel("Perfil de compressão:"))
+        self.cmb_profile = QComboBox()
+        for key, label in PROFILES.items():
+            self.cmb_profile.addItem(label, key)
+        self.cmb_profile.setCurrentIndex(self.cmb_profile.findData(PROFILE_BALANCED))
+        self.cmb_profile.setToolTip(
+            "Rápido: menos CPU enquanto o jogo carrega.\n"
+            "Menor tamanho: melhor compressão para os saves em texto.\n"
+            "Fotos e arquivos já comprimidos são sempre guardados sem recompressão."
+        )
+        self.cmb_profile.currentIndexChanged.connect(lambda: self.auto_save_config())
+        layout_profile.addWidget(self.cmb_profile)
+        layout_profile.addStretch()
+        layout.addLayout(layout_profile)
+
+        # ===== MODO ECONÔMICO =====
+        layout_throttle = QHBoxLayout()
+        self.chk_throttle = QCheckBox("Modo econômico enquanto um jogo está aberto, limite (MB/s):")
+        self.chk_throttle.setToolTip(
+            "Backups feitos com o jogo aberto leem e gravam em ritmo limitado e com\n"
+            "prioridade baixa de CPU/disco, para o jogo não engasgar ao carregar.\n"
+            "Quando o jogo fecha, o backup volta à velocidade total."
+        )
+        self.chk_throttle.stateChanged.connect(lambda: self.auto_save_config())
+        layout_throttle.addWidget(self.chk_throttle)
+        self.spn_throttle = QSpinBox()
+        self.spn_throttle.setRange(1, 1000)
+        self.spn_throttle.setValue(DEFAULT_RATE // (1024 * 1024))
+        self.spn_throttle.valueChanged.connect(lambda: self.auto_save_config())
+        layout_throttle.addWidget(self.spn_throttle)
+        layout_throttle.addStretch()
+        layout.addLayout(layout_throttle)
+
+        # ===== BACKUP CONTÍNUO =====
+        self.chk_continuous = QCheckBox("Backup contínuo enquanto joga (quando o jogo terminar de salvar)")
+        self.chk_continuous.setToolTip(
+            "Observa a pasta de save do jogo aberto e cria um backup incremental\n"
+            "depois que as gravações param, protegendo contra travamentos e quedas de energia."
+        )
+        self.chk_continuous.stateChanged.connect(lambda: self.auto_save_config())
+        layout.addWidget(self.chk_continuous)
+
+        layout_continuous = QHBoxLayout()
+        layout_continuous.addWidget(QLabel("Silêncio antes do backup (s):"))
+        self.spn_quiet = QSpinBox()
+        self.spn_quiet.setRange(2, 600)
+        self.spn_quiet.setValue(int(QUIET_PERIOD))
+        self.spn_quiet.valueChanged.connect(lambda: self.auto_save_config())
+        layout_continuous.addWidget(self.spn_quiet)
+        layout_continuous.addWidget(QLabel("Intervalo mínimo (min):"))
+        self.spn_min_interval = QSpinBox()
+        self.spn_min_interval.setRange(1, 240)
+        self.spn_min_interval.setValue(int(MIN_INTERVAL // 60))
+        self.spn_min_interval.valueChanged.connect(lambda: self.auto_save_config())
+        layout_continuous.addWidget(self.spn_min_interval)
+        layout_continuous.addStretch()
+        layout.addLayout(layout_continuous)
+
+        # ===== AGENDAMENTOS =====
+        lbl_schedule = QLabel("Agendamentos (cron \"0 3 * * *\", \"@every 2h\" ou \"03:30\"; separe com ;)")
+        lbl_schedule.setStyleSheet("margin-top: 10px;")
+        layout.addWidget(lbl_schedule)
+        self.txt_schedules = {}
+        for game in ("MSC", "MWC"):
+            layout_game = QHBoxLayout()
+            layout_game.addWidget(QLabel(f"{game}:"))
+            edit = QLineEdit()
+            edit.setPlaceholderText("sem agendamento")
+            edit.editingFinished.connect(self.apply_schedules)
+            layout_game.addWidget(edit)
+            self.txt_schedules[game] = edit
+            layout.addLayout(layout_game)
+
+        layout_catch_up = QHBoxLayout()
+        layout_catch_up.addWidget(QLabel("Horários perdidos (PC desligado/suspenso):"))
+        self.cmb_catch_up = QComboBox()
+        self.cmb_catch_up.addItem("Fazer um backup ao voltar", CATCH_UP_ONCE)
+        self.cmb_catch_up.addItem("Ignorar", CATCH_UP_SKIP)
+        self.cmb_catch_up.currentIndexChanged.connect(self.apply_schedules)
+        layout_catch_up.addWidget(self.cmb_catch_up)
+        layout_catch_up.addStretch()
+        layout.addLayout(layout_catch_up)
+
+        # ===== RETENÇÃO =====
+        self.chk_retention = QCheckBox("Apagar backups antigos automaticamente após cada backup")
+        self.chk_retention.setToolTip(
+            "Mantém os últimos backups de cada jogo/evento, um por dia, semana e mês\n"
+            "recentes, e apaga o resto. Bases de incrementais mantidos nunca são apagadas."
+        )
+        self.chk_retention.stateChanged.connect(lambda: self.auto_save_config())
+        layout.addWidget(self.chk_retention)
+
+        layout_retention = QHBoxLayout()
+        self.spn_retention = {}
+        for key, label, maximum in (
+            ("last", "Últimos:", 999),
+            ("daily", "Dias:", 365),
+            ("weekly", "Semanas:", 520),
+            ("monthly", "Meses:", 240),
+        ):
+            layout_retention.addWidget(QLabel(label))
+            spin = QSpinBox()
+            spin.setRange(0, maximum)
+            spin.setValue(DEFAULT_POLICY[key])
+            spin.valueChanged.connect(lambda: self.auto_save_config())
+            layout_retention.addWidget(spin)
+            self.spn_retention[key] = spin
+        layout_retention.addWidget(QLabel("Cota (GB):"))
+        self.spn_quota = QDoubleSpinBox()
+        self.spn_quota.setRange(0, 100000)
+        self.spn_quota.setDecimals(1)
+        self.spn_quota.setSpecialValueText("sem limite")
+        self.spn_quota.valueChanged.connect(lambda: self.auto_save_config())
+        layout_retention.addWidget(self.spn_quota)
+        layout_retention.addStretch()
+        layout.addLayout(layout_retention)
+
+        layout_prune = QHBoxLayout()
+        btn_simulate = QPushButton("🔍 Simular limpeza")
+        btn_simulate.clicked.connect(self.simulate_retention)
+        layout_prune.addWidget(btn_simulate)
+        btn_prune = QPushButton("🧹 Limpar agora")
+        btn_prune.clicked.connect(self.prune_now)
+        layout_prune.addWidget(btn_prune)
+        layout_prune.addStretch()
+        layout.addLayout(layout_prune)
+
         layout_folder = QHBoxLayout()
         btn_folder = QPushButton("Selecionar pasta de backup automático")
         btn_folder.clicked.connect(self.select_auto_folder)
@@ -526,7 +1016,8 @@ class MainWindow(QMainWindow):
         layout.addStretch()
 
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "Auto Backup")
+        self.load_auto_widgets()
+        self.update_pause_ui()
 
     def toggle_pause_ui(self):
         """Toggle de pausa com atualização visual"""
@@ -545,29 +1036,27 @@ class MainWindow(QMainWindow):
 
     def update_pause_ui(self):
         """Atualiza a UI do status de pausa"""
+        self.act_pause.setText("Retomar backups automáticos" if self.paused else "Pausar backups automáticos")
+        if not self.is_tab_built(self.auto_tab):
+            return
         if self.paused:
             self.lbl_pause_status.setText("Status: Backups PAUSADOS ⏸️")
             self.lbl_pause_status.setStyleSheet("color: red; font-weight: bold;")
             self.btn_toggle_pause.setText("Despausar")
-            self.act_pause.setText("Retomar backups automáticos")
         else:
             self.lbl_pause_status.setText("Status: Backups ATIVOS ✓")
             self.lbl_pause_status.setStyleSheet("color: green; font-weight: bold;")
             self.btn_toggle_pause.setText("Pausar")
-            self.act_pause.setText("Pausar backups automáticos")
 
     def save_pause_state(self):
         """Salva o estado de pausa no JSON"""
-        cfg = load_config()
-        cfg["paused"] = self.paused
-        save_config(cfg)
+        config_store.set("paused", self.paused)
         status = "PAUSADO" if self.paused else "ATIVO"
         log_event("CONFIG", f"Backups automáticos {status}")
 
     def load_pause_state(self):
         """Carrega o estado de pausa do JSON"""
-        cfg = load_config()
-        self.paused = cfg.get("paused", True)
+        self.paused = config_store.get_bool("paused", True)
         self.update_pause_ui()
 
     def enable_startup_btn(self):
@@ -625,6 +1114,84 @@ class MainWindow(QMainWindow):
         # Abre a pasta no Explorer
         os.startfile(self.auto_folder)
 
+    def apply_schedules(self):
+        """Valida os agendamentos digitados, salva e rearma o agendador"""
+        schedules = {}
+        for game, edit in self.txt_schedules.items():
+            text = edit.text().strip()
+            try:
+                for part in filter(None, (p.strip() for p in text.split(";"))):
+                    parse_schedule(part)
+            except ValueError as e:
+                edit.setStyleSheet("border: 1px solid #f44336;")
+                edit.setToolTip(str(e))
+                return
+            edit.setStyleSheet("")
+            edit.setToolTip("")
+            schedules[game] = text
+
+        cfg = load_config()
+        if cfg.get("schedules") == schedules and cfg.get("schedule_catch_up") == self.cmb_catch_up.currentData():
+            return
+        cfg["schedules"] = schedules
+        cfg["schedule_catch_up"] = self.cmb_catch_up.currentData()
+        save_config(cfg)
+        log_event("CONFIG", f"Agendamentos: {schedules} (perdidos: {cfg['schedule_catch_up']})")
+        self.rebuild_scheduler(cfg)
+
+    def rebuild_scheduler(self, cfg):
+        self.scheduler.clear()
+        self.scheduler.core.catch_up = cfg.get("schedule_catch_up", CATCH_UP_ONCE)
+        add_configured_schedules(self.scheduler.add, cfg.get("schedules", {}),
+                                 cfg.get("schedule_last_runs", {}))
+        self.scheduler.start()
+
+    def on_schedule_fired(self, game, job):
+        mark_schedule_run(game, job.last_run)
+        self.run_event_backup(game, "scheduled")
+
+    def retention_policy(self):
+        """Política de retenção atual da interface"""
+        policy = {key: spin.value() for key, spin in self.spn_retention.items()}
+        policy["max_gb"] = self.spn_quota.value()
+        policy["enabled"] = self.chk_retention.isChecked()
+        return policy
+
+    def simulate_retention(self):
+        from retention import apply_retention, format_report
+
+        if not self.auto_folder or not os.path.isdir(self.auto_folder):
+            QMessageBox.information(self, "Pasta não configurada", "Selecione uma pasta de backup primeiro.")
+            return
+        try:
+            report = apply_retention(self.auto_folder, self.retention_policy(), dry_run=True)
+        except Exception as e:
+            log_event("ERROR", f"Erro ao simular limpeza: {str(e)}")
+            QMessageBox.warning(self, "Erro", f"Não foi possível simular a limpeza:\n{str(e)}")
+            return
+        QMessageBox.information(self, "Simulação de limpeza", format_report(report))
+
+    def prune_now(self):
+        from retention import apply_retention
+
+        if not self.auto_folder or not os.path.isdir(self.auto_folder):
+            QMessageBox.information(self, "Pasta não configurada", "Selecione uma pasta de backup primeiro.")
+            return
+        resp = QMessageBox.question(
+            self,
+            "Confirmação",
+            "Apagar agora os backups fora da política de retenção?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if resp != QMessageBox.Yes:
+            return
+        self.jobs.submit(
+            "*", "prune", apply_retention, self.auto_folder, self.retention_policy(),
+            priority=PRIORITY_MANUAL,
+            description="Limpeza de backups antigos",
+            notify="Limpeza de backups antigos concluída."
+        )
+
     def select_auto_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Pasta de Backup")
         if folder:
@@ -633,6 +1200,8 @@ class MainWindow(QMainWindow):
             self.auto_save_config()
 
     def auto_save_config(self):
+        from backup import BACKEND_ZIP, BACKEND_CHUNKS
+
         cfg = load_config()
         if self.auto_folder:
             cfg["folder"] = self.auto_folder
@@ -640,58 +1209,317 @@ class MainWindow(QMainWindow):
         cfg["msc_close"] = self.chk_msc_close.isChecked()
         cfg["mwc_open"] = self.chk_mwc_open.isChecked()
         cfg["mwc_close"] = self.chk_mwc_close.isChecked()
+        cfg["incremental"] = self.chk_incremental.isChecked()
+        cfg["backend"] = BACKEND_CHUNKS if self.chk_dedup.isChecked() else BACKEND_ZIP
+        cfg["compression_profile"] = self.cmb_profile.currentData()
+        cfg["retention"] = self.retention_policy()
+        cfg["throttle_auto"] = self.chk_throttle.isChecked()
+        cfg["throttle_mb_s"] = self.spn_throttle.value()
+        cfg["continuous"] = self.chk_continuous.isChecked()
+        cfg["continuous_quiet"] = self.spn_quiet.value()
+        cfg["continuous_interval_min"] = self.spn_min_interval.value()
+        self.save_watcher.set_limits(cfg["continuous_quiet"], cfg["continuous_interval_min"] * 60)
         save_config(cfg)
-        log_event("CONFIG", f"Backups automáticos alterados: MSC_open={cfg['msc_open']}, MSC_close={cfg['msc_close']}, MWC_open={cfg['mwc_open']}, MWC_close={cfg['mwc_close']}")
+        log_event("CONFIG", f"Backups automáticos alterados: MSC_open={cfg['msc_open']}, MSC_close={cfg['msc_close']}, MWC_open={cfg['mwc_open']}, MWC_close={cfg['mwc_close']}, incremental={cfg['incremental']}, backend={cfg['backend']}, perfil={cfg['compression_profile']}")
 
     def load_auto_config(self):
+        """Estado dos backups automáticos (sem a aba): pasta, limites e agendamentos"""
         cfg = load_config()
         if not cfg:
             return
         self.auto_folder = cfg.get("folder")
+        self.save_watcher.set_limits(cfg.get("continuous_quiet", int(QUIET_PERIOD)),
+                                     cfg.get("continuous_interval_min", int(MIN_INTERVAL // 60)) * 60)
+        self.rebuild_scheduler(cfg)
+
+    def load_auto_widgets(self):
+        """Preenche a aba de auto backup com o config"""
+        from backup import BACKEND_ZIP, BACKEND_CHUNKS
+        from compression import PROFILE_BALANCED
+        from retention import DEFAULT_POLICY
+        from throttle import DEFAULT_RATE
+
+        cfg = load_config()
         # Desconecta os sinais para não chamar auto_save_config durante carregamento
-        for chk in (self.chk_msc_open, self.chk_msc_close, self.chk_mwc_open, self.chk_mwc_close):
+        checkboxes = (
+            self.chk_msc_open, self.chk_msc_close,
+            self.chk_mwc_open, self.chk_mwc_close,
+            self.chk_incremental, self.chk_dedup, self.cmb_profile,
+            self.chk_retention, self.spn_quota, *self.spn_retention.values(),
+            self.chk_continuous, self.spn_quiet, self.spn_min_interval,
+            self.cmb_catch_up, *self.txt_schedules.values(),
+            self.chk_throttle, self.spn_throttle
+        )
+        for chk in checkboxes:
             chk.blockSignals(True)
         
         self.chk_msc_open.setChecked(cfg.get("msc_open", False))
         self.chk_msc_close.setChecked(cfg.get("msc_close", False))
         self.chk_mwc_open.setChecked(cfg.get("mwc_open", False))
         self.chk_mwc_close.setChecked(cfg.get("mwc_close", False))
+        self.chk_incremental.setChecked(cfg.get("incremental", False))
+        self.chk_dedup.setChecked(cfg.get("backend", BACKEND_ZIP) == BACKEND_CHUNKS)
+        index = self.cmb_profile.findData(cfg.get("compression_profile", PROFILE_BALANCED))
+        self.cmb_profile.setCurrentIndex(max(index, 0))
+        policy = dict(DEFAULT_POLICY, **cfg.get("retention", {}))
+        self.chk_retention.setChecked(policy["enabled"])
+        for key, spin in self.spn_retention.items():
+            spin.setValue(policy[key])
+        self.spn_quota.setValue(policy["max_gb"])
+        self.chk_throttle.setChecked(cfg.get("throttle_auto", True))
+        self.spn_throttle.setValue(cfg.get("throttle_mb_s", DEFAULT_RATE // (1024 * 1024)))
+        self.chk_continuous.setChecked(cfg.get("continuous", False))
+        self.spn_quiet.setValue(cfg.get("continuous_quiet", int(QUIET_PERIOD)))
+        self.spn_min_interval.setValue(cfg.get("continuous_interval_min", int(MIN_INTERVAL // 60)))
+        for game, edit in self.txt_schedules.items():
+            edit.setText(cfg.get("schedules", {}).get(game, ""))
+        index = self.cmb_catch_up.findData(cfg.get("schedule_catch_up", CATCH_UP_ONCE))
+        self.cmb_catch_up.setCurrentIndex(max(index, 0))
         
         # Reconecta os sinais após carregamento
-        for chk in (self.chk_msc_open, self.chk_msc_close, self.chk_mwc_open, self.chk_mwc_close):
+        for chk in checkboxes:
             chk.blockSignals(False)
 
     # ================= EVENTOS =================
     def on_game_open(self, game):
         self.run_event_backup(game, "open")
+        if config_store.get_bool("continuous"):
+            self.save_watcher.watch(game, self.games[game])
 
     def on_game_close(self, game):
+        self.save_watcher.unwatch(game)
         self.run_event_backup(game, "close")
 
-    def run_event_backup(self, game, event):
-        if self.paused:
+    def on_save_settled(self, game):
+        log_event("WATCH", f"{game} terminou de salvar, backup contínuo enfileirado")
+        self.run_event_backup(game, "autosave")
+
+    def run_event_backup(self, game, event, force=False):
+        """force: pedido explícito (ex.: --backup), vale mesmo com os automáticos pausados"""
+        if self.paused and not force:
             return
+        from devices import footprint
 
-        cfg = load_config()
-        if not cfg or not cfg.get("folder"):
+        # Só memória: o config.json é relido apenas se mudar por fora
+        plan = event_backup_plan(game, event, force=force)
+        if not plan:
             return
+        folder, prefix, retention, options = plan
+
+        self.jobs.submit(
+            game, event, self.event_backup_job,
+            game,
+            folder,
+            prefix,
+            retention,
+            throttle=self.game_throttle(),
+            priority=PRIORITY_MANUAL if force else PRIORITY_AUTO,
+            track_progress=True,
+            footprint=footprint(self.games[game], folder),
+            description=f"Backup automático {prefix}",
+            **options
+        )
 
-        if not cfg.get(f"{game.lower()}_{event}"):
+    def game_throttle(self):
+        """Limite de I/O que só vale enquanto algum jogo estiver aberto"""
+        return event_throttle(lambda: any(self.watcher.states.values()))
+
+    def event_backup_job(self, game, folder, prefix, retention, progress=None, **kwargs):
+        """Executado na fila: backup automático seguido da limpeza do jogo"""
+        return event_backup_job(self.games[game], game, folder, prefix, retention,
+                                progress=progress, **kwargs)
+
+    # ================= FILA DE TRABALHOS =================
+    def init_progress_bar(self):
+        """Barra de progresso + botão de cancelar na barra de status"""
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(160)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
+
+        self.btn_cancel_job = QPushButton("Cancelar")
+        self.btn_cancel_job.setMaximumWidth(80)
+        self.btn_cancel_job.clicked.connect(self.cancel_current_job)
+        self.btn_cancel_job.hide()
+        self.statusBar().addPermanentWidget(self.btn_cancel_job)
+        # Janela aberta pela primeira vez com um trabalho em andamento
+        if self.progress_job:
+            self.show_job_progress()
+
+    def cancel_current_job(self):
+        if self.progress_job:
+            log_event("INFO", f"Cancelamento solicitado: {self.progress_job.description}")
+            self.jobs.cancel(self.progress_job)
+            self.btn_cancel_job.setEnabled(False)
+
+    def end_job_progress(self, job):
+        if job in self.progress_jobs:
+            self.progress_jobs.remove(job)
+        if job is not self.progress_job:
             return
+        # Outro trabalho em paralelo assume a barra no próximo sinal de progresso
+        self.progress_job = self.progress_jobs[-1] if self.progress_jobs else None
+        if self.progress_job:
+            return
+        self.tray.setToolTip(self.windowTitle())
+        if self.tabs is not None:
+            self.progress_bar.hide()
+            self.btn_cancel_job.hide()
+
+    def show_job_progress(self):
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.btn_cancel_job.setEnabled(True)
+        self.btn_cancel_job.show()
+
+    def on_job_started(self, job):
+        self.show_status(f"⏳ {job.description}...")
+        if job.progress:
+            self.progress_jobs.append(job)
+            self.progress_job = job
+            if self.tabs is not None:
+                self.show_job_progress()
+
+    def on_job_progress(self, job, snapshot):
+        if job is not self.progress_job:
+            return
+        text = describe(snapshot)
+        self.tray.setToolTip(f"{job.description}: {text}")
+        if self.tabs is None:
+            return
+        self.progress_bar.setValue(snapshot["percent"])
+        self.btn_cancel_job.setEnabled(snapshot["cancellable"] and not job.progress.cancelled)
+        self.statusBar().showMessage(f"⏳ {job.description}: {text}")
+
+    def on_job_cancelled(self, job):
+        self.end_job_progress(job)
+        self.show_status(f"{job.description} cancelado", 5000)
+        self.finish_job_group(job)
+
+    def on_job_finished(self, job):
+        self.end_job_progress(job)
+        if job.event in ("restore", "undo_restore"):
+            self.update_undo_buttons()
+        if self.tabs is not None:
+            if self.tabs.currentWidget() is self.restore_tab:
+                self.refresh_catalog()
+            elif self.tabs.currentWidget() is self.stats_tab:
+                self.refresh_stats()
+        self.show_status(f"✓ {job.description} concluído", 5000)
+        if job.notify:
+            QMessageBox.information(self, "Sucesso", job.notify)
+        self.finish_job_group(job)
+
+    def on_job_failed(self, job):
+        self.end_job_progress(job)
+        self.show_status(f"✗ {job.description} falhou", 5000)
+        if job.is_manual:
+            QMessageBox.critical(self, "Erro", f"{job.description} falhou:\n{str(job.error)}")
+        else:
+            self.tray.showMessage("Backup automático falhou", f"{job.description}: {str(job.error)}",
+                                  QSystemTrayIcon.Warning)
+        self.finish_job_group(job)
+
+    def finish_job_group(self, job):
+        """Avisa uma vez quando todos os trabalhos de um grupo terminam"""
+        for group in list(self.job_groups):
+            jobs, description = group
+            if job not in jobs or any(j.state in (STATE_PENDING, STATE_RUNNING) for j in jobs):
+                continue
+            self.job_groups.remove(group)
+            lines = "\n".join(f"{j.game}: {j.state}" for j in jobs)
+            if all(j.state == STATE_DONE for j in jobs):
+                QMessageBox.information(self, "Sucesso", f"{description} concluído.\n\n{lines}")
+            else:
+                QMessageBox.warning(self, description, lines)
 
-        day_folder = datetime.now().strftime("%Y-%m-%d")
-        final_folder = os.path.join(cfg["folder"], day_folder)
-        os.makedirs(final_folder, exist_ok=True)
+    # ================= ESTATÍSTICAS =================
+    STATS_COLUMNS = (
+        "Jogo", "Evento", "Qtd", "p50 (s)", "p90 (s)", "p99 (s)", "MB/s",
+        "Compressão", "Tamanho MB", "Varredura / Compressão / Gravação (s)", "Tendência"
+    )
 
-        create_backup(
-            self.games[game],
-            final_folder,
-            f"{game}_{event.upper()}"
+    def init_stats_tab(self, tab):
+        from metrics import OP_BACKUP, OP_RESTORE
+
+        layout = QVBoxLayout()
+
+        lbl = QLabel("📊 Desempenho dos backups e restaurações")
+        lbl.setStyleSheet("font-weight: bold; font-size: 12px;")
+        layout.addWidget(lbl)
+
+        layout_filters = QHBoxLayout()
+        self.cmb_stats_op = QComboBox()
+        self.cmb_stats_op.addItem("Backups", OP_BACKUP)
+        self.cmb_stats_op.addItem("Restaurações", OP_RESTORE)
+        self.cmb_stats_op.currentIndexChanged.connect(self.refresh_stats)
+        layout_filters.addWidget(self.cmb_stats_op)
+
+        self.cmb_stats_period = QComboBox()
+        for label, days in (("Últimos 7 dias", 7), ("Últimos 30 dias", 30),
+                            ("Últimos 90 dias", 90), ("Tudo", 0)):
+            self.cmb_stats_period.addItem(label, days)
+        self.cmb_stats_period.setCurrentIndex(1)
+        self.cmb_stats_period.currentIndexChanged.connect(self.refresh_stats)
+        layout_filters.addWidget(self.cmb_stats_period)
+
+        btn_refresh = QPushButton("🔄 Atualizar")
+        btn_refresh.clicked.connect(self.refresh_stats)
+        layout_filters.addWidget(btn_refresh)
+        layout_filters.addStretch()
+        layout.addLayout(layout_filters)
+
+        self.table_stats = QTableWidget(0, len(self.STATS_COLUMNS))
+        self.table_stats.setHorizontalHeaderLabels(self.STATS_COLUMNS)
+        self.table_stats.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table_stats.verticalHeader().setVisible(False)
+        self.table_stats.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table_stats)
+
+        lbl_help = QLabel(
+            "Percentis da duração das operações concluídas. Tendência compara a mediana das\n"
+            "10 últimas com a das 10 anteriores (positivo = mais lento)."
         )
+        lbl_help.setStyleSheet("color: #666; font-size: 10px;")
+        layout.addWidget(lbl_help)
+
+        tab.setLayout(layout)
+
+    def refresh_stats(self):
+        """Preenche a tabela com o resumo do banco de métricas"""
+        from metrics import MetricsStore
+
+        days = self.cmb_stats_period.currentData()
+        since = datetime.now().timestamp() - days * 86400 if days else None
+        try:
+            with MetricsStore() as store:
+                rows = store.summary(self.cmb_stats_op.currentData(), since=since)
+        except Exception as e:
+            log_event("ERROR", f"Erro ao ler as métricas: {str(e)}")
+            rows = []
+
+        self.table_stats.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            phases = row["phases"]
+            trend = "—" if row["trend"] is None else f"{row['trend']:+.0f}%"
+            values = (
+                row["game"], row["event"], str(row["count"]),
+                f"{row['p50']:.1f}", f"{row['p90']:.1f}", f"{row['p99']:.1f}",
+                f"{row['throughput'] / 1048576:.1f}",
+                f"{row['ratio']:.2f}x" if row["ratio"] else "—",
+                f"{row['size'] / 1048576:.1f}",
+                f"{phases['scan']:.1f} / {phases['compress']:.1f} / {phases['write']:.1f}",
+                trend,
+            )
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table_stats.setItem(i, col, item)
 
     # ================= LOGS =================
-    def init_logs_tab(self):
-        tab = QWidget()
+    def init_logs_tab(self, tab):
         layout = QVBoxLayout()
 
         # Label
@@ -699,9 +1527,10 @@ class MainWindow(QMainWindow):
         lbl.setStyleSheet("font-weight: bold; font-size: 12px;")
         layout.addWidget(lbl)
 
-        # Text editor para mostrar logs
-        self.log_display = QTextEdit()
+        # Texto simples com limite de linhas: memória constante com logs grandes
+        self.log_display = QPlainTextEdit()
         self.log_display.setReadOnly(True)
+        self.log_display.setMaximumBlockCount(READ_LINES)
         self.log_display.setStyleSheet("font-family: Courier; font-size: 10px;")
         layout.addWidget(self.log_display)
 
@@ -737,24 +1566,43 @@ class MainWindow(QMainWindow):
         layout.addLayout(buttons_container)
 
         tab.setLayout(layout)
-        self.tabs.addTab(tab, "📋 Logs")
 
-        # Timer para atualizar logs automaticamente
+        # Acompanha o fim do arquivo; só roda com a aba de logs visível
+        self.log_tail = LogTail()
         self.log_timer = QTimer()
         self.log_timer.timeout.connect(self.refresh_logs)
-        self.log_timer.start(2000)  # Atualiza a cada 2 segundos
-
-        # Carrega logs na inicialização
-        self.refresh_logs()
 
+    def update_log_timer(self):
+        """Liga o acompanhamento dos logs só com a aba visível na tela"""
+        if not hasattr(self, "log_timer"):
+            # Eventos de janela/aba antes da aba de logs existir
+            return
+        visible = self.isVisible() and not self.isMinimized() \
+            and self.tabs.currentWidget() is self.logs_tab
+        if visible and not self.log_timer.isActive():
+            self.refresh_logs()
+            self.log_timer.start(2000)  # Atualiza a cada 2 segundos
+        elif not visible:
+            self.log_timer.stop()
+
+    @profiling.profiled("refresh_logs")
     def refresh_logs(self):
-        """Atualiza o display de logs"""
-        log_content = read_log()
-        self.log_display.setText(log_content)
-        # Scroll para o final
-        self.log_display.verticalScrollBar().setValue(
-            self.log_display.verticalScrollBar().maximum()
-        )
+        """Acrescenta ao display só as linhas novas do log"""
+        try:
+            text, restarted = self.log_tail.read_new()
+        except OSError as e:
+            text, restarted = f"Erro ao ler log: {e}\n", True
+            self.log_tail.reset()
+        if restarted:
+            self.log_display.clear()
+        if not text:
+            return
+        bar = self.log_display.verticalScrollBar()
+        # Só segue o fim se o usuário não rolou para ler algo antigo
+        at_bottom = restarted or bar.value() >= bar.maximum() - 2
+        self.log_display.appendPlainText(text.rstrip("\n"))
+        if at_bottom:
+            bar.setValue(bar.maximum())
 
     def clear_logs_btn(self):
         """Limpa os logs após confirmação"""
@@ -766,15 +1614,19 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
+            # Solta o logs.txt aberto pelo acompanhamento antes de apagar
+            self.log_tail.reset()
             if clear_log():
+                self.log_display.clear()
                 log_event("INFO", "Logs foram limpados pelo usuário")
-                self.refresh_logs()
                 QMessageBox.information(self, "Sucesso", "Logs foram limpos.")
             else:
                 QMessageBox.warning(self, "Erro", "Não foi possível limpar os logs.")
 
     def open_logs_notepad(self):
         """Abre o arquivo de log com Bloco de Notas"""
+        import subprocess
+
         try:
             log_file = get_log_file()
             if os.path.exists(log_file):
@@ -0,0 +1,384 @@
+"""
+Escritor de zip (.becupe) com compressão paralela.
+
+Os membros são comprimidos em um pool de threads (zlib libera o GIL) e os
+resultados são gravados no arquivo na ordem em que foram adicionados, então
+o zip final é idêntico em estrutura a um zip comum. O método de cada
+membro (stored, deflate, bzip2 ou lzma) pode ser escolhido por arquivo de
+acordo com um perfil de compressão (ver compression.py). Arquivos grandes são
+divididos em blocos comprimidos em paralelo e concatenados como um único
+stream deflate (mesma técnica do pigz). A memória fica limitada pelo total de
+bytes em voo (max_in_flight).
+"""
+import bz2
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from compression import choose_method
+from throttle import read_file
+
+ZIP_STORED = zipfile.ZIP_STORED
+ZIP_DEFLATED = zipfile.ZIP_DEFLATED
+ZIP_BZIP2 = zipfile.ZIP_BZIP2
+ZIP_LZMA = zipfile.ZIP_LZMA
+
+DEFAULT_LEVEL = 6
+DEFAULT_MAX_IN_FLIGHT = 64 * 1024 * 1024
+LARGE_FILE_THRESHOLD = 8 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+
+_ZIP64_LIMIT = (1 << 31) - 1
+_ZIP_FILECOUNT_LIMIT = (1 << 16) - 1
+_CREATE_SYSTEM = 0 if sys.platform == "win32" else 3
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_END_RECORD64 = struct.Struct("<4sQ2H2L4Q")
+_END_LOCATOR64 = struct.Struct("<4sLQL")
+
+
+def default_workers():
+    """Número padrão de threads de compressão"""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dosdate = (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dostime = t.tm_hour << 11 | t.tm_min << 5 | (t.tm_sec // 2)
+    return dosdate, dostime
+
+
+def compress_bytes(data, method, level):
+    """Comprime data no formato do método do zip"""
+    if method == ZIP_STORED:
+        return bytes(data)
+    if method == ZIP_DEFLATED:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+    if method == ZIP_BZIP2:
+        return bz2.compress(data, max(1, min(9, level)))
+    if method == ZIP_LZMA:
+        # Mesmo formato que o zipfile grava (cabeçalho de propriedades + LZMA1)
+        compressor = zipfile.LZMACompressor()
+        return compressor.compress(data) + compressor.flush()
+    raise ValueError(f"Método de compressão não suportado: {method}")
+
+
+def _compress_file(path, method, level, profile, throttle=None):
+    """Tarefa do pool: lê, escolhe o método (se houver perfil) e comprime um arquivo"""
+    data = read_file(path, throttle)
+    if profile:
+        method, level = choose_method(path, data, len(data), profile)
+    return zlib.crc32(data) & 0xFFFFFFFF, len(data), method, compress_bytes(data, method, level)
+
+
+def _compress_data(data, method, level):
+    return zlib.crc32(data) & 0xFFFFFFFF, len(data), method, compress_bytes(data, method, level)
+
+
+def _deflate_block(data, level, last):
+    """Comprime um bloco de um arquivo grande; blocos intermediários terminam em sync flush"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _Entry:
+    __slots__ = ("name", "flags", "method", "dosdate", "dostime", "crc",
+                 "csize", "usize", "offset", "external_attr", "zip64_local", "tracked")
+
+    def __init__(self, arcname, method, mtime, external_attr):
+        self.name = arcname.encode("utf-8")
+        self.flags = 0 if arcname.isascii() else 0x800
+        self.set_method(method)
+        self.dosdate, self.dostime = _dos_datetime(mtime)
+        self.crc = 0
+        self.csize = 0
+        self.usize = 0
+        self.offset = 0
+        self.external_attr = external_attr
+        self.zip64_local = False
+        # Conta no progresso (apenas arquivos do save, não pastas/manifesto)
+        self.tracked = False
+
+    def set_method(self, method):
+        self.method = method
+        if method == ZIP_LZMA:
+            # Bit 1: o stream LZMA termina com marcador de fim
+            self.flags |= 0x02
+
+    def version_needed(self, zip64):
+        if self.method == ZIP_LZMA:
+            return 63
+        if self.method == ZIP_BZIP2:
+            return 46
+        return 45 if zip64 else 20
+
+
+class ParallelZipWriter:
+    """
+    Grava um zip comprimindo os membros em paralelo.
+
+    Args:
+        path: Arquivo zip de saída
+        workers: Threads de compressão (padrão: até 4)
+        max_in_flight: Limite de bytes (originais) lidos e ainda não gravados
+        level: Nível de compressão padrão do deflate
+        profile: Perfil de compressão (compression.PROFILE_*). Quando informado,
+                 add_file escolhe o método e o nível de cada arquivo
+        progress: progress.Progress avisado a cada arquivo gravado (e onde o
+                  cancelamento é verificado)
+        throttle: throttle.Throttle que limita leituras e gravações; com
+                  low_priority, as threads de compressão rodam em segundo plano
+                  enquanto o limite vale
+    """
+
+    def __init__(self, path, workers=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 level=DEFAULT_LEVEL, profile=None, progress=None, throttle=None):
+        self.path = path
+        self.workers = workers or default_workers()
+        self.max_in_flight = max_in_flight
+        self.level = level
+        self.profile = profile
+        self.progress = progress
+        self.throttle = throttle
+        self.method_counts = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # Tempo gasto gravando no arquivo (o resto é espera pela compressão)
+        self.write_seconds = 0.0
+        self._fp = open(path, "wb")
+        # Threads só deste arquivo: a prioridade baixada pelo throttle acaba com elas
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._entries = []
+        self._pending = deque()
+        self._in_flight = 0
+
+    # ================= API =================
+    def add_file(self, src_path, arcname, method=ZIP_DEFLATED, level=None):
+        """
+        Agenda a compressão de um arquivo do disco.
+        Com perfil definido, method/level são escolhidos pelo conteúdo.
+        """
+        level = self.level if level is None else level
+        profile = self.profile
+        st = os.stat(src_path)
+        entry = _Entry(arcname, method, st.st_mtime, (st.st_mode & 0xFFFF) << 16)
+        entry.tracked = True
+        if self.progress:
+            self.progress.check()
+
+        if st.st_size >= LARGE_FILE_THRESHOLD:
+            if profile:
+                # Decide pelo início do arquivo; o pool não precisa decidir de novo
+                with open(src_path, "rb") as f:
+                    sample = f.read(BLOCK_SIZE)
+                method, level = choose_method(src_path, sample, st.st_size, profile)
+                entry.set_method(method)
+                profile = None
+            if method == ZIP_DEFLATED:
+                self._drain()
+                self._write_large(entry, src_path, st.st_size, level)
+                return
+
+        future = self._executor.submit(_compress_file, src_path, method, level, profile, self.throttle)
+        self._queue(entry, future, st.st_size)
+
+    def add_bytes(self, arcname, data, method=ZIP_DEFLATED, level=None):
+        """Agenda a compressão de dados em memória"""
+        level = self.level if level is None else level
+        entry = _Entry(arcname, method, time.time(), 0o600 << 16)
+        future = self._executor.submit(_compress_data, data, method, level)
+        self._queue(entry, future, len(data))
+
+    def add_dir(self, arcname, mtime=None):
+        """Adiciona uma entrada de pasta (para preservar pastas vazias)"""
+        self._drain()
+        entry = _Entry(arcname.rstrip("/") + "/", ZIP_STORED, mtime or time.time(),
+                       (0o40775 << 16) | 0x10)
+        self._write_member(entry, b"")
+
+    def close(self):
+        """Grava o que falta e o diretório central"""
+        if self._fp is None:
+            return
+        try:
+            self._drain()
+            self._write_central_directory()
+        finally:
+            self._fp.close()
+            self._fp = None
+            self._executor.shutdown(wait=True)
+
+    def abort(self):
+        """Descarta o trabalho pendente e apaga o arquivo parcial"""
+        for _entry, future, _size in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=True)
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # ================= PIPELINE =================
+    def _queue(self, entry, future, size):
+        self._pending.append((entry, future, size))
+        self._in_flight += size
+        while self._pending and (
+            self._in_flight > self.max_in_flight or len(self._pending) > self.workers * 4
+        ):
+            self._write_next()
+
+    def _write_next(self):
+        entry, future, size = self._pending.popleft()
+        self._in_flight -= size
+        entry.crc, entry.usize, method, data = future.result()
+        entry.set_method(method)
+        self._write_member(entry, data)
+
+    def _drain(self):
+        while self._pending:
+            self._write_next()
+
+    def _write_member(self, entry, data):
+        entry.offset = self._fp.tell()
+        entry.csize = len(data)
+        entry.zip64_local = entry.usize > _ZIP64_LIMIT or entry.csize > _ZIP64_LIMIT
+        self._fp.write(self._local_header(entry))
+        self._write_data(data)
+        self._entries.append(entry)
+        self.bytes_in += entry.usize
+        self.bytes_out += entry.csize
+        self.method_counts[entry.method] = self.method_counts.get(entry.method, 0) + 1
+        if self.progress and entry.tracked:
+            self.progress.advance(files=1, nbytes=entry.usize)
+
+    def _write_large(self, entry, src_path, size, level):
+        """Comprime um arquivo grande em blocos paralelos e grava em ordem"""
+        entry.offset = self._fp.tell()
+        # Reserva o extra zip64 quando o arquivo pode passar do limite de 4 GiB
+        entry.zip64_local = size * 1.05 > _ZIP64_LIMIT
+        self._fp.write(self._local_header(entry))
+
+        crc = 0
+        csize = 0
+        usize = 0
+        blocks = deque()
+        max_blocks = max(2, self.max_in_flight // BLOCK_SIZE)
+        read = self.throttle.read if self.throttle else (lambda f, size: f.read(size))
+        with open(src_path, "rb") as f:
+            data = read(f, BLOCK_SIZE)
+            while data:
+                following = read(f, BLOCK_SIZE)
+                crc = zlib.crc32(data, crc)
+                usize += len(data)
+                blocks.append((self._executor.submit(_deflate_block, data, level, not following), len(data)))
+                while len(blocks) >= max_blocks:
+                    csize += self._write_block(*blocks.popleft())
+                data = following
+        while blocks:
+            csize += self._write_block(*blocks.popleft())
+
+        entry.crc = crc & 0xFFFFFFFF
+        entry.usize = usize
+        entry.csize = csize
+        if not entry.zip64_local and (usize > _ZIP64_LIMIT or csize > _ZIP64_LIMIT):
+            raise ValueError(f"Arquivo grande demais para o zip: {src_path}")
+
+        # Volta e corrige o cabeçalho local com CRC e tamanhos
+        end = self._fp.tell()
+        self._fp.seek(entry.offset)
+        self._fp.write(self._local_header(entry))
+        self._fp.seek(end)
+        self._entries.append(entry)
+        self.bytes_in += usize
+        self.bytes_out += csize
+        self.method_counts[entry.method] = self.method_counts.get(entry.method, 0) + 1
+        if self.progress:
+            self.progress.advance(files=1)
+
+    def _write_block(self, future, raw_size):
+        compressed = future.result()
+        self._write_data(compressed)
+        if self.progress:
+            self.progress.advance(nbytes=raw_size)
+        return len(compressed)
+
+    def _write_data(self, data):
+        start = time.perf_counter()
+        if self.throttle:
+            self.throttle.write(self._fp, data)
+        else:
+            self._fp.write(data)
+        self.write_seconds += time.perf_counter() - start
+
+    # ================= FORMATO ZIP =================
+    def _local_header(self, entry):
+        extra = b""
+        csize, usize = entry.csize, entry.usize
+        if entry.zip64_local:
+            extra = struct.pack("<HHQQ", 1, 16, usize, csize)
+            csize = usize = 0xFFFFFFFF
+        return _LOCAL_HEADER.pack(
+            b"PK\003\004", entry.version_needed(entry.zip64_local), 0,
+            entry.flags, entry.method, entry.dostime, entry.dosdate,
+            entry.crc, csize, usize, len(entry.name), len(extra)
+        ) + entry.name + extra
+
+    def _write_central_directory(self):
+        start = self._fp.tell()
+        for entry in self._entries:
+            fields = []
+            usize, csize, offset = entry.usize, entry.csize, entry.offset
+            if usize > _ZIP64_LIMIT:
+                fields.append(usize)
+                usize = 0xFFFFFFFF
+            if csize > _ZIP64_LIMIT:
+                fields.append(csize)
+                csize = 0xFFFFFFFF
+            if offset > _ZIP64_LIMIT:
+                fields.append(offset)
+                offset = 0xFFFFFFFF
+            extra = b""
+            if fields:
+                extra = struct.pack("<HH" + "Q" * len(fields), 1, 8 * len(fields), *fields)
+            version = entry.version_needed(bool(fields) or entry.zip64_local)
+            self._fp.write(_CENTRAL_HEADER.pack(
+                b"PK\001\002", version, _CREATE_SYSTEM, version, 0,
+                entry.flags, entry.method, entry.dostime, entry.dosdate,
+                entry.crc, csize, usize, len(entry.name), len(extra), 0,
+                0, 0, entry.external_attr, offset
+            ))
+            self._fp.write(entry.name + extra)
+        end = self._fp.tell()
+
+        count = len(self._entries)
+        size = end - start
+        if count > _ZIP_FILECOUNT_LIMIT or size > _ZIP64_LIMIT or start > _ZIP64_LIMIT:
+            self._fp.write(_END_RECORD64.pack(
+                b"PK\006\006", 44, 45, 45, 0, 0, count, count, size, start
+            ))
+            self._fp.write(_END_LOCATOR64.pack(b"PK\006\007", 0, end, 1))
+            count = min(count, 0xFFFF)
+            size = min(size, 0xFFFFFFFF)
+            start = min(start, 0xFFFFFFFF)
+        self._fp.write(_END_RECORD.pack(b"PK\005\006", 0, 0, count, count, size, start, 0))